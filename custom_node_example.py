@@ -71,8 +71,8 @@ import time
 from rtmaii import rtmaii # Replace with just import rtmaii in actual implementation.
 from rtmaii.worker import Worker # Import this module to create custom Workers.
 from rtmaii.coordinator import Coordinator # Import this module to create custom coordinators.
-from pydispatch import dispatcher # To dispatch signals in your node, use this module.
-# More information on pydispatch can be found here: http://pydispatcher.sourceforge.net/
+from rtmaii.timing import send # To raise signals in your node, use this method.
+# Signals are raised on the library's event bus, with the capture time of the data.
 class NewWorker(Worker):
     """ Basic Custom Worker Example.
 
@@ -109,8 +109,8 @@ class NewWorker(Worker):
         """ Run loop of the node, keep all processing logic within here. """
         # while True: <- would normally be used, to keep thread alive.
         data = self.queue.get()
-        # Use the awesome module Pydispatcher to send signals with the resulting data.
-        dispatcher.send(signal='custom', sender=self.channel_id, data=data)
+        # Send signals with the resulting data, to any callbacks set for the signal.
+        send('custom', self.channel_id, data, self.queue.capture)
 
 class NewCoordinator(Coordinator):
     """ Basic Custom Coordinator Example.
@@ -131,7 +131,7 @@ class NewCoordinator(Coordinator):
     def run(self):
         while True: # This is normally used, to keep thread alive during analysis.
             data = self.queue.get()
-            dispatcher.send(signal='custom', sender=self.channel_id, data=data)
+            send('custom', self.channel_id, data, self.queue.capture)
 
 def main():
     """ Example of methods that can be used to manipulate the hierarchy. """
@@ -6,8 +6,7 @@ import argparse
 import time
 import statistics
 import json
-from rtmaii import hierarchy, configuration
-from numpy import arange, int16, frombuffer, sin, pi
+from rtmaii import hierarchy, configuration, sources
 from pydispatch import dispatcher
 
 class Tracker(object):
@@ -112,14 +111,10 @@ PARSER.add_argument("-m", "--multichannelanalysis", dest='mergechannels',
                     help="Toggle multi channel analysis", action='store_false')
 ARGS = PARSER.parse_args()
 
-def generate_sine(sampling_rate, time_step):
-    """ Generates a basic sine wave to send as a stub to hierarchy. """
-    return sin(2 * pi * 440 * time_step / sampling_rate)
-
 def main():
     """ BENCHMARKING PROCESS
 
-        1. Creates dummy signal to send through hierarchy.
+        1. Creates a generated 440Hz signal to send through hierarchy, no audio device is used.
         2. Creates independent Hierarchy and Config, so audio is not needed. (Using passed args)
         3. Put dummy signal into Hierarchy X times to hit analysis threshold of some threads.
         4. Put dummy signal into Hierarchy N times (Specified by args)
@@ -132,8 +127,7 @@ def main():
           .format(ARGS.samplingrate // ARGS.framespersample))
     print('[Warning] This is only an approximation, Python can take a while to warm up.')
 
-    time_step = arange(ARGS.framespersample * ARGS.channelcount, dtype=int16)
-    stub_wave = (generate_sine(ARGS.samplingrate, time_step) * 1000).tobytes()
+    source = sources.SyntheticSource((440,), ARGS.samplingrate, ARGS.channelcount, seed=0)
     stub_count = 127 # Amount needed to start genre predictions.
     ARGS.tasks['genre'] = False # Currently disabled, needs rework in order for benchmark to work
 
@@ -170,7 +164,7 @@ def main():
     print("Preparing workers...")
     for _ in range(stub_count):
         # As some tasks have a threshold before running, we need to feed them a couple of stubs.
-        root.put(frombuffer(stub_wave))
+        root.put(source.read(ARGS.framespersample))
     tracker.wait_for_signals()
 
     if tasks['genre']: # Genre only runs once every 128 frames.
@@ -184,7 +178,7 @@ def main():
         tracker.reset_tracker()
         start_time = time.time()
         # The root conversion time is taken into account.
-        root.put(frombuffer(stub_wave))
+        root.put(source.read(ARGS.framespersample))
         tracker.wait_for_signals()
         tracker.store_times(start_time)
     tracker.print_times()
@@ -0,0 +1,81 @@
+""" RTMA DISPATCH BENCHMARK
+
+    This module is a commandline script, which measures the overhead of raising signals.
+
+    Each signal raised by the analysis of a chunk is sent repeatedly, through the event bus
+    and through pydispatch, with a set amount of receivers connected to every signal.
+"""
+import argparse
+import time
+from pydispatch import dispatcher
+from rtmaii import bus as rtmaii_bus
+from rtmaii.bus import EventBus, ANY
+
+SIGNALS = ['signal', 'spectrum', 'bands', 'pitch', 'note', 'beats']
+
+PARSER = argparse.ArgumentParser(
+    description="Benchmark the overhead of sending each signal, on the event bus and pydispatch."
+    )
+
+##--- PARSER ARGUMENTS ---##
+PARSER.add_argument("-r", "--receivers",
+                    help="Number of receivers connected to each signal.",
+                    type=int, default=1)
+PARSER.add_argument("-s", "--sends",
+                    help="Number of times each signal is sent.",
+                    type=int, default=100000)
+PARSER.add_argument("-l", "--listened",
+                    help="Signals with receivers connected, others are sent without any.",
+                    nargs='*', default=['pitch', 'note'])
+ARGS = PARSER.parse_args()
+
+class Receiver(object):
+    """ Receiver counting the signals it is sent, accepting only 'data' as most callbacks do. """
+    def __init__(self):
+        self.count = 0
+
+    def receive(self, data: object):
+        """ Count a signal. """
+        self.count += 1
+
+def measure(send: object, signal: str) -> float:
+    """ Return the nanoseconds taken to send a signal once, on average. """
+    start_time = time.perf_counter()
+    for _ in range(ARGS.sends):
+        send(signal, 0, data=0, capture=None, latency=None)
+    return (time.perf_counter() - start_time) / ARGS.sends * 1e9
+
+def main():
+    """ BENCHMARKING PROCESS
+
+        1. Connect N receivers to each listened signal, on both the bus and pydispatch.
+        2. Send each signal M times through each (Specified by args)
+        3. Print out the average time to send each signal, and the speed up of the bus.
+    """
+    print('Config options used in this benchmark are:')
+    for key, value in ARGS.__dict__.items():
+        print('\t{}: {}'.format(key, value))
+
+    # Measure pydispatch as it was, without the bridge to the library's bus.
+    dispatcher.disconnect(rtmaii_bus.__bridge__, ANY, ANY)
+    bus = EventBus()
+    receivers = [Receiver() for _ in range(ARGS.receivers)]
+    for signal in ARGS.listened:
+        for receiver in receivers:
+            bus.connect(receiver.receive, signal)
+            dispatcher.connect(receiver.receive, signal, sender=ANY)
+
+    def send_pydispatch(signal: str, sender: object, **named: dict):
+        dispatcher.send(signal=signal, sender=sender, **named)
+
+    print('{:<10}{:>10}{:>12}{:>18}{:>10}'.format('Signal', 'Receivers', 'Bus (ns)',
+                                                  'Pydispatch (ns)', 'Speed up'))
+    for signal in SIGNALS:
+        bus_time = measure(bus.send, signal)
+        pydispatch_time = measure(send_pydispatch, signal)
+        print('{:<10}{:>10}{:>12.0f}{:>18.0f}{:>9.1f}x'.format(
+            signal, len(receivers) if signal in ARGS.listened else 0,
+            bus_time, pydispatch_time, pydispatch_time / bus_time))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+""" RTMA WORK QUEUE BENCHMARK
+
+    This module is a commandline script, which measures the WorkQueue under contention.
+
+    Several producer threads put chunks of samples onto a single queue,
+    whilst one consumer takes them off with get, get_batch or get_all.
+"""
+import argparse
+import threading
+import time
+import statistics
+from numpy import zeros, int16
+from rtmaii.workqueue import WorkQueue
+
+PARSER = argparse.ArgumentParser(
+    description="Benchmark WorkQueue throughput and latency with several producer threads."
+    )
+
+##--- PARSER ARGUMENTS ---##
+PARSER.add_argument("-p", "--producers",
+                    help="Number of producer threads putting items onto the queue.",
+                    type=int, default=4)
+PARSER.add_argument("-i", "--items",
+                    help="Number of items put by each producer.",
+                    type=int, default=20000)
+PARSER.add_argument("-f", "--framespersample",
+                    help="Samples in each item, default is 1024",
+                    type=int, default=1024)
+PARSER.add_argument("-m", "--method",
+                    help="Method the consumer takes items with.",
+                    choices=['get', 'get_batch', 'get_all'], default='get')
+PARSER.add_argument("-b", "--batchsize",
+                    help="Most items taken by each get_batch call.",
+                    type=int, default=16)
+ARGS = PARSER.parse_args()
+
+def produce(queue: WorkQueue, chunk: object, items: int):
+    """ Put items onto the queue, each tagged with the time it was put. """
+    for _ in range(items):
+        queue.put(chunk, time.perf_counter())
+
+def consume(queue: WorkQueue, total: int, latencies: list):
+    """ Take items off the queue until every sample has been received. """
+    take = {
+        'get': lambda: [queue.get(timeout=5)],
+        'get_batch': lambda: queue.get_batch(ARGS.batchsize, timeout=5),
+        'get_all': lambda: [queue.get_all(timeout=5)],
+    }[ARGS.method]
+    received = 0
+    while received < total:
+        items = take()
+        # The capture is the time the newest item taken was put.
+        latencies.append(time.perf_counter() - queue.capture)
+        received += sum(len(item) for item in items)
+
+def main():
+    """ BENCHMARKING PROCESS
+
+        1. Start a consumer thread, taking items using the chosen method.
+        2. Start N producer threads, each putting the same chunk M times (Specified by args)
+        3. Print out throughput and latency percentiles once every sample is received.
+    """
+    print('Config options used in this benchmark are:')
+    for key, value in ARGS.__dict__.items():
+        print('\t{}: {}'.format(key, value))
+
+    queue = WorkQueue()
+    chunk = zeros(ARGS.framespersample, dtype=int16)
+    total = ARGS.producers * ARGS.items * ARGS.framespersample
+    latencies = []
+
+    consumer = threading.Thread(target=consume, args=(queue, total, latencies))
+    producers = [threading.Thread(target=produce, args=(queue, chunk, ARGS.items))
+                 for _ in range(ARGS.producers)]
+    start_time = time.perf_counter()
+    consumer.start()
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    consumer.join()
+    elapsed = time.perf_counter() - start_time
+
+    stats = queue.stats()
+    quantiles = statistics.quantiles(latencies, n=100)
+    print('Items: {} enqueued, {} processed in {} takes.'
+          .format(stats['enqueued'], stats['processed'], len(latencies)))
+    print('Throughput: {:.0f} items/s'.format(stats['processed'] / elapsed))
+    print('Latency of newest item taken:')
+    for percentile in (50, 95, 99):
+        print('\tP{} {:.6f}s'.format(percentile, quantiles[percentile - 1]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+""" RTMA STARTUP BENCHMARK
+
+    This module is a commandline script, which measures how quickly the library starts up.
+
+    Each run starts a fresh interpreter, which imports the library, creates an analyser
+    and analyses a synthetic source offline, timing the first signal raised.
+    Heavy dependencies are only imported once a node needs them, see the lazy module,
+    so short lived batch scripts can check their cold start stays within a budget.
+
+    Exits with status 1 if the median of a measurement is over its budget,
+    or if a module only some nodes need is loaded by importing the library, see DEFERRED.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+START = time.perf_counter() # Before the library is imported.
+
+# Modules only loaded once a node needs them, which importing the library must not load.
+DEFERRED = ('rtmaii.exporter', 'rtmaii.process', 'multiprocessing.shared_memory')
+
+PARSER = argparse.ArgumentParser(
+    description="Benchmark import time and time-to-first-signal of the library, "
+                "in fresh interpreters."
+    )
+
+##--- PARSER ARGUMENTS ---##
+PARSER.add_argument("-n", "--runs",
+                    help="Number of fresh interpreters to start.",
+                    type=int, default=5)
+PARSER.add_argument("-s", "--signal",
+                    help="Signal to wait for, i.e. 'pitch'.",
+                    type=str, default='pitch')
+PARSER.add_argument("-c", "--config",
+                    help="Configuration of the analyser as a dictionary.",
+                    type=json.loads,
+                    default={'tasks': {'genre': False, 'export_spectrograms': False}})
+PARSER.add_argument("-d", "--duration",
+                    help="Seconds of audio to analyse, the first signal must be raised by then.",
+                    type=float, default=2)
+PARSER.add_argument("-i", "--importbudget",
+                    help="Most seconds importing the library should take, unchecked if not set.",
+                    type=float, default=None)
+PARSER.add_argument("-b", "--budget",
+                    help="Most seconds until the first signal is raised, unchecked if not set.",
+                    type=float, default=None)
+PARSER.add_argument("--child", help=argparse.SUPPRESS, action='store_true')
+ARGS = PARSER.parse_args()
+
+def measure() -> dict:
+    """ Run once in a fresh interpreter, returning the time taken by each step of startup. """
+    from rtmaii import rtmaii
+    from rtmaii.sources import SyntheticSource
+    from rtmaii.lazy import LOADED
+    imported = time.perf_counter()
+    loaded = [module for module in DEFERRED if module in sys.modules]
+    first_signal = []
+
+    def on_signal(**kwargs):
+        """ Record when the first signal is raised. """
+        if not first_signal:
+            first_signal.append(time.perf_counter())
+
+    source = SyntheticSource((440,), duration=ARGS.duration)
+    analyser = rtmaii.Rtmaii([{'function': on_signal, 'signal': ARGS.signal}],
+                             source=source, config=ARGS.config)
+    created = time.perf_counter()
+    analyser.analyse_file()
+    analyser.stop()
+    return {
+        'import': imported - START,
+        'create': created - imported,
+        'first_signal': first_signal[0] - START if first_signal else None,
+        'lazy_imports': dict(LOADED),
+        'eager_imports': loaded
+    }
+
+def main():
+    """ BENCHMARKING PROCESS
+
+        1. Start N fresh interpreters, each measuring a single startup (Specified by args).
+        2. Print out the median time of each step, and the lazy modules imported.
+        3. Exit with status 1 if a median is over its budget, or a DEFERRED module was loaded.
+    """
+    print('Config options used in this benchmark are:')
+    for key, value in ARGS.__dict__.items():
+        if key != 'child':
+            print('\t{}: {}'.format(key, value))
+
+    command = [sys.executable, __file__, '--child'] + sys.argv[1:]
+    runs = []
+    for _ in range(ARGS.runs):
+        launched = time.perf_counter()
+        output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                check=True).stdout
+        run = json.loads(output.decode().splitlines()[-1])
+        run['process'] = time.perf_counter() - launched # Includes starting the interpreter.
+        runs.append(run)
+
+    if any(run['first_signal'] is None for run in runs):
+        print('Signal {} was not raised within {}s of audio.'.format(ARGS.signal, ARGS.duration))
+        sys.exit(1)
+
+    medians = {step: statistics.median(run[step] for run in runs)
+               for step in ('import', 'create', 'first_signal', 'process')}
+    print('Median startup over {} runs:'.format(ARGS.runs))
+    print('\tImport {:.3f}s'.format(medians['import']))
+    print('\tCreate analyser {:.3f}s'.format(medians['create']))
+    print('\tFirst {} signal {:.3f}s'.format(ARGS.signal, medians['first_signal']))
+    print('\tWhole process {:.3f}s'.format(medians['process']))
+    print('Modules imported by nodes:')
+    for module, seconds in runs[-1]['lazy_imports'].items():
+        print('\t{} {:.3f}s'.format(module, seconds))
+
+    failed = False
+    eager = sorted(set(module for run in runs for module in run['eager_imports']))
+    if eager:
+        print('Loaded on import, but should only be loaded once needed: {}.'
+              .format(', '.join(eager)))
+        failed = True
+    for step, budget in (('import', ARGS.importbudget), ('first_signal', ARGS.budget)):
+        if budget is not None and medians[step] > budget:
+            print('Over budget: {} took {:.3f}s, the budget is {:.3f}s.'
+                  .format(step, medians[step], budget))
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    if ARGS.child:
+        print(json.dumps(measure()))
+    else:
+        main()
@@ -6,12 +6,12 @@
     - Also includes additional helper functions
 
 """
-import audioop
 import logging
 import numpy
-from scipy.signal import butter, lfilter
+from rtmaii.lazy import lazy_import
 
 LOGGER = logging.getLogger(__name__)
+scipy_signal = lazy_import('scipy.signal')
 
 # Beat detection algorithms
 def beatdetection(data, threshold):
@@ -53,13 +53,15 @@ def getrmsamp(data):
     RMS amplitude is well-suited for musical applications because
     it can account for asymetrical waves
 
-    audioop takes the sample width as its second parameter
-    where 1=8bit 2=16bit and 4=32bit
+    Works on samples of any type, so int16, float32 or filtered float64
+    chunks are all measured on the same scale
 
     :param data: the musical chunk
     :return: the root-mean-square amplitude of the audio chunk
     """
-    return audioop.rms(data, 2)
+    if not len(data):
+        return 0
+    return int(numpy.sqrt(numpy.mean(numpy.square(data, dtype=numpy.float64))))
 
 
 def shiftenergyhistory(amp, energyhistory):
@@ -200,7 +202,7 @@ def lowpass(low_cut, low_pass, sampling_rate):
     nyq = sampling_rate/2
     low = low_cut/nyq
     high = low_pass/nyq
-    num, denom = butter(5, [low, high], btype='bandpass')
+    num, denom = scipy_signal.butter(5, [low, high], btype='bandpass')
     LOGGER.info('Created Lowpassfilter')
     return {'num': num, 'denom': denom}
 
@@ -213,5 +215,5 @@ def applylowpass(data, num, denom):
     :param denom:
     :return:
     """
-    lowpassed = lfilter(num, denom, data)
+    lowpassed = scipy_signal.lfilter(num, denom, data)
     return lowpassed
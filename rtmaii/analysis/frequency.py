@@ -9,8 +9,10 @@
     OUTPUTS:
         Frequency_bands_presence: The normalised presence of each band analysed.
 """
-from scipy.fftpack import fftfreq
-from numpy import absolute, real
+from numpy import absolute, real, where
+from rtmaii.lazy import lazy_import
+
+fftpack = lazy_import('scipy.fftpack')
 
 def remove_noise(spectrum: list, noise_level: float) -> list:
     """ Remove any frequencies with an amplitude under a specified noise level.
@@ -44,10 +46,13 @@ def frequency_bands(spectrum: list, bands: dict, sampling_rate: int) -> dict:
     """ Creates a Dictionary of the amplitude balance between each input frequency band.
 
         Args:
-            - spectrum: the spectrum to analyse.
+            - spectrum: the spectrum to analyse, a (channels, bins) block returns
+              a list with a dictionary per channel.
             - bands: the band ranges to find the presence of.
             - sampling_rate: sampling rate of signal used to create spectrum.
     """
+    if getattr(spectrum, 'ndim', 1) > 1:
+        return frequency_bands_block(spectrum, bands, sampling_rate)
     matched_bands = frequency_bands_to_bins(spectrum, bands, sampling_rate)
     filtered_spectrum = real(remove_noise(spectrum, 5))
     band_power = get_band_power(filtered_spectrum, matched_bands)
@@ -55,6 +60,23 @@ def frequency_bands(spectrum: list, bands: dict, sampling_rate: int) -> dict:
 
     return normalized_presence
 
+def frequency_bands_block(spectra: list, bands: dict, sampling_rate: int) -> list:
+    """ Find the presence of each band, for every channel of a (channels, bins) block at once.
+
+        Args:
+            - spectra: the spectrum of each channel.
+            - bands: the band ranges to find the presence of.
+            - sampling_rate: sampling rate of signal used to create spectra.
+    """
+    matched_bands = frequency_bands_to_bins(spectra[0], bands, sampling_rate)
+    filtered_spectra = real(where(spectra < 5, 0, spectra)) # As remove_noise, for every channel.
+    totals = filtered_spectra.sum(axis=-1)
+    band_powers = {band: filtered_spectra[:, rng[0]:rng[1]].sum(axis=-1)
+                   for band, rng in matched_bands.items()}
+    return [normalize_dict({band: power[channel] for band, power in band_powers.items()},
+                           totals[channel])
+            for channel in range(len(spectra))]
+
 def frequency_bands_to_bins(spectrum: list, bands: dict, sampling_rate: int) -> dict:
     """ In order to correctly analyse frequency bands, finds the equivalent frequency bin locations.
 
@@ -67,7 +89,7 @@ def frequency_bands_to_bins(spectrum: list, bands: dict, sampling_rate: int) ->
             - bands: the band ranges to find the presence of.
             - sampling_rate: sampling rate of signal used to create spectrum.
     """
-    bins = fftfreq(len(spectrum) * 2)[:len(spectrum)] * sampling_rate
+    bins = fftpack.fftfreq(len(spectrum) * 2)[:len(spectrum)] * sampling_rate
     matched_band_locations = {band: [find_nearest_bin(bins, rng[0]), find_nearest_bin(bins, rng[1])]
                               for band, rng in bands.items()}
     return matched_band_locations
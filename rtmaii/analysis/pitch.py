@@ -7,9 +7,16 @@
 
     OUTPUTS:
         Pitch (Fundamental Frequency): the pitch of the input.
+
+    Every estimate also takes a (channels, samples) block, returning a list of the pitch
+    of each channel, nan for channels without one, i.e. silent channels.
+    Transforms, peaks and crossings are found across every channel at once.
 """
-from numpy import argmax, mean, diff
-from scipy.signal import decimate
+from numpy import (argmax, mean, diff, empty_like, multiply, arange, roll, where, errstate,
+                   nan, inf)
+from rtmaii.lazy import lazy_import
+
+scipy_signal = lazy_import('scipy.signal')
 
 def pitch_from_fft(spectrum: list, sampling_rate: int) -> float:
     """ Estimate pitch from the frequency spectrum.
@@ -25,6 +32,9 @@ def pitch_from_fft(spectrum: list, sampling_rate: int) -> float:
             - Not great at detecting pitch with multiple harmonics that
               have a higher amplitude than the fundamental frequency.
     """
+    if getattr(spectrum, 'ndim', 1) > 1:
+        peaks = interpolate_peak(spectrum, argmax(spectrum, axis=-1))
+        return list(sampling_rate * peaks / (spectrum.shape[-1] * 2))
     basic_frequency = argmax(spectrum)
     interpolated_peak = interpolate_peak(spectrum, basic_frequency)
     return sampling_rate * interpolated_peak / (len(spectrum) * 2) # Convert to Hz
@@ -44,6 +54,15 @@ def pitch_from_auto_correlation(convolved_signal: list, sampling_rate: int) -> f
             - Requires a convolution to be applied which can be expensive.
             - Not great with inharmonics i.e. Guitars/Pianos.
     """
+    if getattr(convolved_signal, 'ndim', 1) > 1:
+        rising = diff(convolved_signal, axis=-1) > 0
+        first_low_points = argmax(rising, axis=-1) # Finds first rising edge of each channel
+        after = arange(convolved_signal.shape[-1]) >= first_low_points[:, None]
+        peaks = argmax(where(after, convolved_signal, -inf), axis=-1)
+        with errstate(divide='ignore', invalid='ignore'):
+            estimates = sampling_rate / interpolate_peak(convolved_signal, peaks)
+        # Channels without a rising edge, i.e. silent channels, have no pitch.
+        return list(where(rising.any(axis=-1), estimates, nan))
     signal_distances = diff(convolved_signal)
     first_low_point = next(
         i for i, _ in enumerate(signal_distances) if signal_distances[i] > 0
@@ -66,6 +85,19 @@ def pitch_from_zero_crossings(signal: list, sampling_rate: int) -> float:
         Disadvantages:
             - If there is lots of noise or multiple frequencies doesn't work.
     """
+    if getattr(signal, 'ndim', 1) > 1:
+        previous = roll(signal, 1, axis=-1) # Wraps around, as signal[i - 1] does.
+        crossed = (previous > 0) & (signal < 0)
+        with errstate(divide='ignore', invalid='ignore'):
+            crossings = arange(signal.shape[-1]) - signal / (previous - signal)
+        rows = arange(signal.shape[0])
+        first = crossings[rows, argmax(crossed, axis=-1)]
+        last = crossings[rows, signal.shape[-1] - 1 - argmax(crossed[:, ::-1], axis=-1)]
+        count = crossed.sum(axis=-1)
+        # The mean distance between crossings is the distance from the first to the last.
+        with errstate(divide='ignore', invalid='ignore'):
+            period = where(count > 1, (last - first) / (count - 1), nan)
+        return list(sampling_rate / period)
     indices = []
     for i, _ in enumerate(signal): # Find indices of zero-crossings
         if (signal[i - 1] > 0) and (signal[i] < 0):
@@ -93,14 +125,25 @@ def pitch_from_hps(spectrum: list, sampling_rate: int, max_harmonics: int) -> fl
             which can be computationally expensive.
 
     """
-    harmonic_spectrum = spectrum.copy()
+    harmonic_spectrum = spectrum
 
     for harmonic_level in range(2, max_harmonics):
         # Downsample using anti-aliasing, = better results
-        downsampled_spectrum = decimate(spectrum, harmonic_level)
-        # Amplify any frequencies based on harmonics.
-        harmonic_spectrum[:len(downsampled_spectrum)] *= downsampled_spectrum
-
+        downsampled_spectrum = scipy_signal.decimate(spectrum, harmonic_level)
+        length = downsampled_spectrum.shape[-1]
+        if harmonic_spectrum is spectrum:
+            # Spectra may be shared read-only, so the first product is written to a new array.
+            harmonic_spectrum = empty_like(spectrum)
+            multiply(spectrum[..., :length], downsampled_spectrum,
+                     out=harmonic_spectrum[..., :length])
+            harmonic_spectrum[..., length:] = spectrum[..., length:]
+        else:
+            # Amplify any frequencies based on harmonics.
+            harmonic_spectrum[..., :length] *= downsampled_spectrum
+
+    if getattr(harmonic_spectrum, 'ndim', 1) > 1:
+        peaks = interpolate_peak(harmonic_spectrum, argmax(harmonic_spectrum, axis=-1))
+        return list(sampling_rate * peaks / (spectrum.shape[-1] * 2))
     pitch = argmax(harmonic_spectrum)
 
     interpolated_pitch = interpolate_peak(harmonic_spectrum, pitch)
@@ -111,14 +154,21 @@ def interpolate_peak(spectrum: list, peak: int) -> float:
     """ Uses quadratic interpolation of spectral peaks to get a better estimate of the peak.
 
         Args:
-            - spectrum: the frequency bin to analyze.
-            - peak: the location of the estimated peak in the spectrum list.
+            - spectrum: the frequency bin to analyze, or a (channels, bins) block.
+            - peak: the location of the estimated peak in the spectrum list,
+              or an array of the peak of each channel of a block.
 
         Based off: https://ccrma.stanford.edu/~jos/sasp/Quadratic_Interpolation_Spectral_Peaks.html
     """
-    prev_neighbour = spectrum[peak-1]
-    next_neighbour = spectrum[peak+1]
-    peak_value = spectrum[peak]
+    if getattr(spectrum, 'ndim', 1) > 1:
+        rows = arange(spectrum.shape[0])
+        prev_neighbour = spectrum[rows, peak-1]
+        next_neighbour = spectrum[rows, peak+1]
+        peak_value = spectrum[rows, peak]
+    else:
+        prev_neighbour = spectrum[peak-1]
+        next_neighbour = spectrum[peak+1]
+        peak_value = spectrum[peak]
     estimated_peak = (next_neighbour
                       - prev_neighbour) / (2 * peak_value - prev_neighbour - next_neighbour) + peak
     return abs(estimated_peak) # Only return real component.
@@ -2,18 +2,24 @@
     This module handles temporal to spectral signal conversion.
 
     INPUTS:
-        Signal: Temporal wave form.
+        Signal: Temporal wave form, or a (channels, samples) block of them.
 
     OUTPUTS:
-        Spectrum: Frequency spectrum of the input sample.
+        Spectrum: Frequency spectrum of the input sample, a spectrum per channel for blocks.
+
+    Transforms and filters work along the last axis, so a block of channels is
+    analysed in a single batched call.
 """
-from scipy.signal import butter, lfilter, fftconvolve, get_window
-from scipy.fftpack import fft
-from numpy import absolute, sum, power, log10
+from rtmaii.lazy import lazy_import
+from numpy import absolute, sum, power, log10, concatenate, zeros
+from numpy.lib.stride_tricks import sliding_window_view
 from numpy.linalg import norm
 
+scipy_signal = lazy_import('scipy.signal') # Imported once a node first filters a signal.
+fftpack = lazy_import('scipy.fftpack')
+
 def butter_bandpass(low_cut_off: int, high_cut_off: int,
-                    sampling_rate: int, order: int = 5) -> dict:
+                    sampling_rate: int, order: int = 5, dtype: str = None) -> dict:
     """ Cut out any frequencies out of the range we are interested in.
 
         Args
@@ -21,11 +27,16 @@ def butter_bandpass(low_cut_off: int, high_cut_off: int,
             - high_cut_off: upper end of bandpass filter.
             - sampling_rate: sampling rate of the signal being analysed.
             - order: magnitude of the filter created.
+            - dtype: if set, create second-order sections of this type instead,
+                i.e. 'float32', as polynomial coefficients become unstable in single precision.
     """
     nyquist_frequency = 0.5 * sampling_rate
     low = low_cut_off / nyquist_frequency
     high = high_cut_off / nyquist_frequency
-    numerator, denominator = butter(order, [low, high], btype='bandpass')
+    if dtype is not None:
+        sections = scipy_signal.butter(order, [low, high], btype='bandpass', output='sos')
+        return {'sos': sections.astype(dtype)}
+    numerator, denominator = scipy_signal.butter(order, [low, high], btype='bandpass')
     return {'numerator': numerator, 'denominator': denominator}
 
 def band_pass_filter(signal: list, numerator: list, denominator: list) -> list:
@@ -36,27 +47,74 @@ def band_pass_filter(signal: list, numerator: list, denominator: list) -> list:
             - numerator: numerator of filter.
             - denominator: denominator of filter.
     """
-    filtered_signal = lfilter(numerator, denominator, signal)
+    filtered_signal = scipy_signal.lfilter(numerator, denominator, signal)
     return filtered_signal
 
-def new_window(window_length: int, window: str) -> list:
+def decimation_factor(sampling_rate: float, target_rate: float) -> int:
+    """ Largest whole factor a signal can be decimated by, whilst staying above the target rate.
+
+        Args
+            - sampling_rate: sampling rate of the signal being decimated.
+            - target_rate: lowest sampling rate wanted after decimation.
+    """
+    return max(1, int(sampling_rate // target_rate))
+
+def decimation_filter(factor: int, dtype: str = 'float64') -> list:
+    """ Create the anti-aliasing low pass FIR taps used to decimate a signal.
+
+        The cut off is 80% of the decimated nyquist frequency,
+        leaving the filter's transition band to fall before aliasing occurs.
+
+        Args
+            - factor: factor the signal will be decimated by.
+            - dtype: type of the taps.
+    """
+    return scipy_signal.firwin(20 * factor + 1, 0.8 / factor).astype(dtype)
+
+def decimate(signal: list, taps: list, factor: int, state: tuple = None) -> tuple:
+    """ Low pass filter and downsample a chunk of a continuous signal.
+
+        Only the kept samples are filtered (polyphase decimation),
+        the end of each chunk is kept in the state so chunks join seamlessly.
+
+        Args
+            - signal: the chunk of signal to decimate.
+            - taps: FIR taps created by decimation_filter().
+            - factor: factor to decimate the signal by.
+            - state: state returned by the previous call, None for the first chunk.
+
+        Returns
+            - tuple: (decimated chunk, state to pass with the next chunk)
+    """
+    if state is None or len(state[0]) != len(taps) - 1: # New signal, or the taps changed.
+        state = (zeros(len(taps) - 1, dtype=taps.dtype), 0)
+    history, phase = state
+    extended_signal = concatenate((history, signal))
+    # Each window ends on an input sample, only every factor'th window is filtered.
+    windows = sliding_window_view(extended_signal, len(taps))[phase::factor]
+    decimated = windows @ taps[::-1]
+    state = (extended_signal[len(extended_signal) - len(history):], (phase - len(signal)) % factor)
+    return decimated, state
+
+def new_window(window_length: int, window: str, dtype: str = 'float64') -> list:
     """ Generate a new smoothing window for use.
 
         Args
             - window_length: length of window to create.
             - window: the smoothing window to be applied.
+            - dtype: type of the window, the windowed signal will be upcast to this type.
     """
-    window = get_window(window, window_length, True)
-    return window
+    window = scipy_signal.get_window(window, window_length, True)
+    return window.astype(dtype, copy=False)
 
 def convolve_signal(signal: list) -> list:
-    """ Apply convolution to the input signal.
+    """ Apply convolution to the input signal, or to each channel of a block.
 
         Args
             - signal: the signal to convolve.
     """
-    convol = fftconvolve(signal, signal[::-1], mode='full')
-    return convol[len(convol) // 2:] # Split bin in half removing negative lags.
+    convol = scipy_signal.fftconvolve(signal, signal[..., ::-1], mode='full', axes=-1)
+    return convol[..., convol.shape[-1] // 2:] # Split bin in half removing negative lags.
 
 def spectrum_transform(signal: list) -> list:
     """ Performs FFT on input signal, returns only positive half of spectrum.
@@ -64,9 +122,9 @@ def spectrum_transform(signal: list) -> list:
         Args
             - signal: the signal to perform a fourier transform on.
     """
-    signal_length = len(signal)
-    normalized_spectrum = fft(signal) / signal_length # Normalization
-    return normalized_spectrum[:signal_length // 2] # Only need half of fft output.
+    signal_length = signal.shape[-1]
+    normalized_spectrum = fftpack.fft(signal) / signal_length # Normalization
+    return normalized_spectrum[..., :signal_length // 2] # Only need half of fft output.
 
 def spectrum(signal: list,
              window: list,
@@ -74,16 +132,24 @@ def spectrum(signal: list,
     """ Return the frequency spectrum of an input signal.
 
         Args
-            - signal: the temporal signal to be converted to a spectrum.
+            - signal: the temporal signal to be converted to a spectrum,
+                or a (channels, samples) block of signals.
             - window: the smoothing window to be applied.
             - bp_filter: the bandpass filter polynomial coefficents to apply to the signal.
-                In the form of {'numerator': list, 'denominator': list}
+                In the form of {'numerator': list, 'denominator': list} or {'sos': list}
+
+        Note:
+            - A float32 signal, window and filter sections produce a complex64 spectrum.
     """
     windowed_signal = signal * window
-    filtered_signal = windowed_signal if bp_filter is None else band_pass_filter(
-        windowed_signal,
-        bp_filter['numerator'],
-        bp_filter['denominator'])
+    if bp_filter is None:
+        filtered_signal = windowed_signal
+    elif 'sos' in bp_filter:
+        filtered_signal = scipy_signal.sosfilt(bp_filter['sos'], windowed_signal)
+    else:
+        filtered_signal = band_pass_filter(windowed_signal,
+                                           bp_filter['numerator'],
+                                           bp_filter['denominator'])
     frequency_spectrum = spectrum_transform(filtered_signal)
     return frequency_spectrum
 
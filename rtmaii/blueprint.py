@@ -0,0 +1,234 @@
+""" BLUEPRINT MODULE
+
+    - This module compiles declarative hierarchy blueprints into execution plans.
+
+    A blueprint describes the nodes of a channel hierarchy and the edges between them,
+    along with each node's queue policy, analysis rate, deadline, execution mode and priority.
+    It can be a dict, or the path of a JSON or YAML file (YAML requires PyYAML).
+
+    ```yaml
+        nodes:
+          FrequencyCoordinator: {}
+          Spectrum:
+            class: SpectrumCoordinator
+            analysis_rate: 20
+          HPSWorker:
+            queue_policy: {policy: drop_newest, queue_length: 1}
+            deadline: 0.1
+        edges:
+          - [FrequencyCoordinator, Spectrum]
+          - [Spectrum, HPSWorker]
+    ```
+
+    Nodes are keyed by their node id, their class is the id if 'class' isn't given.
+    Each edge is [parent, child], nodes without a parent are children of the root.
+
+    A blueprint is validated once and compiled into a plan, a tuple of node specs with
+    parents before their children. Plans are cached, by the blueprint's contents for dicts,
+    or by its path and modification time for files, so hierarchies built from the same
+    blueprint don't validate it again, see Hierarchy.plan(). Only the CACHE_SIZE plans
+    used last are kept. Dicts holding callables, i.e. coalesce functions, can't be keyed
+    by their contents, so are compiled every time.
+"""
+import json
+import os
+from collections import OrderedDict
+from rtmaii.configuration import Config
+from rtmaii.coordinator import Coordinator
+from rtmaii.worker import Worker # Importing the inbuilt nodes registers them.
+from rtmaii.lazy import lazy_import
+from rtmaii.scheduler import EXECUTION_MODES
+from rtmaii import registry
+
+yaml = lazy_import('yaml') # Optional, only needed for YAML blueprints.
+
+BLUEPRINT_KEYS = ('nodes', 'edges')
+NODE_KEYS = ('class', 'args', 'kwargs', 'queue_policy', 'analysis_rate', 'deadline',
+             'execution', 'priority')
+RESERVED_IDS = ('root', 'block')
+CACHE_SIZE = 32
+COMPILED = OrderedDict() # Plans of blueprints that have been compiled, used last at the end.
+
+def compile_blueprint(blueprint: object) -> tuple:
+    """ Validate a blueprint and compile it into a plan, returning a cached plan if compiled.
+
+        Args:
+            - blueprint: blueprint dict, or the path of a .json, .yaml or .yml blueprint file.
+
+        Returns:
+            - tuple: spec of each node, parents before their children, in the form of
+              {'node_id': str, 'class_name': str, 'parent': str, 'init_args': tuple,
+              'kwargs': dict, 'settings': dict}. Settings hold the node's optional
+              'queue_policy', 'analysis_rate', 'deadline', 'execution' and 'priority'.
+
+        Raises:
+            - TypeError, KeyError or ValueError: if the blueprint is invalid.
+    """
+    key = __cache_key__(blueprint)
+    if key in COMPILED:
+        COMPILED.move_to_end(key)
+        return COMPILED[key]
+    plan = __compile__(load(blueprint) if isinstance(blueprint, str) else blueprint)
+    if key is not None:
+        COMPILED[key] = plan
+        if len(COMPILED) > CACHE_SIZE:
+            COMPILED.popitem(last=False)
+    return plan
+
+def load(path: str) -> dict:
+    """ Read a blueprint from a JSON or YAML file.
+
+        Args:
+            - path: path of a .json, .yaml or .yml file.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in ('.json', '.yaml', '.yml'):
+        raise ValueError('Blueprint {} should be a .json, .yaml or .yml file.'.format(path))
+    with open(path) as blueprint_file:
+        if extension == '.json':
+            return json.load(blueprint_file)
+        try:
+            return yaml.safe_load(blueprint_file)
+        except ImportError:
+            raise ImportError('PyYAML must be installed to load the YAML blueprint {}.'
+                              .format(path))
+
+def __cache_key__(blueprint: object) -> tuple:
+    """ Return the key a blueprint's plan is cached under, None if it can't be cached.
+
+        Files are keyed by their modification time too, so edited files are compiled again.
+
+        Args:
+            - blueprint: blueprint dict, or the path of a blueprint file.
+    """
+    if isinstance(blueprint, str):
+        path = os.path.abspath(blueprint)
+        return ('file', path, os.stat(path).st_mtime_ns)
+    if isinstance(blueprint, dict):
+        try:
+            return ('dict', __freeze__(blueprint))
+        except TypeError:
+            return None # Holds callables, i.e. coalesce functions.
+    raise TypeError('Blueprint should be a dict or the path of a blueprint file, not {}.'
+                    .format(type(blueprint)))
+
+def __freeze__(value: object) -> object:
+    """ Return a hashable copy of a blueprint's contents.
+
+        Args:
+            - value: blueprint, or a value within it.
+
+        Raises:
+            - TypeError: if it holds anything other than dicts, lists and JSON scalars.
+    """
+    if isinstance(value, dict):
+        return (dict, tuple(sorted(((key, __freeze__(item)) for key, item in value.items()),
+                                   key=lambda item: repr(item[0]))))
+    if isinstance(value, (list, tuple)):
+        return (list, tuple(__freeze__(item) for item in value))
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError('{} can\'t be keyed by its contents.'.format(type(value)))
+
+def __compile__(blueprint: dict) -> tuple:
+    """ Validate a blueprint, returning the spec of each node, parents before children.
+
+        Args:
+            - blueprint: blueprint to compile.
+    """
+    if not isinstance(blueprint, dict):
+        raise TypeError('Blueprint should be a dict of nodes and edges.')
+    unknown = set(blueprint) - set(BLUEPRINT_KEYS)
+    if unknown:
+        raise KeyError('Blueprint has invalid keys {}.'.format(unknown))
+    nodes = blueprint.get('nodes')
+    if not isinstance(nodes, dict) or not nodes:
+        raise TypeError('Blueprint nodes should be a dict of node ids and nodes.')
+
+    specs = {node_id: __compile_node__(node_id, node) for node_id, node in nodes.items()}
+    has_parent = set()
+    for edge in blueprint.get('edges') or ():
+        if not isinstance(edge, (list, tuple)) or len(edge) != 2:
+            raise TypeError('Edge {} should be a [parent, child] pair.'.format(edge))
+        parent_id, node_id = edge
+        if node_id not in specs:
+            raise KeyError('Child {} of edge {} is not a node of the blueprint.'
+                           .format(node_id, edge))
+        if parent_id != 'root' and parent_id not in specs:
+            raise KeyError('Parent {} of edge {} is not a node of the blueprint.'
+                           .format(parent_id, edge))
+        if node_id in has_parent:
+            raise ValueError('Node {} has more than one parent.'.format(node_id))
+        has_parent.add(node_id)
+        if parent_id != 'root' and not issubclass(
+                registry.node_class(specs[parent_id]['class_name']), Coordinator):
+            raise ValueError('Parent {} of {} is not a Coordinator, so can not have peers.'
+                             .format(parent_id, node_id))
+        specs[node_id]['parent'] = parent_id
+
+    # Order parents before their children, nodes that aren't reached are in a cycle.
+    plan = []
+    parents = ['root']
+    while parents:
+        parent_id = parents.pop(0)
+        children = [spec for spec in specs.values() if spec['parent'] == parent_id]
+        plan.extend(children)
+        parents.extend(spec['node_id'] for spec in children)
+    if len(plan) != len(specs):
+        cycle = sorted(set(specs) - {spec['node_id'] for spec in plan})
+        raise ValueError('Nodes {} form a cycle, so never receive data.'.format(cycle))
+    return tuple(plan)
+
+def __compile_node__(node_id: str, node: dict) -> dict:
+    """ Validate a node of a blueprint, returning its spec.
+
+        Args:
+            - node_id: unique id of the node.
+            - node: the node's entry in the blueprint.
+    """
+    if not isinstance(node_id, str):
+        raise TypeError('Node id {} is not of type str.'.format(node_id))
+    if node_id in RESERVED_IDS:
+        raise ValueError('Node id {} is reserved for the root of the hierarchy.'.format(node_id))
+    node = {} if node is None else node # An empty YAML mapping is loaded as None.
+    if not isinstance(node, dict):
+        raise TypeError('Node {} should be a dict.'.format(node_id))
+    unknown = set(node) - set(NODE_KEYS)
+    if unknown:
+        raise KeyError('Node {} has invalid keys {}.'.format(node_id, unknown))
+
+    class_name = node.get('class', node_id)
+    if registry.node_class(class_name) is None:
+        raise ValueError('{} does not inherit from Worker or Coordinator.'.format(class_name))
+    init_args = node.get('args', ())
+    if not isinstance(init_args, (list, tuple)):
+        raise TypeError('Args of {} is not of type list or tuple.'.format(node_id))
+    kwargs = node.get('kwargs', {})
+    if not isinstance(kwargs, dict):
+        raise TypeError('Kwargs of {} is not of type dict.'.format(node_id))
+
+    settings = {key: node[key] for key in NODE_KEYS[3:] if node.get(key) is not None}
+    if 'queue_policy' in settings:
+        Config.__validate_queue_policies__({node_id: settings['queue_policy']})
+        if (settings['queue_policy']['policy'] == 'coalesce' and
+                not callable(settings['queue_policy'].get('coalesce'))):
+            raise TypeError('The coalesce policy of {} requires a coalesce function.'
+                            .format(node_id))
+    if 'analysis_rate' in settings:
+        Config.__validate_analysis_rates__({node_id: settings['analysis_rate']})
+    if 'deadline' in settings:
+        Config.__validate_deadlines__({node_id: settings['deadline']})
+    if 'priority' in settings:
+        Config.__validate_priorities__({node_id: settings['priority']})
+    if settings.get('execution', 'thread') not in EXECUTION_MODES:
+        raise ValueError('The execution mode {} set for {} doesn\'t exist.'
+                         .format(settings['execution'], node_id))
+
+    return {
+        'node_id': node_id,
+        'class_name': class_name,
+        'parent': 'root',
+        'init_args': tuple(init_args),
+        'kwargs': kwargs,
+        'settings': settings
+    }
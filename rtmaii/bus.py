@@ -0,0 +1,269 @@
+""" BUS MODULE
+
+    - This module contains the EventBus, raising analysis signals to their callbacks.
+
+    Every chunk of audio raises several signals, i.e. 'signal', 'spectrum', 'pitch' and 'note'.
+    Pydispatch looks up the receivers of each signal through weak references on every send,
+    the EventBus precomputes a route of receivers for each signal whenever one is connected,
+    so sending a signal nobody is interested in is a single dictionary lookup.
+
+    Receivers are called with the named arguments they accept, as pydispatch does,
+    so callbacks that only accept 'data' continue to work.
+
+    Receivers connected to pydispatch directly, and signals sent through pydispatch by
+    custom nodes, are still delivered, see __bridge__. Custom nodes should raise signals
+    with rtmaii.timing.send, which sends them on the bus.
+"""
+import threading
+import weakref
+from inspect import signature, Parameter
+from pydispatch import dispatcher
+
+ANY = dispatcher.Any # Shared with pydispatch, so either can be used to match any signal or sender.
+
+class Route(object):
+    """ A receiver connected to the bus.
+
+        Args:
+            - receiver: callable to call when a matching signal is sent.
+            - signal: signal to receive, ANY to receive every signal.
+            - sender: sender to receive signals from, ANY to receive from every sender.
+            - weak: only hold a weak reference to the receiver, as pydispatch does.
+            - on_dead: function called with the route, once a weakly held receiver is deleted.
+
+        Attributes:
+            - reference: function returning the receiver, None once it has been deleted.
+            - accepts (frozenset): names of the arguments the receiver accepts, None for any.
+    """
+    def __init__(self, receiver: object, signal: object, sender: object,
+                 weak: bool, on_dead: object):
+        self.signal = signal
+        self.sender = sender
+        self.reference = lambda: receiver
+        if weak:
+            try:
+                dead = lambda _: on_dead(self)
+                if hasattr(receiver, '__self__') and hasattr(receiver, '__func__'):
+                    self.reference = weakref.WeakMethod(receiver, dead)
+                else:
+                    self.reference = weakref.ref(receiver, dead)
+            except TypeError:
+                pass # Receivers that can't be weakly referenced are held, i.e. builtins.
+        self.accepts = accepted_arguments(receiver)
+
+    def matches(self, receiver: object, signal: object, sender: object) -> bool:
+        """ Check whether the route connects a receiver, to a signal from a sender. """
+        return (self.reference() == receiver and self.signal == signal and
+                self.sender == sender)
+
+class EventBus(object):
+    """ Raises signals to the receivers connected to them, from any thread.
+
+        Attributes:
+            - lock: held whilst receivers are connected or disconnected.
+            - connected (list): every route, in the order they were connected.
+            - routes (dict): tuple of routes to call for each signal with a receiver.
+            - wildcards (tuple): routes receiving every signal,
+              used for signals without any routes of their own.
+            - watchers (list): weak references to functions called when receivers change.
+    """
+    def __init__(self):
+        # Reentrant, as deleted receivers may be removed by garbage collection whilst held.
+        self.lock = threading.RLock()
+        self.connected = []
+        self.routes = {}
+        self.wildcards = ()
+        self.watchers = []
+
+    def connect(self, receiver: object, signal: object = ANY, sender: object = ANY,
+                weak: bool = True):
+        """ Call a receiver whenever a signal is sent, connecting it again has no effect.
+
+            Args:
+                - receiver: callable to call with the named arguments it accepts,
+                  of 'signal', 'sender', 'data', 'capture' and 'latency'.
+                - signal: signal to receive, ANY to receive every signal.
+                - sender: sender to receive signals from, i.e. a channel id, ANY for every sender.
+                - weak: only hold a weak reference to the receiver, as pydispatch does.
+        """
+        with self.lock:
+            if any(route.matches(receiver, signal, sender) for route in self.connected):
+                return
+            self.connected.append(Route(receiver, signal, sender, weak, self.__remove__))
+            self.__build__()
+        self.__notify__()
+
+    def disconnect(self, receiver: object, signal: object = ANY, sender: object = ANY):
+        """ Stop calling a receiver, for the signal and sender it was connected with.
+
+            Raises
+                - KeyError: if the receiver isn't connected to the signal and sender.
+        """
+        with self.lock:
+            routes = [route for route in self.connected
+                      if route.matches(receiver, signal, sender)]
+            if not routes:
+                raise KeyError('Receiver {} is not connected to signal {}.'
+                               .format(receiver, signal))
+            self.connected.remove(routes[0])
+            self.__build__()
+        self.__notify__()
+
+    def receivers(self, signal: object) -> list:
+        """ Return the receivers a signal would be sent to, from any sender. """
+        return [route.reference() for route in self.routes.get(signal, self.wildcards)
+                if route.reference() is not None]
+
+    def subscribed(self) -> set:
+        """ Return the signals with a receiver connected, None if any receives every signal. """
+        if self.wildcards:
+            return None
+        return set(self.routes)
+
+    def watch(self, watcher: object):
+        """ Call a function whenever a receiver is connected or disconnected.
+
+            Only a weak reference is held, the watcher is called without any arguments.
+            Receivers removed by garbage collection aren't watched, as watchers would be called
+            on whichever thread happened to collect them.
+
+            Args:
+                - watcher: function or bound method to call.
+        """
+        if hasattr(watcher, '__self__') and hasattr(watcher, '__func__'):
+            reference = weakref.WeakMethod(watcher)
+        else:
+            reference = weakref.ref(watcher)
+        with self.lock:
+            self.watchers = [ref for ref in self.watchers if ref() is not None] + [reference]
+
+    def send(self, signal: str, sender: object, **named: dict):
+        """ Call each receiver of a signal, with the named arguments it accepts.
+
+            Args:
+                - signal: name of the signal to raise.
+                - sender: channel id, or name of the node raising the signal.
+                - **named: arguments of the signal, i.e. data, capture and latency.
+        """
+        routes = self.routes.get(signal, self.wildcards)
+        if not routes:
+            return
+        named['signal'] = signal
+        named['sender'] = sender
+        for route in routes:
+            if route.sender is not ANY and route.sender != sender:
+                continue
+            receiver = route.reference()
+            if receiver is None:
+                continue
+            if route.accepts is None:
+                receiver(**named)
+            else:
+                receiver(**{name: named[name] for name in route.accepts if name in named})
+
+    def __build__(self):
+        """ Precompute the routes of each signal, must be called whilst holding the lock.
+
+            Routes are replaced rather than changed, so sends never need the lock.
+        """
+        wildcards = tuple(route for route in self.connected if route.signal is ANY)
+        signals = {route.signal for route in self.connected if route.signal is not ANY}
+        self.routes = {signal: tuple(route for route in self.connected
+                                     if route.signal is ANY or route.signal == signal)
+                       for signal in signals}
+        self.wildcards = wildcards
+
+    def __notify__(self):
+        """ Call each watcher, must be called without holding the lock. """
+        for reference in self.watchers:
+            watcher = reference()
+            if watcher is not None:
+                watcher()
+
+    def __remove__(self, route: Route):
+        """ Remove the route of a weakly held receiver, once it has been deleted. """
+        with self.lock:
+            if route in self.connected:
+                self.connected.remove(route)
+                self.__build__()
+
+def accepted_arguments(receiver: object) -> frozenset:
+    """ Return the names of the arguments a receiver accepts, None if it accepts any.
+
+        Args:
+            - receiver: callable to inspect.
+    """
+    try:
+        parameters = signature(receiver).parameters.values()
+    except (TypeError, ValueError): # Can't be inspected, so is passed every argument.
+        return None
+    if any(parameter.kind == Parameter.VAR_KEYWORD for parameter in parameters):
+        return None
+    return frozenset(parameter.name for parameter in parameters
+                     if parameter.kind in (Parameter.POSITIONAL_OR_KEYWORD,
+                                           Parameter.KEYWORD_ONLY))
+
+BUS = EventBus()
+connect = BUS.connect
+disconnect = BUS.disconnect
+receivers = BUS.receivers
+watch = BUS.watch
+
+FORWARDING = threading.local() # Set whilst a signal sent on the bus is forwarded to pydispatch.
+
+def __bridge__(signal: str = None, sender: object = None, **named: dict):
+    """ Send signals raised through pydispatch directly, on to the receivers of the bus. """
+    if not getattr(FORWARDING, 'active', False):
+        BUS.send(signal, sender, **named)
+dispatcher.connect(__bridge__, ANY, ANY, weak=False)
+
+def direct_receivers() -> bool:
+    """ Check whether any receiver, other than the bridge, is connected to pydispatch. """
+    connections = dispatcher.connections
+    if len(connections) != 1:
+        return bool(connections)
+    signals = next(iter(connections.values()))
+    return len(signals) != 1 or len(next(iter(signals.values()))) != 1
+
+def direct_signals() -> set:
+    """ Return the signals receivers are connected to on pydispatch directly,
+        None if any, other than the bridge, receives every signal.
+    """
+    signals = set()
+    for sender_signals in list(dispatcher.connections.values()):
+        for signal, signal_receivers in list(sender_signals.items()):
+            if signal is not ANY:
+                signals.add(signal)
+            elif any(receiver is not __bridge__ for receiver in signal_receivers):
+                return None
+    return signals
+
+def subscribed() -> set:
+    """ Return the signals with a receiver connected, on the bus or pydispatch directly,
+        None if any receiver receives every signal.
+    """
+    signals = BUS.subscribed()
+    direct = direct_signals() if direct_receivers() else set()
+    if signals is None or direct is None:
+        return None
+    return signals | direct
+
+def listened(signal: str) -> bool:
+    """ Check whether any receiver would be sent a signal, on the bus or pydispatch. """
+    return signal in BUS.routes or bool(BUS.wildcards) or direct_receivers()
+
+def send(signal: str, sender: object, **named: dict):
+    """ Raise a signal on the bus, and to any receiver connected to pydispatch directly.
+
+        Args:
+            - signal: name of the signal to raise.
+            - sender: channel id, or name of the node raising the signal.
+            - **named: arguments of the signal, i.e. data, capture and latency.
+    """
+    BUS.send(signal, sender, **named)
+    if direct_receivers():
+        FORWARDING.active = True
+        try:
+            dispatcher.send(signal=signal, sender=sender, **named)
+        finally:
+            FORWARDING.active = False
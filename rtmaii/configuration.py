@@ -2,6 +2,17 @@
 
     Module for handling & storing configuring different analysis and audio settings.
 """
+from rtmaii.sources import SAMPLE_FORMATS
+from rtmaii.workqueue import QUEUE_POLICIES
+from rtmaii.scheduler import EXECUTION_MODES
+
+DEFAULT_PRIORITIES = { # Beat detection is the most sensitive to latency.
+    "BeatDecimationCoordinator": 1,
+    "EnergyBPMCoordinator": 1,
+    "BPMCoordinator": 1,
+    "BPMWorker": 1
+}
+
 class Config(object):
     """ Configuration class to be passed around and read during program execution.
 
@@ -17,6 +28,50 @@ class Config(object):
                     - pitch_algorithm (string): the frequency algorithm to be performed.
                       Please see the pitch module for more information on the algorithms.
 
+                    - sample_format (string): type samples are captured and analysed in,
+                      'int16' or 'float32'. float32 keeps spectral work in float32/complex64.
+
+                    - decimation (dict): lowest sampling rate (Hz) to analyse a task's
+                      signal at, in the form of "beat"/"pitch": rate, None analyses at the
+                      source's rate. Pitch is only decimated for the 'ac' and 'zc' algorithms.
+
+                    - queue_policies (dict): overflow policy of the queue of a node,
+                      in the form of "node_id": {"policy": str, "queue_length": int,
+                      "timeout": float, "coalesce": function}. See the workqueue module.
+                      Nodes run on the pool can't use the 'block' policy.
+
+                    - analysis_rates (dict): most times a second a node analyses data,
+                      in the form of "node_id": Hz. Other data is skipped.
+
+                    - deadlines (dict): seconds of audio a node's input may fall behind the
+                      newest audio queued for the node, before it is dropped rather than
+                      analysed, in the form of "node_id": seconds.
+
+                    - priorities (dict): nodes with a higher priority are sent data and
+                      scheduled first, in the form of "node_id": int. Beat nodes are 1 by default,
+                      any other node is 0. Updated, rather than replaced. Only nodes run on the
+                      pool are scheduled, others are only sent data first.
+
+                    - execution (dict): how a node is run, in the form of "node_id": mode,
+                      'thread', 'process' or 'pool'. See the scheduler module.
+
+                    - default_execution (string): how nodes without an execution mode are run,
+                      'thread' [Default] or 'pool'. 'pool' includes the root node.
+
+                    - pool_size (int): amount of threads in the pool nodes are scheduled on,
+                      this is independent of the amount of channels analysed.
+
+                    - vectorise_channels (bool): with merge_channels disabled, run a single
+                      tree of vectorised nodes, i.e. the spectrum, bands and pitch nodes, on
+                      (channels, samples) blocks, rather than a tree per channel. [Default = False]
+
+                    - demand_driven (bool): only run the inbuilt nodes whose signals have
+                      a callback, or a stream, subscribed to them. [Default = False]
+
+                    - blueprint (dict/str): hierarchy to build instead of the nodes of the
+                      tasks, a dict or the path of a JSON or YAML file, see the blueprint module.
+                      [Default = None]
+
         TODO: Finish docstring and add other settings
     """
     def __init__(self: object, **kwargs: dict):
@@ -56,6 +111,21 @@ class Config(object):
             "beat_low_cut": 60,
             "beat_low_pass": 1000,
             "frames_per_sample": 1024,
+            "sample_format": "int16",
+            "decimation": {
+                "beat": None,
+                "pitch": None
+            },
+            "queue_policies": {},
+            "analysis_rates": {},
+            "deadlines": {},
+            "priorities": dict(DEFAULT_PRIORITIES),
+            "execution": {},
+            "default_execution": "thread",
+            "pool_size": 4,
+            "demand_driven": False,
+            "vectorise_channels": False,
+            "blueprint": None,
         }
 
         self.settings = self.defaults
@@ -79,14 +149,23 @@ class Config(object):
             Note:
                 - See the base config class for possible config settings.
         """
+        self.__validate_pool_policies__(kwargs)
         for key, setting in kwargs.items():
             if key in self.settings:
                 if key == 'tasks':
                     self.__validate_tasks__(setting)
                     self.settings[key].update(setting)
+                elif key == 'decimation':
+                    self.__validate_decimation__(setting)
+                    self.settings[key].update(setting)
+                elif key == 'priorities':
+                    self.__validate_priorities__(setting)
+                    self.settings[key].update(setting)
                 else:
                     if key == 'bands':
                         self.__validate_bands__(setting)
+                    elif key == 'blueprint':
+                        self.__validate_blueprint__(setting)
                     elif key == 'block_size':
                         if setting < 4096:
                             raise ValueError("Block size must be above 4096 frames.")
@@ -98,10 +177,40 @@ class Config(object):
                             self.__validate_pitch__(setting)
                         if key == 'beat_desc_rate':
                             self.__validate_beat__(setting)
+                        if key == 'sample_format':
+                            self.__validate_format__(setting)
+                        if key == 'queue_policies':
+                            self.__validate_queue_policies__(setting)
+                        if key == 'analysis_rates':
+                            self.__validate_analysis_rates__(setting)
+                        if key == 'deadlines':
+                            self.__validate_deadlines__(setting)
+                        if key == 'execution':
+                            self.__validate_execution__(setting)
+                        if key == 'default_execution' and not setting in ('thread', 'pool'):
+                            raise ValueError("Nodes can't be run with {} by default."
+                                             .format(setting))
+                        if key == 'pool_size' and setting < 1:
+                            raise ValueError("The pool needs at least one thread.")
                     self.settings[key] = setting
             else:
                 raise KeyError("{} is not a valid configuration setting".format(key))
 
+    def __getstate__(self: object) -> dict:
+        """ Pickle the config without queue policies or Pyaudio settings,
+            when sent to a node run in a process.
+
+            Coalesce functions are often lambdas, and policies only apply to the queues
+            of the process they were set in. Once started, the Pyaudio settings hold the
+            stream callback, which is bound to the analyser and its stream.
+        """
+        state = self.__dict__.copy()
+        state['settings'] = dict(self.settings, queue_policies={})
+        state['settings'].pop('pyaudio_settings', None)
+        if self.defaults is self.settings:
+            state['defaults'] = state['settings']
+        return state
+
     def get_config(self: object, key: str) -> object:
         """ Retreive a setting from the config object.
 
@@ -182,6 +291,135 @@ class Config(object):
         if not setting in pitch_methods:
             raise ValueError("The pitch method {} set doesn't exist".format(setting))
 
+    def __validate_decimation__(self, decimation):
+        """ Perform validation on supplied decimation settings.
+
+            Args:
+                - decimation: decimation rates being set.
+        """
+        for task, rate in decimation.items():
+            if not task in self.settings['decimation']:
+                raise KeyError("{} is not a task that can be decimated".format(task))
+            if rate is not None:
+                if not isinstance(rate, (int, float)):
+                    raise TypeError("Decimation rate {} of {} is not numeric".format(rate, task))
+                if rate <= 0:
+                    raise ValueError("Decimation rate of {} must be above 0".format(task))
+
+    @staticmethod
+    def __validate_queue_policies__(setting):
+        """ Perform validation that each node's queue policy exists.
+
+            Args:
+                - setting: queue policies that were passed in.
+        """
+        for node_id, policy in setting.items():
+            if not isinstance(policy, dict):
+                raise TypeError("Queue policy of {} should be a dict.".format(node_id))
+            unknown = set(policy) - {'policy', 'queue_length', 'timeout', 'coalesce'}
+            if unknown:
+                raise KeyError("Queue policy of {} has invalid keys {}.".format(node_id, unknown))
+            if not policy.get('policy') in QUEUE_POLICIES:
+                raise ValueError("The queue policy {} set for {} doesn't exist."
+                                 .format(policy.get('policy'), node_id))
+
+    def __validate_pool_policies__(self, kwargs):
+        """ Perform validation that no node run on the pool has the 'block' queue policy.
+
+            A producer blocked on the node's queue holds a pool thread, so a pool with fewer
+            threads than the depth of the hierarchy could never run the node to free space.
+
+            Args:
+                - kwargs: settings that were passed in, checked against the current settings.
+        """
+        policies = kwargs.get('queue_policies', self.settings['queue_policies'])
+        execution = kwargs.get('execution', self.settings['execution'])
+        default = kwargs.get('default_execution', self.settings['default_execution'])
+        if not isinstance(policies, dict) or not isinstance(execution, dict):
+            return # Rejected by __validate_type__.
+        for node_id, policy in policies.items():
+            if (isinstance(policy, dict) and policy.get('policy') == 'block' and
+                    execution.get(node_id, default) == 'pool'):
+                raise ValueError("{} is run on the pool, so can't use the 'block' policy."
+                                 .format(node_id))
+
+    @staticmethod
+    def __validate_blueprint__(setting):
+        """ Perform validation of a blueprint, compiling it so hierarchies use the cached plan.
+
+            Args:
+                - setting: blueprint that was passed in, None builds the nodes of the tasks.
+        """
+        if setting is not None:
+            from rtmaii.blueprint import compile_blueprint # Blueprints are validated by Config.
+            compile_blueprint(setting)
+
+    @staticmethod
+    def __validate_analysis_rates__(setting):
+        """ Perform validation that each node's analysis rate is a positive number, or None.
+
+            Args:
+                - setting: analysis rates that were passed in.
+        """
+        for node_id, rate in setting.items():
+            if rate is None:
+                continue
+            if isinstance(rate, bool) or not isinstance(rate, (int, float)):
+                raise TypeError("Analysis rate of {} should be a number.".format(node_id))
+            if rate <= 0:
+                raise ValueError("Analysis rate of {} must be above 0Hz.".format(node_id))
+
+    @staticmethod
+    def __validate_deadlines__(setting):
+        """ Perform validation that each node's deadline is a positive number, or None.
+
+            Args:
+                - setting: deadlines that were passed in.
+        """
+        for node_id, deadline in setting.items():
+            if deadline is None:
+                continue
+            if isinstance(deadline, bool) or not isinstance(deadline, (int, float)):
+                raise TypeError("Deadline of {} should be a number.".format(node_id))
+            if deadline <= 0:
+                raise ValueError("Deadline of {} must be above 0 seconds.".format(node_id))
+
+    @staticmethod
+    def __validate_priorities__(setting):
+        """ Perform validation that each node's priority is an int.
+
+            Args:
+                - setting: priorities that were passed in.
+        """
+        if not isinstance(setting, dict):
+            raise TypeError("Priorities should be a dict of node ids and ints.")
+        for node_id, priority in setting.items():
+            if isinstance(priority, bool) or not isinstance(priority, int):
+                raise TypeError("Priority of {} should be an int.".format(node_id))
+
+    @staticmethod
+    def __validate_execution__(setting):
+        """ Perform validation that each node's execution mode exists.
+
+            Args:
+                - setting: execution modes that were passed in.
+        """
+        for node_id, mode in setting.items():
+            if not mode in EXECUTION_MODES:
+                raise ValueError("The execution mode {} set for {} doesn't exist."
+                                 .format(mode, node_id))
+
+    @staticmethod
+    def __validate_format__(setting):
+        """ Perform validation that the sample format can be analysed.
+
+            Args:
+                - setting: sample format that was passed in.
+        """
+        if not setting in SAMPLE_FORMATS:
+            raise ValueError("The sample format {} is not supported, use one of {}"
+                             .format(setting, SAMPLE_FORMATS))
+
     @staticmethod
     def __validate_beat__(setting):
         if setting <= 0:
@@ -11,12 +11,13 @@
 """
 import threading
 import logging
-import time
-from rtmaii.workqueue import WorkQueue
+from rtmaii.workqueue import WorkQueue, read_only
 from rtmaii.analysis import spectral, bpm
-from pydispatch import dispatcher
-from scipy.signal import resample
-from numpy import mean, int16, pad, column_stack, arange
+from rtmaii.sources import convert_samples
+from rtmaii.timing import send, send_channels, RateLimiter
+from rtmaii.scheduler import start_node, join_node, add_by_priority
+from rtmaii import registry
+from numpy import zeros, empty_like, float32, column_stack, arange, concatenate
 
 LOGGER = logging.getLogger()
 class Coordinator(threading.Thread):
@@ -29,10 +30,18 @@ class Coordinator(threading.Thread):
             - peer_list (list): List of peer threads to communicate processed data with.
             - channel_id (int): id of channel being analysed.
             - config (Config): Configuration object of library to fetch analysis values from.
+            - priority (int): nodes with a higher priority are sent data and scheduled first.
+            - SIGNALS (tuple): signals the coordinator raises, None if unknown,
+              see Hierarchy.plan.
+            - VECTORISED (bool): whether the coordinator analyses (channels, samples) blocks,
+              see the 'vectorise_channels' setting.
 
         Args:
             - queue_length (int): Maximum length of a coordinator's queue, helps to cull items.
     """
+    SIGNALS = None # Custom coordinators may raise any signal, so are never pruned.
+    VECTORISED = False
+
     def __init__(self, config: object = None, channel_id: int = None, queue_length: int = None):
         threading.Thread.__init__(self, args=(), kwargs=None)
         self.setDaemon(True)
@@ -40,33 +49,64 @@ class Coordinator(threading.Thread):
         self.queue = WorkQueue(queue_length)
         self.peer_list = []
         self.config = config
+        self.priority = 0
         self.reset_attributes()
-        self.start()
+        start_node(self)
+
+    def __init_subclass__(cls, **kwargs: dict):
+        """ Register every subclass, however deep, so the hierarchy can create it by name. """
+        super().__init_subclass__(**kwargs)
+        registry.register(cls)
 
     def run(self):
         """ Executed after the thread is started, holds tasks for the thread to run. """
         raise NotImplementedError("Run should be implemented")
 
     def message_peers(self, data: object):
-        """ Sends input data to each peered thread.
+        """ Sends input data to each peered thread, with the capture of the data last received.
+
+            Every peer is sent the same object, arrays are made read-only first,
+            so peers must copy an array before writing to it. See the workqueue module.
 
             Args:
                 - data: The data to send to each peer.
         """
+        read_only(data)
+        self.queue.sent += len(self.peer_list)
         for peer in self.peer_list:
-            peer.queue.put(data)
+            peer.queue.put(data, self.queue.capture)
 
     def reset_attributes(self):
         """ Inherited method, override to reset attributes on configuration changes. """
         pass
 
+    def set_hop(self, hop: float = None):
+        """ Analyse data at most once every hop frames of the source, skipping other items.
+
+            Args:
+                - hop: frames between analyses, every item is analysed if None.
+        """
+        self.queue.set_hop(hop)
+
+    def stop(self):
+        """ Stop the node, its run loop ends once it has finished its current item. """
+        self.queue.close()
+
+    def join(self, timeout: float = None):
+        """ Wait for the node to stop, see stop().
+
+            Args:
+                - timeout: maximum time in seconds to wait, waits forever if None.
+        """
+        join_node(self, timeout)
+
     def add_peer(self, thread_obj: str):
-        """ Add a thread to the peer_list
+        """ Add a thread to the peer_list, peers with a higher priority are messaged first.
 
             Args:
                 - thread_obj: thread to add.
         """
-        self.peer_list.append(thread_obj)
+        add_by_priority(self.peer_list, thread_obj)
 
     def remove_peer(self, thread_id: str):
         """ Remove a thread from the peer_list
@@ -91,38 +131,237 @@ class RootCoordinator(Coordinator):
             - merge_channels (bool): Merge channel data by averaging.
             - channels (int): number of channels of the audio source being analysed.
             - frame_size (int): size of frames received in each sample.
+            - sample_format (str): type samples are converted to before analysis.
+            - ring (ndarray): preallocated slots of interleaved samples, (RING_SLOTS, frame_size).
+            - merged (ndarray): preallocated slots of merged samples, (RING_SLOTS, frames).
+            - accumulator (ndarray): float32 buffer channels are averaged in.
+            - slot (int): index of the next ring slot to write to.
+            - block_peer_list (list): peers sent every channel's signal as one
+              (channels, frames) block, see the 'vectorise_channels' setting.
+            - lapped (int): amount of times a peer fell RING_SLOTS samples behind,
+              so the ring was replaced rather than overwritten.
+            - routes (list): peers of each channel, paired with their marks,
+              cached from peer_list by update_peers().
+            - block_route (tuple): peers of block_peer_list, paired with their marks.
+            - peers (tuple): every peer of routes and block_route, paired with its marks.
+              The marks of a peer hold the WorkQueue.appended of its queue once it was sent
+              each slot's signal, 0 if it wasn't, see __lagging__.
+            - lock (Lock): held whilst a slot is taken, or the ring or peers are replaced.
+
+        Notes:
+            - Channel signals are views of a ring slot, so no memory is allocated per sample.
+              A slot is reused RING_SLOTS samples later, unless a peer still has one of its
+              signals queued or is processing it. The ring is then replaced with a new one,
+              the old ring is freed once its signals are no longer used.
+            - Callbacks of the 'signal' signal are sent views too, so must copy any they keep.
+            - Peers are sent samples from a cached list, so update_peers() must be called
+              whenever peer_list or block_peer_list are changed.
     """
+    SIGNALS = ('signal',)
+
+    RING_SLOTS = 32
+
     def __init__(self, **kwargs: dict):
         LOGGER.info('Coordinator Initialized.')
+        self.block_peer_list = []
+        self.lapped = 0
+        self.lock = threading.Lock()
+        self.peers, self.routes, self.block_route = (), [], ()
         Coordinator.__init__(self, kwargs['config'])
 
+    def update_peers(self):
+        """ Cache the peers of every channel, once peer_list or block_peer_list are changed.
+
+            Peers that are kept, keep the marks of the signals they were sent.
+        """
+        with self.lock:
+            previous = {id(peer): marks for peer, marks in self.peers}
+            def route(peers: list) -> tuple:
+                """ Pair each peer with its marks. """
+                return tuple((peer, previous.get(id(peer)) or [0] * self.RING_SLOTS)
+                             for peer in peers)
+            self.routes = [route(channel_peers) for channel_peers in self.peer_list]
+            self.block_route = route(self.block_peer_list)
+            self.peers = sum(self.routes, ()) + self.block_route
+
     def reset_attributes(self):
         """ Reset object attributes, to latest config values. """
-        self.merge_channels = self.config.get_config('merge_channels')
-        self.channels = self.config.get_config('channels')
-        self.frame_size = self.config.get_config('frames_per_sample') * self.channels
+        with self.lock: # Between samples, so the ring isn't replaced whilst being written.
+            self.merge_channels = self.config.get_config('merge_channels')
+            self.channels = self.config.get_config('channels')
+            self.frame_size = self.config.get_config('frames_per_sample') * self.channels
+            self.sample_format = self.config.get_config('sample_format')
+            frames = self.frame_size // self.channels
+            self.ring = zeros((self.RING_SLOTS, self.frame_size), dtype=self.sample_format)
+            # Sum of 16 bit samples fits exactly in float32's mantissa for up to 256 channels.
+            self.accumulator = zeros(frames, dtype=float32)
+            self.merged = zeros((self.RING_SLOTS, frames), dtype=self.sample_format)
+            self.__clear_marks__()
+            self.slot = 0
 
     def run(self):
         """ RUN PROCESS
             1. Get signal data.
-            2. Zero pad signal data to be equal to frame_size.
-            3. Extract each channel's signal.
+            2. Convert signal data into the next ring slot, zero padding it to frame_size.
+               The ring is replaced first, if a peer still uses the slot's signals.
+            3. Extract each channel's signal as a view of the slot.
             4. (Optional): Average channel data, controlled by config.
             5. Send channel signals to peers.
+            6. (Optional): Send every channel signal as a block, to vectorised peers.
         """
         while True:
             signal = self.queue.get()
-            signal = pad(signal, (0, self.frame_size - len(signal)), 'constant')
+            capture = self.queue.capture
+            with self.lock: # Only whilst taking a slot, as sending may wait on peers.
+                slot = self.slot % self.RING_SLOTS
+                self.slot = slot + 1
+                if self.__lagging__(slot):
+                    LOGGER.debug('A peer is %d samples behind, replacing the ring.',
+                                 self.RING_SLOTS)
+                    self.lapped += 1
+                    self.ring, self.merged = empty_like(self.ring), empty_like(self.merged)
+                    self.__clear_marks__()
+                ring, merged, accumulator = self.ring, self.merged, self.accumulator
+                channels, merge_channels = self.channels, self.merge_channels
+                sample_format = self.sample_format
+                routes, block_route = self.routes, self.block_route
+
+            frame = ring[slot]
+            length = min(len(signal), len(frame)) # Samples beyond frame_size are dropped.
+            convert_samples(signal[:length], sample_format, frame[:length])
+            frame[length:] = 0
+
+            # Deinterleave, each column of the view is a channel's signal.
+            frame = frame.reshape(-1, channels)
+            if merge_channels and channels > 1:
+                frame.sum(axis=1, dtype=float32, out=accumulator)
+                accumulator *= 1 / channels
+                merged[slot] = accumulator # Truncated towards zero for int16, as before.
+                channel_signals = (merged[slot],)
+            else:
+                channel_signals = frame.T
 
-            channel_signals = [signal[channel::self.channels] for channel in range(self.channels)]
+            for index, channel_signal in enumerate(channel_signals):
+                read_only(channel_signal)
+                if index < len(routes):
+                    self.__send_peers__(routes[index], slot, channel_signal, capture)
+                send('signal', index, channel_signal, capture)
+            if block_route and not merge_channels:
+                block = read_only(frame.T) # A view, each row is a channel.
+                self.__send_peers__(block_route, slot, block, capture)
 
-            if self.merge_channels:
-                channel_signals = [mean(channel_signals, axis=0, dtype=int16)]
+    def __send_peers__(self, route: tuple, slot: int, data: object, capture: object):
+        """ Send a view of a slot to peers, marking the slot as used by each peer it's put on.
 
-            for index, channel_signal in enumerate(channel_signals):
-                for peer in self.peer_list[index]:
-                    peer.queue.put(channel_signal)
-                dispatcher.send(signal='signal', sender=index, data=channel_signal)
+            Args:
+                - route: each peer to send to, paired with its marks.
+                - slot: index of the slot the data is a view of.
+                - data: data to send.
+                - capture: capture of the samples the data is from.
+        """
+        self.queue.sent += len(route)
+        for peer, marks in route:
+            # Only the root puts onto its peers' queues, so appended counts the data too.
+            marks[slot] = peer.queue.appended if peer.queue.put(data, capture) else 0
+
+    def __lagging__(self, slot: int) -> bool:
+        """ Check whether any peer still has a signal of a ring slot queued, or is processing it.
+            Must be called whilst holding the lock.
+
+            A peer's mark of a slot is the amount of items appended to its queue, once it was
+            put on. The signal is used until the queue has released that many, so nothing
+            is scanned, see WorkQueue.released.
+
+            Args:
+                - slot: index of the slot about to be written to.
+        """
+        return any(peer.queue.released < marks[slot] for peer, marks in self.peers)
+
+    def __clear_marks__(self):
+        """ Mark every slot as unused, once the ring is replaced. Must hold the lock. """
+        for _, marks in self.peers:
+            marks[:] = [0] * self.RING_SLOTS
+
+class DecimatedConfig(object):
+    """ View of a configuration object, as seen by nodes analysing a decimated signal.
+
+        The sampling rate is divided by the decimation factor, frames_per_sample and
+        block_size are divided too, so each covers the same length of time as before.
+        Any other setting is read from the original configuration.
+
+        Args:
+            - config: configuration object of the decimating coordinator.
+            - target_rate: lowest sampling rate wanted after decimation (Hz).
+    """
+    SCALED_SETTINGS = ('frames_per_sample', 'block_size')
+
+    def __init__(self, config: object, target_rate: float):
+        self.config = config
+        self.target_rate = target_rate
+
+    def factor(self) -> int:
+        """ Factor the signal is decimated by, at the current sampling rate. """
+        return spectral.decimation_factor(self.config.get_config('sampling_rate'),
+                                          self.target_rate)
+
+    def get_config(self, key: str) -> object:
+        """ Retreive a setting, adjusted for the decimated signal.
+
+            Args:
+                - key: the key of the setting.
+        """
+        value = self.config.get_config(key)
+        if key == 'sampling_rate':
+            return value / self.factor()
+        if key in self.SCALED_SETTINGS:
+            return value // self.factor()
+        return value
+
+class DecimationCoordinator(Coordinator):
+    """ Decimation coordinator responsible for feeding its peers a lower sample rate signal.
+
+        Tasks such as beat detection and time based pitch estimation only need low frequencies,
+        so running their subtree at a lower rate cuts the cost of their filters and convolutions.
+
+        Kwargs:
+            - target_rate (float): lowest sampling rate wanted after decimation (Hz).
+
+        Attributes:
+            - channel_id (int): The ID of the channel being analysed. (Inherited)
+            - peer_list (list): List of peer threads to communicate processed data with. (Inherited)
+            - config (obj): Configuration object to fetch analysis settings from. (Inherited)
+            - child_config (DecimatedConfig): configuration given to nodes added as peers.
+            - factor (int): factor the signal is decimated by, 1 passes the signal through.
+            - taps (ndarray): anti-aliasing filter of the decimation.
+            - state (tuple): end of the previous chunk, so chunks are decimated seamlessly.
+
+        Notes:
+            - The signal is decimated by a whole factor, so the rate may be above target_rate.
+            - Chunks may differ in length by a sample, when frames_per_sample isn't
+              a multiple of the factor.
+    """
+    SIGNALS = ()
+
+    def __init__(self, **kwargs: dict):
+        self.child_config = DecimatedConfig(kwargs['config'], kwargs['target_rate'])
+        Coordinator.__init__(self, kwargs['config'], kwargs['channel_id'])
+
+    def reset_attributes(self):
+        """ Reset object attributes, to latest config values. """
+        sample_format = self.config.get_config('sample_format')
+        self.factor = self.child_config.factor()
+        self.taps = spectral.decimation_filter(
+            self.factor, 'float32' if sample_format == 'float32' else 'float64')
+        self.state = None
+
+    def run(self):
+        """ Decimate each chunk of the signal before transmitting to peers. """
+        while True:
+            signal = self.queue.get()
+            factor, taps = self.factor, self.taps
+            if factor > 1:
+                signal, self.state = spectral.decimate(signal, taps, factor, self.state)
+            self.message_peers(signal)
 
 class FrequencyCoordinator(Coordinator):
     """ Frequency coordinator responsible for extending signal data before further analysis.
@@ -131,28 +370,49 @@ class FrequencyCoordinator(Coordinator):
             - channel_id (int): The ID of the channel being analysed. (Inherited)
             - peer_list (list): List of peer threads to communicate processed data with. (Inherited)
             - config (obj): Configuration object to fetch analysis settings from. (Inherited)
-            - extended_signal (list): Aggregated signal samples over time.
+            - extended_signal (ndarray): Aggregated signal samples over time,
+              (channels, samples) when extending blocks.
             - block_size (int): Threshold of extended_signal length, before messaging.
+            - limiter (RateLimiter): decides when the next block is due, see set_hop().
 
         Notes:
             - Peers created are dependent on configured tasks and algorithms.
+            - Every chunk is needed to extend the signal, so a hop limits how often blocks
+              are messaged, rather than skipping chunks.
     """
+    SIGNALS = ()
+    VECTORISED = True
+
     def __init__(self, **kwargs: dict):
+        self.limiter = RateLimiter()
         Coordinator.__init__(self, kwargs['config'], kwargs['channel_id'])
-        self.extended_signal = []
+
+    def set_hop(self, hop: float = None):
+        """ Message a block at most once every hop frames of the source.
+
+            Args:
+                - hop: frames between blocks, a block is messaged for every chunk if None.
+        """
+        if hop != self.limiter.hop:
+            self.limiter = RateLimiter(hop)
 
     def reset_attributes(self):
         """ Reset object attributes, to latest config values. """
         self.frequency_resolution = self.config.get_config('block_size')
-        self.extended_signal = []
+        self.extended_signal = zeros(0, dtype=self.config.get_config('sample_format'))
 
     def run(self):
         """ Extend signal data to configured resolution before transmitting to peers. """
         while True:
             data = self.queue.get_all()
-            self.extended_signal.extend(data)
-            self.extended_signal = self.extended_signal[-self.frequency_resolution:]
-            if len(self.extended_signal) >= self.frequency_resolution:
+            if self.extended_signal.shape[:-1] != data.shape[:-1]: # Amount of channels changed.
+                self.extended_signal = zeros(data.shape[:-1] + (0,),
+                                             dtype=self.extended_signal.dtype)
+            # A new array each time, so peers can keep the signal they were sent.
+            self.extended_signal = concatenate((self.extended_signal, data), axis=-1)
+            self.extended_signal = self.extended_signal[..., -self.frequency_resolution:]
+            if (self.extended_signal.shape[-1] >= self.frequency_resolution and
+                    self.limiter.due(self.queue.capture)):
                 self.message_peers(self.extended_signal)
 
 class SpectrumCoordinator(Coordinator):
@@ -168,16 +428,26 @@ class SpectrumCoordinator(Coordinator):
 
         Notes:
             - Peers created are dependent on configured tasks and algorithms.
+            - When analysing float32 samples, the window and filter are float32,
+              so the spectrum is created in complex64.
     """
+    SIGNALS = ('spectrum',)
+    VECTORISED = True
+
     def __init__(self, **kwargs: dict):
         Coordinator.__init__(self, kwargs['config'], kwargs['channel_id'], 1)
 
     def reset_attributes(self):
         """ Reset object attributes, to latest config values. """
         frequency_resolution = self.config.get_config('block_size')
+        sample_format = self.config.get_config('sample_format')
         self.sampling_rate = self.config.get_config('sampling_rate')
-        self.window = spectral.new_window(frequency_resolution, 'hanning')
-        self.filter = spectral.butter_bandpass(60, 18000, self.sampling_rate, 5)
+        if sample_format == 'float32':
+            self.window = spectral.new_window(frequency_resolution, 'hann', sample_format)
+            self.filter = spectral.butter_bandpass(60, 18000, self.sampling_rate, 5, sample_format)
+        else:
+            self.window = spectral.new_window(frequency_resolution, 'hann')
+            self.filter = spectral.butter_bandpass(60, 18000, self.sampling_rate, 5)
 
     def run(self):
         """ Convert input signal into it's frequency spectrum equivalent. """
@@ -185,7 +455,8 @@ class SpectrumCoordinator(Coordinator):
             signal = self.queue.get()
             frequency_spectrum = spectral.spectrum(signal, self.window, self.filter)
             self.message_peers(frequency_spectrum)
-            dispatcher.send(signal='spectrum', sender=self.channel_id, data=frequency_spectrum)
+            send_channels('spectrum', self.channel_id, frequency_spectrum, self.queue.capture,
+                          signal.ndim > 1)
 
 class FFTSCoordinator(Coordinator):
     """ FFTS coordinator responsible for creating and collect 128 spectrums
@@ -206,30 +477,34 @@ class FFTSCoordinator(Coordinator):
         Notes:
             - Peers created are dependent on configured tasks and algorithms.
     """
+    SIGNALS = ('spectrogram',)
+
 
     def __init__(self, **kwargs: dict):
         """ Reset object attributes, to latest config values. """
         Coordinator.__init__(self, kwargs['config'], kwargs['channel_id'])
         frame_size = self.config.get_config('frames_per_sample')
-        self.window = spectral.new_window(frame_size, 'hanning')
+        sample_format = self.config.get_config('sample_format')
+        self.window = spectral.new_window(frame_size, 'hann',
+                                          'float32' if sample_format == 'float32' else 'float64')
         self.spectrogram_resolution = 128
         self.timer = 0
+        self.ffts = []
 
     def run(self):
         """ Reset object attributes, to latest config values. """
-        ffts = []
         while True:
 
             fft = self.queue.get()
             if fft is not None:
                 fft = spectral.spectrum(fft, self.window, None)
                 fft = spectral.normalizorFFT(fft)
-                ffts.append(fft)
-                ffts = ffts[-self.spectrogram_resolution:]
+                # A new list each time, so peers can keep the spectra they were sent.
+                self.ffts = (self.ffts + [read_only(fft)])[-self.spectrogram_resolution:]
                 self.timer = self.timer + 1
-                if self.timer ==  self.spectrogram_resolution:      
-                    self.message_peers(ffts.copy())       
-                    dispatcher.send(signal='spectrogram', sender='spectrogram', data=ffts)
+                if self.timer ==  self.spectrogram_resolution:
+                    self.message_peers(self.ffts)
+                    send('spectrogram', 'spectrogram', self.ffts, self.queue.capture)
                     self.timer = 0
 
 class SpectrogramCoordinator(Coordinator):
@@ -245,6 +520,8 @@ class SpectrogramCoordinator(Coordinator):
         Notes:
             - Peers created are dependent on configured tasks and algorithms.
     """
+    SIGNALS = ('spectogramData',)
+
     def __init__(self, **kwargs: dict):
         Coordinator.__init__(self, kwargs['config'], kwargs['channel_id'])
         frame_size = self.config.get_config('frames_per_sample')
@@ -272,7 +549,7 @@ class SpectrogramCoordinator(Coordinator):
             spectrodata = [stime, smallerfreq, smallerffts]
 
             self.message_peers(spectrodata)
-            dispatcher.send(signal='spectogramData', sender=self.channel_id, data=spectrodata)
+            send('spectogramData', self.channel_id, spectrodata, self.queue.capture)
 
 
 class BPMCoordinator(Coordinator):
@@ -280,11 +557,11 @@ class BPMCoordinator(Coordinator):
 
 
     """
+    SIGNALS = ('beats',)
+
     def __init__(self, **kwargs: dict):
         Coordinator.__init__(self, kwargs['config'], kwargs['channel_id'])
         LOGGER.info('BPM Initialized. Descrate:' + str(self.descrate))
-        self.threshold = 0
-        self.timelast = time.clock()
 
 
     def reset_attributes(self):
@@ -294,27 +571,29 @@ class BPMCoordinator(Coordinator):
         self.low_pass = self.config.get_config('beat_low_pass')
         self.beats = []
         self.hbeats = []
-        self.timelast = time.clock()
+        self.position = 0 # Samples analysed, used to time beats independently of playback speed.
+        self.timelast = 0
         self.threshold = 0
         self.filter = bpm.lowpass(self.low_cut, self.low_pass, self.sampling_rate)
 
     def run(self):
         while True:
-            self.threshold -= self.descrate
             rawdata = self.queue.get()
+            self.threshold -= self.descrate
+            self.position += len(rawdata)
             data = bpm.applylowpass(rawdata, self.filter['num'], self.filter['denom'])
             beat = bpm.beatdetection(data, self.threshold)
             if beat != False:
-                beattime = time.clock()
+                beattime = self.position / self.sampling_rate
                 self.beats.append(beattime - self.timelast)
                 self.timelast = beattime
                 beatdata = [self.beats]
                 self.message_peers(beatdata)
                 self.threshold = beat
                 LOGGER.info('BEAT:' + str(self.threshold))
-                dispatcher.send(signal='beats', sender=self.channel_id, data=True)
+                send('beats', self.channel_id, True, self.queue.capture)
             else:
-                dispatcher.send(signal='beats', sender=self.channel_id, data=False)
+                send('beats', self.channel_id, False, self.queue.capture)
             #       add timeinterval from previous occurence of a beat to beats list.
             #       bpm = calculate average time interval
 
@@ -322,33 +601,35 @@ class EnergyBPMCoordinator(Coordinator):
     """Coordinator responsible for finding beats and estimating bpm
 
    """
+    SIGNALS = ('beats',)
+
     def __init__(self, **kwargs: dict):
         Coordinator.__init__(self, kwargs['config'], kwargs['channel_id'])
         LOGGER.info('Energy BPM Initialized.')
-        self.threshold = 0
-        self.timelast = time.clock()
-        self.energyhistory = []
 
     def reset_attributes(self):
         self.descrate = self.config.get_config('beat_desc_rate')
+        self.sampling_rate = self.config.get_config('sampling_rate')
         self.energyhistory = []
         self.beats = []
-        self.timelast = time.clock()
+        self.position = 0 # Samples analysed, used to time beats independently of playback speed.
+        self.timelast = 0
         self.threshold = 0
 
     def run(self):
         while True:
             data = self.queue.get()
+            self.position += len(data)
             #as soon as there is enough energy history, start the analysis
             newamp = bpm.getrmsamp(data)
             if len(self.energyhistory) >= 43:
                 LOGGER.info('Enough samples')
                 beat = bpm.energydetect(newamp, self.energyhistory)
                 if beat != False:
-                    beattime = time.clock()
+                    beattime = self.position / self.sampling_rate
                     self.beats.append(beattime - self.timelast)
                     self.timelast = beattime
                     beatdata = [self.beats]
                     self.message_peers(beatdata)
-                dispatcher.send(signal='beats', sender=self.channel_id, data=beat)
+                send('beats', self.channel_id, beat, self.queue.capture)
             self.energyhistory = bpm.shiftenergyhistory(newamp, self.energyhistory)
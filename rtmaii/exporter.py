@@ -1,8 +1,7 @@
 import threading
 import os
-from rtmaii.workqueue import WorkQueue
+from rtmaii.workqueue import WorkQueue, Stopped
 import _pickle as cPickle
-from pydispatch import dispatcher
 import pickle
 
 
@@ -23,7 +22,10 @@ class Exporter(threading.Thread):
 
     def run(self):
         while True:
-            spectrumData = self.queue.get()
+            try:
+                spectrumData = self.queue.get()
+            except Stopped:
+                return # Closed by the hierarchy, see Hierarchy.stop.
             self.spectrumCollection.append(spectrumData)
             with open(os.path.join(os.path.dirname(__file__),'../CNN/save.p'), "wb")  as output_file:  
                 pickle.dump(self.spectrumCollection, output_file)
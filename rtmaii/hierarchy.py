@@ -11,14 +11,28 @@
     - The root node is fixed, and can't be removed.
     - Debugging the structure isn't easy atm, as the structure is dumped out as a string.
 
+    The nodes of the tasks can be replaced by a declarative blueprint, see the blueprint module.
+    Nodes are created by the name they are registered under, see the registry module.
+
     For detailed information on configuring the Hierachy, please see our Readme on our Github.
     https://github.com/RTMAAI/CO600-Musical-Analysis
 """
 import logging
+import json
+import threading
+from rtmaii import bus, registry
+from rtmaii.blueprint import compile_blueprint
+from rtmaii.configuration import DEFAULT_PRIORITIES
 from rtmaii.coordinator import Coordinator
-from rtmaii.worker import Worker
-from rtmaii.exporter import Exporter
+from rtmaii.worker import Worker # Importing the inbuilt nodes registers them.
+from rtmaii.scheduler import Scheduler, scheduling, is_running, add_by_priority
+from rtmaii.lazy import lazy_import
 LOGGER = logging.getLogger()
+exporter = lazy_import('rtmaii.exporter') # Imported once spectrograms are first exported.
+process = lazy_import('rtmaii.process') # Imported once a node is first run in a process.
+# Stats of each node's queue, returned by queue_stats().
+QUEUE_COUNTERS = ('policy', 'queue_length', 'depth', 'enqueued', 'processed', 'dropped',
+                  'coalesced', 'stale', 'skipped')
 class Hierarchy(object):
     """ Builds a hierarchy for the musical analysis tasks.
 
@@ -26,6 +40,14 @@ class Hierarchy(object):
             config (Config): Configuration object of library to pass to nodes.
             custom_nodes (list):
             root (dict): multi-level dictionary storing hierarchy configuration.
+            scheduler (Scheduler): pool nodes with the 'pool' execution mode are run on,
+                created when the first of these nodes is added.
+            demand (frozenset): inbuilt signals subscribed to when the hierarchy was built,
+                None if every signal is, see plan().
+            exporters (dict): exporter of each node exporting spectrograms, shared by every
+                channel, closed by the hierarchy once the node is removed from every channel.
+            lock (RLock): held whilst the hierarchy is changed or data is pushed to it,
+                as demand changes reconfigure it on whichever thread connected a receiver.
     """
     def __init__(self, config: object, custom_nodes: list):
         self.config = config
@@ -43,111 +65,239 @@ class Hierarchy(object):
                     'kwargs': value['kwargs'] if 'kwargs' in value else {},
                 }
                 __validate_node__(self.custom_nodes[key])
+        self.lock = threading.RLock()
         self.reset_hierarchy()
+        bus.watch(self.update_demand)
 
     def reset_hierarchy(self):
         """ Reset hierarchy back to library defaults based on config settings.
             This is quite expensive, as we need to rebuild the entire hierarchy.
 
-            This method is mainly reserved for changes with amount of channels
-            being analysed and initial creation of the hierarchy.
+            This method is mainly reserved for initial creation of the hierarchy,
+            see reconfigure() to apply changes to tasks without a rebuild.
+
+            Nodes of the previous hierarchy are stopped, so their threads don't leak.
         """
-        LOGGER.debug('Creating new hierarchy.')
-        self.root = {
-            'channels': []
-        }
-        self.root['thread'] = node_factory('RootCoordinator', **{'config': self.config})
-        self.root['peer_list'] = self.root['thread'].peer_list
-        self.channels = (
-            1 if self.config.get_config('merge_channels') else self.config.get_config('channels')
-        )
-
-        for channel in range(self.channels):
-            self.root['channels'].append({'root':{'peer_list': []}})
-            self.root['peer_list'].append(self.root['channels'][channel]['root']['peer_list'])
-
-        self.default_hierarchy()
-        for key, value in self.custom_nodes.items():
-            self.add_node(value['class_name'], key, value['parent'],
-                          *value['init_args'], **value['kwargs'])
-        # Cleanup Hierarchy, removing any of our Coordinators that didn't have a child attached.
-        self.clean_hierarchy()
-        LOGGER.debug('Created hierarchy with config: %s', self.root)
-
-    def default_hierarchy(self):
-        """ Create hierarchy tree based on task config provided with the library. """
-        LOGGER.debug('Adding inbuilt nodes based on tasks configured.')
+        with self.lock:
+            if hasattr(self, 'root'):
+                self.stop()
+            LOGGER.debug('Creating new hierarchy.')
+            self.root = {
+                'channels': []
+            }
+            self.scheduler = None
+            self.exporters = {}
+            self.root['thread'] = node_factory('RootCoordinator',
+                                               scheduler=self.__scheduler__('root'),
+                                               **{'config': self.config})
+            __apply_queue_policy__(self.config, 'root', self.root['thread'])
+            __apply_deadline__(self.config, 'root', self.root['thread'])
+            self.root['peer_list'] = self.root['thread'].peer_list
+            self.channels = 0
+            self.reconfigure()
+            LOGGER.debug('Created hierarchy with config: %s', self.root)
+
+    def reconfigure(self):
+        """ Bring the hierarchy in line with the config, only changing the nodes that differ.
+
+            Nodes no longer planned, or whose class, parent, arguments, execution or priority
+            have changed, are removed along with their children. Planned nodes that are missing
+            are added. Every other node keeps running with the state it has built up,
+            i.e. the FrequencyCoordinator's signal and the EnergyBPMCoordinator's history.
+
+            Channel trees are added or removed when the amount of channels analysed changes.
+            Vectorised nodes are only added to the first channel tree, below its 'block' entry,
+            which is sent every channel's signal at once by the root.
+        """
+        with self.lock:
+            plan = self.plan()
+            channels = (1 if self.config.get_config('merge_channels')
+                        else self.config.get_config('channels'))
+            root = self.root['thread']
+            while len(self.root['channels']) < channels:
+                peer_list = []
+                self.root['channels'].append({'root': {'peer_list': peer_list}})
+                self.root['peer_list'].append(peer_list)
+
+            planned = {spec['node_id']: spec for spec in plan}
+            for channel in range(channels):
+                channel_hierarchy = self.root['channels'][channel]
+                for node_id in list(channel_hierarchy):
+                    node = channel_hierarchy.get(node_id, {}) # Children of removed nodes are gone.
+                    if 'thread' in node and node['spec'] != planned.get(node_id):
+                        self.__detach__(channel, node_id)
+            if any(spec.get('block') for spec in plan):
+                self.root['channels'][0].setdefault('block', {'peer_list': root.block_peer_list})
+            else:
+                self.root['channels'][0].pop('block', None)
+            for spec in plan:
+                missing = [channel for channel in range(1 if spec.get('block') else channels)
+                           if spec['node_id'] not in self.root['channels'][channel]]
+                if missing:
+                    self.__attach__(spec, missing)
+
+            # The root only sends to the channel trees that exist, so it's reset between them.
+            if (root.merge_channels, root.channels) != (self.config.get_config('merge_channels'),
+                                                        self.config.get_config('channels')):
+                root.reset_attributes()
+            while len(self.root['channels']) > channels:
+                channel = len(self.root['channels']) - 1
+                for node_id in [uid for uid, node in self.root['channels'][channel].items()
+                                if node.get('parent') == 'root']:
+                    self.__detach__(channel, node_id)
+                self.root['channels'].pop()
+                self.root['peer_list'].pop()
+                root.update_peers()
+            self.channels = channels
+            self.__close_exporters__()
+
+    def plan(self) -> list:
+        """ Return the specs of the nodes the hierarchy should have, parents before children.
+
+            Inbuilt coordinators without children are left out, saving processing time,
+            so reconfigure() removes any added without peers. If the hierarchy is demand driven,
+            inbuilt nodes are left out unless a signal they raise is subscribed to,
+            or one of their children is planned.
+            Custom nodes may raise any signal, so are always planned along with their parents.
+
+            If a blueprint is configured, its nodes are planned instead of the nodes of the tasks.
+            Like custom nodes, nodes of a blueprint are declared, so are always planned.
+
+            If channels are vectorised, top level vectorised nodes are moved below 'block',
+            so they and their children are sent (channels, samples) blocks.
+        """
+        blueprint = self.config.get_config('blueprint')
+        if blueprint is None:
+            plan = self.default_plan()
+        else: # Compiled once, later plans copy the cached specs.
+            plan = [self.__spec__(node['class_name'], node['node_id'], node['parent'],
+                                  node['init_args'], node['kwargs'], node['settings'])
+                    for node in compile_blueprint(blueprint)]
+        declared = set(self.custom_nodes) | (
+            {spec['node_id'] for spec in plan} if blueprint is not None else set())
+        plan += [
+            self.__spec__(value['class_name'], key, value['parent'],
+                          value['init_args'], value['kwargs'])
+            for key, value in self.custom_nodes.items()
+        ]
+        classes = __node_classes__()
+        if (self.config.get_config('vectorise_channels') and
+                not self.config.get_config('merge_channels')):
+            block = {'block'}
+            for spec in plan:
+                vectorised = getattr(classes.get(spec['class_name']), 'VECTORISED', False)
+                if spec['parent'] == 'root' and vectorised:
+                    spec['parent'] = 'block'
+                if spec['parent'] in block:
+                    spec['block'] = True
+                    block.add(spec['node_id'])
+
+        def children(node_id: str) -> list:
+            """ Return the specs of the planned children of a node. """
+            return [spec for spec in plan if spec['parent'] == node_id]
+        def inbuilt_coordinator(spec: dict) -> bool:
+            """ Check whether a spec is of a coordinator that isn't a declared node. """
+            node = classes.get(spec['class_name'])
+            return (spec['node_id'] not in declared and node is not None and
+                    issubclass(node, Coordinator))
+
+        empty = [spec for spec in plan
+                 if inbuilt_coordinator(spec) and not children(spec['node_id'])]
+        while empty:
+            plan.remove(empty[0])
+            empty = [spec for spec in plan
+                     if inbuilt_coordinator(spec) and not children(spec['node_id'])]
+
+        self.demand = __demand__()
+        if not self.config.get_config('demand_driven') or self.demand is None:
+            return plan
+        def demanded(spec: dict) -> bool:
+            """ Check whether a node, or any of its children, raises a subscribed signal. """
+            signals = getattr(classes.get(spec['class_name']), 'SIGNALS', None)
+            return (spec['node_id'] in declared or signals is None or
+                    any(signal in self.demand for signal in signals) or
+                    any(demanded(child) for child in children(spec['node_id'])))
+        kept = {'root', 'block'}
+        for spec in plan: # Parents come first, so a node is only kept if its parent is.
+            if spec['parent'] in kept and demanded(spec):
+                kept.add(spec['node_id'])
+        return [spec for spec in plan if spec['node_id'] in kept]
+
+    def default_plan(self) -> list:
+        """ Return the specs of the inbuilt nodes for the tasks configured. """
         pitch_algorithm = self.config.get_config('pitch_algorithm')
         beat_algorithm = self.config.get_config('beat_algorithm')
         tasks = self.config.get_config('tasks') # The tasks that have been enabled.
+        decimation = self.config.get_config('decimation')
+        plan = []
+        def add(class_name: str, node_id: str = None, parent_id: str = 'root', **kwargs: dict):
+            """ Plan an inbuilt node. """
+            plan.append(self.__spec__(class_name, node_id, parent_id, (), kwargs))
 
         ## COORDINATORS ##
-        self.add_node('FrequencyCoordinator')
-        self.add_node('SpectrumCoordinator', parent_id='FrequencyCoordinator')
-        self.add_node('FFTSCoordinator')
-        self.add_node('SpectrogramCoordinator', parent_id='FFTSCoordinator')
-        self.add_node('EnergyBPMCoordinator')
-        self.add_node('BPMCoordinator')
+        add('FrequencyCoordinator')
+        add('SpectrumCoordinator', parent_id='FrequencyCoordinator')
+        add('FFTSCoordinator')
+        add('SpectrogramCoordinator', parent_id='FFTSCoordinator')
+        beat_parent = 'root'
+        if decimation['beat']:
+            beat_parent = 'BeatDecimationCoordinator'
+            add('DecimationCoordinator', beat_parent, target_rate=decimation['beat'])
+        add('EnergyBPMCoordinator', parent_id=beat_parent)
+        add('BPMCoordinator', parent_id=beat_parent)
+        pitch_parent = 'FrequencyCoordinator'
+        if decimation['pitch'] and pitch_algorithm in ('zc', 'ac'):
+            # Time based pitch algorithms get their own extended signal at a lower rate.
+            pitch_parent = 'PitchFrequencyCoordinator'
+            add('DecimationCoordinator', 'PitchDecimationCoordinator',
+                target_rate=decimation['pitch'])
+            add('FrequencyCoordinator', pitch_parent, 'PitchDecimationCoordinator')
 
         ## WORKERS ##
         if tasks['beat']:
             if beat_algorithm == 'ed':
-                self.add_node('BPMWorker', parent_id='EnergyBPMCoordinator')
+                add('BPMWorker', parent_id='EnergyBPMCoordinator')
             elif beat_algorithm == 'dc':
-                self.add_node('BPMWorker', parent_id='BPMCoordinator')
+                add('BPMWorker', parent_id='BPMCoordinator')
         if tasks['bands']:
-            self.add_node('BandsWorker', parent_id='SpectrumCoordinator')
+            add('BandsWorker', parent_id='SpectrumCoordinator')
         if tasks['pitch']:
             if pitch_algorithm == 'hps':
-                self.add_node('HPSWorker', parent_id='SpectrumCoordinator')
+                add('HPSWorker', parent_id='SpectrumCoordinator')
             elif pitch_algorithm == 'zc':
-                self.add_node('ZeroCrossingWorker', parent_id='FrequencyCoordinator')
+                add('ZeroCrossingWorker', parent_id=pitch_parent)
             elif pitch_algorithm == 'fft':
-                self.add_node('FFTWorker', parent_id='SpectrumCoordinator')
+                add('FFTWorker', parent_id='SpectrumCoordinator')
             else:
-                self.add_node('AutoCorrelationWorker', parent_id='FrequencyCoordinator')
+                add('AutoCorrelationWorker', parent_id=pitch_parent)
         if tasks['genre']:
-            if tasks['export_spectrograms']:
-                args = (Exporter(),)
-            self.add_node('GenrePredictorWorker', None, 'SpectrogramCoordinator', *args)
-
-    def clean_hierarchy(self):
-        """ Removes any coordinators without peers from the hierarchy, saving processing time. """
-        LOGGER.debug('Removing inbuilt coordinators without any peers.')
-        node_removed = True
-        while node_removed:
-            node_removed = self.remove_empty_coordinators()
-
-    def remove_empty_coordinators(self):
-        """ If there are no peers in a coordinator's peer list remove them.
+            add('GenrePredictorWorker', parent_id='SpectrogramCoordinator')
+            # An exporter is created when the node is added, shared by every channel.
+            plan[-1]['export'] = tasks['export_spectrograms']
+        return plan
 
-            NOTE: this is a destructive method!
+    def update_demand(self):
+        """ Reconfigure a demand driven hierarchy, when the inbuilt signals subscribed to change.
 
-            I.e. coordinators will be removed if they have an empty peer_list.
-
-            Custom added nodes are preserved, but our inbuilt nodes will be cleaned up.
-            This may be changed, however, a user could easily re-add the coordinator they need.
+            Called by the event bus, whenever a receiver is connected or disconnected.
         """
-        for node_id, node in self.root['channels'][0].items():
-            # Stop removal of nodes added by users in cleanup.
-            if not node_id in self.custom_nodes:
-                # Only need to remove from one channel as remove_node function will clear both.
-                if 'thread' in node:
-                    if hasattr(node['thread'], 'peer_list'):
-                        if len(node['thread'].get_peer_list()) <= 0:
-                            self.remove_node(node_id)
-                            return True
-        LOGGER.debug('Finished removing inbuilt coordinators without any peers.')
-        return False # No nodes were removed this iteration.
+        with self.lock:
+            if self.config.get_config('demand_driven') and __demand__() != self.demand:
+                LOGGER.debug('Subscribed signals have changed, reconfiguring hierarchy.')
+                self.reconfigure()
 
     def update_nodes(self):
         """ Propagate updated config settings to nodes of Hierarchy. """
-        self.root['thread'].reset_attributes()
-        LOGGER.debug('Updating hierarchy nodes.')
-        for channel in self.root['channels']:
-            for _, peer in channel.items():
-                if 'thread' in peer:
-                    peer['thread'].reset_attributes()
+        with self.lock:
+            self.root['thread'].reset_attributes()
+            __apply_queue_policy__(self.config, 'root', self.root['thread'])
+            __apply_deadline__(self.config, 'root', self.root['thread'])
+            LOGGER.debug('Updating hierarchy nodes.')
+            for channel in self.root['channels']:
+                for node_id, peer in channel.items():
+                    if 'thread' in peer:
+                        peer['thread'].reset_attributes()
+                        __apply_settings__(self.config, node_id, peer['thread'], peer['spec'])
 
     def add_custom_node(self, class_name: str, node_id: str = None,
                         parent_id: str = 'root', *init_args: list, **kwargs: dict):
@@ -164,17 +314,18 @@ class Hierarchy(object):
                 - *init_args: positional arguments to pass to node instantiation.
                 - **kwargs: kwargs to pass to node instatiation
         """
-        uid = node_id if node_id else class_name
-        if uid in self.custom_nodes or uid in self.root['channels'][0]:
-            raise AttributeError('Node id {} already exists in hierarchy, please use a unique ID.'
-                                 .format(uid))
-
-        self.custom_nodes[uid] = {'class_name': class_name,
-                                  'parent': parent_id,
-                                  'init_args': init_args,
-                                  'kwargs': kwargs}
-        __validate_node__(self.custom_nodes[uid])
-        self.add_node(class_name, node_id, parent_id, *init_args, **kwargs)
+        with self.lock:
+            uid = node_id if node_id else class_name
+            if uid in self.custom_nodes or uid in self.root['channels'][0]:
+                raise AttributeError('Node id {} already exists in hierarchy, '
+                                     'please use a unique ID.'.format(uid))
+
+            self.custom_nodes[uid] = {'class_name': class_name,
+                                      'parent': parent_id,
+                                      'init_args': init_args,
+                                      'kwargs': kwargs}
+            __validate_node__(self.custom_nodes[uid])
+            self.add_node(class_name, node_id, parent_id, *init_args, **kwargs)
 
     def add_node(self, class_name: str, node_id: str = None,
                  parent_id: str = 'root', *init_args: list, **kwargs: dict):
@@ -187,80 +338,287 @@ class Hierarchy(object):
                 - *init_args: positional arguments to pass to node instantiation.
                 - **kwargs: kwargs to pass to node instatiation
         """
+        with self.lock:
+            spec = self.__spec__(class_name, node_id, parent_id, init_args, kwargs)
+            parent = self.root['channels'][0].get(parent_id, {})
+            if parent_id == 'block' or parent.get('spec', {}).get('block'):
+                spec['block'] = True # Vectorised nodes are only in the first channel tree.
+            self.__attach__(spec, range(1 if spec.get('block') else self.channels))
+
+    def remove_node(self, node_id: str):
+        """ Remove a node from the hierarchy tasks.
+
+            Args:
+                - node_id: unique id of the node to remove.
+        """
+        with self.lock:
+            if not node_id in self.root['channels'][0]:
+                raise KeyError('Node with id {} could not be found in hierarchy. '.format(node_id))
+
+            if node_id in ('root', 'block'):
+                raise ValueError('The root node cannot be removed from the hierarchy!')
+
+            # Remove node from each channel.
+            block = self.root['channels'][0][node_id]['spec'].get('block')
+            for channel in range(1 if block else self.channels):
+                if node_id in self.root['channels'][channel]:
+                    for removed_id in self.__detach__(channel, node_id):
+                        self.custom_nodes.pop(removed_id, None)
+                else:
+                    LOGGER.error('Node %s does not exist in channel hierarchy %d', node_id, channel)
+            self.__close_exporters__()
+
+    def put(self, data: object, capture: object = None):
+        """ Push data to root node of hierarchy.
+
+            Args:
+                - data: data to push to root thread's queue.
+                - capture: Capture of the data, see the timing module.
+        """
+        with self.lock:
+            self.root['thread'].queue.put(data, capture)
+
+    def queue_stats(self) -> dict:
+        """ Return the queue counters of every node, to find which nodes are dropping data.
+
+            Returns:
+                - dict: {'root': counters, 'channels': [{node_id: counters}]},
+                  the QUEUE_COUNTERS of each node's stats, see stats().
+        """
+        stats = self.stats()
+        def counters(node_stats: dict) -> dict:
+            """ Return the queue counters of a node's stats. """
+            return {key: node_stats[key] for key in QUEUE_COUNTERS}
+        return {
+            'root': counters(stats['root']),
+            'channels': [{node_id: counters(node_stats) for node_id, node_stats in channel.items()}
+                         for channel in stats['channels']]
+        }
+
+    def stats(self, as_json: bool = False) -> object:
+        """ Return the counters and timings of every node, to profile the hierarchy as it runs.
+
+            Each node's messages in ('enqueued') and out ('sent'), drops, queue depth,
+            processing time percentiles and the time it spent blocked versus processing ('busy').
+            Nodes keep these as they run, so collecting them only locks each queue briefly.
+
+            Args:
+                - as_json: return the stats as a JSON string.
+
+            Returns:
+                - dict: {'root': stats, 'channels': [{node_id: stats}]},
+                  see WorkQueue.stats() for the stats of each node.
+        """
+        with self.lock:
+            stats = {
+                'root': self.root['thread'].queue.stats(),
+                'channels': [{node_id: node['thread'].queue.stats()
+                              for node_id, node in channel.items() if 'thread' in node}
+                             for channel in self.root['channels']]
+            }
+        return json.dumps(stats) if as_json else stats
+
+    def join(self):
+        """ Block until every node has processed the data that has been pushed to the hierarchy.
+
+            Nodes are waited on in the order they were added, as a parent must exist before
+            its children, any data passed down the tree will already be queued by the time
+            the child is checked. Nodes whose thread has stopped are skipped.
+        """
+        for node in self.__nodes__():
+            while is_running(node) and not node.queue.join(0.1):
+                pass
+
+    def stop(self, timeout: float = None):
+        """ Stop every node of the hierarchy, waiting until their threads have ended.
+
+            Nodes finish the item they are processing first, anything still queued is dropped.
+            The hierarchy can't analyse any more data, until it is reset.
+
+            Args:
+                - timeout: maximum time in seconds to wait for each node.
+        """
+        with self.lock:
+            LOGGER.debug('Stopping hierarchy.')
+            nodes = self.__nodes__()
+            for node in nodes:
+                node.stop()
+            for node in nodes:
+                node.join(timeout)
+            if self.scheduler:
+                self.scheduler.stop()
+                self.scheduler.join(timeout)
+            self.__close_exporters__(every=True)
+
+    def __nodes__(self) -> list:
+        """ Return every node of the hierarchy, parents before their children. """
+        nodes = [self.root['thread']]
+        for channel in self.root['channels']:
+            nodes.extend(node['thread'] for node in channel.values() if 'thread' in node)
+        return nodes
+
+    def __spec__(self, class_name: str, node_id: str, parent_id: str,
+                 init_args: tuple, kwargs: dict, settings: dict = None) -> dict:
+        """ Return the spec of a node, nodes are only kept by reconfigure() if it's unchanged.
+
+            Args:
+                - class_name: class_name to instantiate as a string.
+                - node_id: unique id to give the node in hierarchy, the class name if None.
+                - parent_id: id of parent node to attach to.
+                - init_args: positional arguments to pass to node instantiation.
+                - kwargs: kwargs to pass to node instatiation
+                - settings: the node's settings from a blueprint, see the blueprint module.
+                  Settings in the config take precedence.
+        """
         uid = node_id if node_id else class_name
-        # Add to each channel hierarchy.
-        for channel in range(self.channels):
-            kwargs['channel_id'] = channel
-            kwargs['config'] = self.config
-            node_thread = node_factory(class_name, *init_args, **kwargs)
+        settings = settings if settings else {}
+        spec = {
+            'node_id': uid,
+            'class_name': class_name,
+            'parent': parent_id,
+            'init_args': tuple(init_args),
+            'kwargs': kwargs,
+            'execution': self.config.get_config('execution').get(
+                uid, settings.get('execution', self.config.get_config('default_execution'))),
+            'priority': self.config.get_config('priorities').get(uid,
+                                                                 settings.get('priority', 0))
+        }
+        for key in ('queue_policy', 'analysis_rate', 'deadline'):
+            if key in settings:
+                spec[key] = settings[key]
+        return spec
+
+    def __attach__(self, spec: dict, channels: list):
+        """ Create a node from its spec, adding it to the given channel trees.
+
+            Args:
+                - spec: spec of the node, see __spec__.
+                - channels: indexes of the channel trees to add the node to.
+        """
+        uid, parent_id = spec['node_id'], spec['parent']
+        init_args = spec['init_args']
+        if spec['execution'] != 'pool' and spec['priority'] != DEFAULT_PRIORITIES.get(uid, 0):
+            LOGGER.warning('Node %s is only scheduled by its priority when run on the pool, '
+                           'it is still sent data before its siblings.', uid)
+        if spec.get('export'):
+            if uid not in self.exporters:
+                self.exporters[uid] = exporter.Exporter()
+            init_args = (self.exporters[uid],) + init_args
+        elif 'export' in spec:
+            init_args = (None,) + init_args
+        for channel in channels:
             channel_hierarchy = self.root['channels'][channel]
+            parent = channel_hierarchy.get(parent_id, {}).get('thread')
+            kwargs = dict(spec['kwargs'])
+            kwargs['channel_id'] = channel
+            # Nodes below a DecimationCoordinator see the configuration of the decimated signal.
+            kwargs['config'] = getattr(parent, 'child_config', self.config)
+            node_thread = node_factory(spec['class_name'], *init_args,
+                                       execution=spec['execution'],
+                                       scheduler=self.__scheduler__(uid, spec['execution']),
+                                       **kwargs)
+            __apply_settings__(self.config, uid, node_thread, spec)
+            # Set before the node is added to its parent, which orders peers by priority.
+            node_thread.priority = spec['priority']
             channel_hierarchy[uid] = {
-                'thread': node_thread
+                'thread': node_thread,
+                'spec': spec
             }
-            if parent_id != 'root':
-                if parent_id in channel_hierarchy:
-                    try:
-                        channel_hierarchy[parent_id]['thread'].add_peer(
-                            channel_hierarchy[uid]['thread'])
-                        channel_hierarchy[uid]['parent'] = parent_id
-                    except AttributeError:
-                        print('Parent node {} does not have a peer_list.'.format(parent_id))
-                        raise
-                else:
-                    raise KeyError('Could not find specified parent node {} in hierarchy.'
-                                   .format(parent_id))
+            if parent_id in ('root', 'block') and parent_id in channel_hierarchy:
+                add_by_priority(channel_hierarchy[parent_id]['peer_list'],
+                                channel_hierarchy[uid]['thread'])
+                channel_hierarchy[uid]['parent'] = parent_id
+                self.root['thread'].update_peers()
+            elif parent_id in channel_hierarchy:
+                try:
+                    channel_hierarchy[parent_id]['thread'].add_peer(
+                        channel_hierarchy[uid]['thread'])
+                    channel_hierarchy[uid]['parent'] = parent_id
+                except AttributeError:
+                    print('Parent node {} does not have a peer_list.'.format(parent_id))
+                    raise
             else:
-                channel_hierarchy[parent_id]['peer_list'].append(channel_hierarchy[uid]['thread'])
-                channel_hierarchy[uid]['parent'] = 'root'
+                raise KeyError('Could not find specified parent node {} in hierarchy.'
+                               .format(parent_id))
         LOGGER.debug('Added node %s to hierarchy with node parent %s.', uid, parent_id)
 
-    def remove_node(self, node_id: str):
-        """ Remove a node from the hierarchy tasks.
+    def __detach__(self, channel: int, node_id: str) -> list:
+        """ Remove and stop a node and its children, in one channel tree.
 
             Args:
+                - channel: index of the channel tree to remove the node from.
                 - node_id: unique id of the node to remove.
-        """
-        if not node_id in self.root['channels'][0]:
-            raise KeyError('Node with id {} could not be found in hierarchy. '.format(node_id))
-
-        if node_id == 'root':
-            raise ValueError('The root node cannot be removed from the hierarchy!')
-
-        if node_id in self.custom_nodes:
-            del self.custom_nodes[node_id]
-
-        # Remove node from each channel.
-        for channel in range(self.channels):
-            if node_id in self.root['channels'][channel]:
-                node = self.root['channels'][channel][node_id]
-
-                # Remove any children from node, if deleting a node with children.
-                if hasattr(node['thread'], 'peer_list'):
-                    peers = node['thread'].get_peer_list()
-                    for peer in peers:
-                        LOGGER.debug('Removing child node %s of %s from channel hierarchy %d',
-                                     peer, node_id, channel)
-                        self.remove_node(peer.__class__.__name__)
-
-                parent = node['parent']
-                if parent == 'root':
-                    self.root['channels'][channel]['root']['peer_list'].remove(node['thread'])
-                else:
-                    self.root['channels'][channel][parent]['thread'].remove_peer(node['thread'])
 
-                del self.root['channels'][channel][node_id]
+            Returns:
+                - list: ids of the nodes removed.
+        """
+        channel_hierarchy = self.root['channels'][channel]
+        node = channel_hierarchy[node_id]
+        removed = [node_id]
+
+        # Remove any children from node, if deleting a node with children.
+        if hasattr(node['thread'], 'peer_list'):
+            for peer in list(node['thread'].get_peer_list()):
+                # Children may have been given an id other than their class name.
+                peer_id = next(uid for uid, child in channel_hierarchy.items()
+                               if child.get('thread') is peer)
+                LOGGER.debug('Removing child node %s of %s from channel hierarchy %d',
+                             peer_id, node_id, channel)
+                removed.extend(self.__detach__(channel, peer_id))
+
+        parent = node['parent']
+        if parent in ('root', 'block'):
+            channel_hierarchy[parent]['peer_list'].remove(node['thread'])
+            self.root['thread'].update_peers()
+        else:
+            channel_hierarchy[parent]['thread'].remove_peer(node['thread'])
+
+        del channel_hierarchy[node_id]
+        node['thread'].stop()
+
+        LOGGER.debug('Removed node %s from channel hierarchy %d', node_id, channel)
+        return removed
+
+    def __close_exporters__(self, every: bool = False):
+        """ Close the exporters of nodes no longer in any channel tree, the nodes share them,
+            so they don't close them when stopped.
 
-                LOGGER.debug('Removed node %s from channel hierarchy %d', node_id, channel)
-            else:
-                LOGGER.error('Node %s does not exist in channel hierarchy %d', node_id, channel)
+            Args:
+                - every: close every exporter, once every node has stopped.
+        """
+        for uid in list(self.exporters):
+            if every or not any(uid in channel for channel in self.root['channels']):
+                self.exporters.pop(uid).queue.close()
 
-    def put(self, data: object):
-        """ Push data to root node of hierarchy.
+    def __scheduler__(self, node_id: str, execution: str = None) -> Scheduler:
+        """ Return the scheduler to run a node on, None if the node isn't run on the pool.
 
             Args:
-                - data: data to push to root thread's queue.
+                - node_id: unique id of the node in the hierarchy.
+                - execution: the node's execution mode, from the config if None.
         """
-        self.root['thread'].queue.put(data)
+        if execution is None:
+            execution = self.config.get_config('execution').get(
+                node_id, self.config.get_config('default_execution'))
+        if execution != 'pool':
+            return None
+        if self.scheduler is None:
+            self.scheduler = Scheduler(self.config.get_config('pool_size'))
+        return self.scheduler
+
+def __node_classes__() -> dict:
+    """ Return the node classes that can be created by name, i.e. every subclass of
+        Worker and Coordinator, see the registry module.
+    """
+    return registry.node_classes()
+
+def __demand__() -> frozenset:
+    """ Return the signals of inbuilt nodes subscribed to, None if every signal is. """
+    subscribed = bus.subscribed()
+    if subscribed is None:
+        return None
+    return frozenset(signal for node in __node_classes__().values()
+                     for signal in (node.SIGNALS or ()) if signal in subscribed)
 
 def __validate_node__(node: dict):
     """ Validate that a given nodes parameters are valid.
@@ -285,18 +643,90 @@ def __validate_node__(node: dict):
         raise TypeError('Kwargs {} is not of type dict.'
                         .format(node['kwargs']))
 
-def node_factory(node_class: str, *args: list, **kwargs: dict):
+def __apply_settings__(config: object, node_id: str, node: object, spec: dict):
+    """ Apply the queue policy, analysis rate and deadline of a node.
+
+        Args:
+            - config: configuration holding the settings of each node.
+            - node_id: unique id of the node in the hierarchy.
+            - node: node to apply the settings to.
+            - spec: spec of the node, holding any settings from a blueprint.
+    """
+    __apply_queue_policy__(config, node_id, node, spec.get('queue_policy'))
+    __apply_analysis_rate__(config, node_id, node, spec.get('analysis_rate'))
+    __apply_deadline__(config, node_id, node, spec.get('deadline'))
+
+def __apply_queue_policy__(config: object, node_id: str, node: object, default: dict = None):
+    """ Set the overflow policy of a node's queue, if one is configured for the node.
+
+        Args:
+            - config: configuration holding the 'queue_policies' setting.
+            - node_id: unique id of the node in the hierarchy.
+            - node: node to set the policy of.
+            - default: policy to set if the config has none for the node.
+
+        Raises:
+            - ValueError: if a node run on the pool would block, see Config.
+    """
+    policy = config.get_config('queue_policies').get(node_id, default)
+    if policy:
+        if policy.get('policy') == 'block' and getattr(node, 'scheduler', None):
+            raise ValueError("{} is run on the pool, so can't use the 'block' policy."
+                             .format(node_id))
+        node.queue.set_policy(**policy)
+
+def __apply_deadline__(config: object, node_id: str, node: object, default: float = None):
+    """ Set the deadline of a node's queue, from the 'deadlines' setting.
+
+        Captures index frames of the source, so the deadline is in seconds of the source,
+        even for nodes analysing a decimated signal.
+
+        Args:
+            - config: configuration holding the 'deadlines' setting.
+            - node_id: unique id of the node in the hierarchy.
+            - node: node to set the deadline of.
+            - default: deadline to set if the config has none for the node.
+    """
+    node.queue.set_deadline(config.get_config('deadlines').get(node_id, default),
+                            config.get_config('sampling_rate'))
+
+def __apply_analysis_rate__(config: object, node_id: str, node: object, default: float = None):
+    """ Set how often a node analyses data, from the 'analysis_rates' setting.
+
+        Captures index frames of the source, so the hop is in frames of the source,
+        even for nodes analysing a decimated signal.
+
+        Args:
+            - config: configuration holding the 'analysis_rates' setting.
+            - node_id: unique id of the node in the hierarchy.
+            - node: node to set the hop of.
+            - default: rate to set if the config has none for the node.
+    """
+    rate = config.get_config('analysis_rates').get(node_id, default)
+    node.set_hop(config.get_config('sampling_rate') / rate if rate else None)
+
+def node_factory(node_class: str, *args: list, execution: str = 'thread',
+                 scheduler: Scheduler = None, **kwargs: dict):
     """ Create a new node of the given type.
         The node must inherit from either a worker or coordinator base class.
 
         Args:
             - node_class: class of node to instantiate.
             - *args: positional arguments to pass to node instantiation.
+            - execution: 'thread', 'process' or 'pool', see the scheduler module.
+            - scheduler: scheduler to run the node on, for the 'pool' execution mode.
             - **kwargs: kwargs to pass to node instatiation
     """
-    nodes = {subclass.__name__ : subclass for subclass in Worker.__subclasses__()}
-    nodes.update({subclass.__name__ : subclass for subclass in Coordinator.__subclasses__()})
-    if node_class in nodes:
-        return nodes[node_class](*args, **kwargs)
+    node = registry.node_class(node_class)
+    if node is not None:
+        if execution == 'process':
+            if issubclass(node, Coordinator):
+                return process.ProcessCoordinator(node, *args, **kwargs)
+            # Greedy, as Workers are.
+            return process.ProcessNode(node, *args, queue_length=1, **kwargs)
+        if scheduler:
+            with scheduling(scheduler):
+                return node(*args, **kwargs)
+        return node(*args, **kwargs)
     else:
         raise ValueError("{} does not inherit from Worker or Coordinator.".format(node_class))
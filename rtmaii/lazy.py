@@ -0,0 +1,65 @@
+""" LAZY IMPORT MODULE
+
+    - This module defers importing heavy dependencies until they are first used.
+
+    Importing scipy.signal alone takes around a second, so modules import their heavy
+    dependencies with lazy_import, the module is only imported once an attribute of it is
+    first used, i.e. once a node that analyses with it is created.
+    Short lived scripts that don't use a dependency never pay for importing it.
+
+    The time taken to import each lazy module is kept in LOADED,
+    see rtma_startup_benchmarker.py for measuring startup against a budget.
+"""
+import importlib
+import threading
+from time import perf_counter
+
+LOADED = {} # Seconds taken to import each lazy module, by module name.
+
+class LazyModule(object):
+    """ Stands in for a module, importing it when an attribute is first used.
+
+        Attributes used are cached on the LazyModule, so later uses cost the same
+        as using an attribute of the module itself.
+
+        Args:
+            - name: full name of the module, i.e. 'scipy.signal'.
+
+        Attributes:
+            - _module: the imported module, None until first used.
+              Underscored, so the names of the module's attributes aren't shadowed.
+    """
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def __getattr__(self, attribute: str) -> object:
+        """ Import the module if needed, returning the attribute of the module.
+
+            Args:
+                - attribute: name of the attribute to get.
+        """
+        value = getattr(self._load(), attribute)
+        self.__dict__[attribute] = value
+        return value
+
+    def __setattr__(self, attribute: str, value: object):
+        raise AttributeError('Attributes of lazy module {} are read-only.'.format(self._name))
+
+    def _load(self) -> object:
+        """ Import the module, if it hasn't been imported yet, returning it. """
+        with self._lock: # Nodes on several threads may use a module for the first time.
+            if self._module is None:
+                start = perf_counter()
+                self.__dict__['_module'] = importlib.import_module(self._name)
+                LOADED[self._name] = perf_counter() - start
+        return self._module
+
+def lazy_import(name: str) -> LazyModule:
+    """ Return a stand in for a module, only importing the module when it is first used.
+
+        Args:
+            - name: full name of the module, i.e. 'scipy.signal'.
+    """
+    return LazyModule(name)
@@ -0,0 +1,387 @@
+""" OFFLINE MODULE
+
+    - This module contains methods for analysing audio files faster than realtime.
+
+    Files are pushed through a hierarchy as fast as it can process them,
+    without an audio device, producing a timeline of the results.
+
+    Batches of files can be analysed in parallel across processes,
+    each process building its own Config and Hierarchy,
+    with a summary of each track written to a CSV or JSONL file.
+    Spectrograms are never exported, as every process would write to the same file.
+
+    Long files can also be split into segments analysed in parallel,
+    each segment starts with a warm up, so the histories of nodes are full at its start,
+    and the BPM is recalculated across the stitched timeline.
+
+    Usage:
+    ```powershell
+        python -m rtmaii.offline ./Tracks -o summaries.csv -w 4
+        python -m rtmaii.offline ./DJSet.wav -o summary.jsonl -s 8
+    ```
+"""
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from rtmaii import bus
+from rtmaii.configuration import Config
+from rtmaii.hierarchy import Hierarchy
+from rtmaii.sources import AudioSource, open_wave
+from rtmaii.timing import CaptureClock
+from rtmaii.analysis import bpm
+
+LOGGER = logging.getLogger()
+
+# Signals recorded by offline analysis, raw signal and spectrum data are left out by default,
+# as storing them for every sample of a track would use a lot of memory.
+OFFLINE_SIGNALS = ('beats', 'bpm', 'pitch', 'note', 'bands', 'genre')
+
+def analyse(hierarchy: Hierarchy, source: AudioSource, config: Config,
+            signals: tuple = OFFLINE_SIGNALS, start: float = 0, end: float = None) -> list:
+    """ Push every sample of a source through the hierarchy, recording the results raised.
+
+        Each sample is pushed once the previous sample has been fully processed,
+        so no data is dropped by greedy workers.
+
+        Args:
+            - hierarchy: hierarchy to analyse the source with.
+            - source: audio source to read samples from, i.e. a MappedWave.
+            - config: configuration of the hierarchy.
+            - signals: signals to record in the timeline.
+            - start: position (seconds) in the source to start analysing from.
+            - end: position (seconds) in the source to stop analysing at, the end if None.
+
+        Returns:
+            - list: Timeline of results in the form of
+              {'time': float, 'signal': str, 'channel': int, 'data': object}.
+              Where time is measured from the start of the source, not the range.
+    """
+    frame_count = config.get_config('frames_per_sample')
+    clock = CaptureClock(source.sampling_rate) # Latency measures processing time offline.
+    clock.index = int(start * source.sampling_rate)
+    end_frame = None if end is None else int(end * source.sampling_rate)
+    timeline = []
+    position = start
+
+    def record(signal, sender, data=None):
+        """ Store results raised during analysis on the timeline. """
+        timeline.append({'time': position, 'signal': signal, 'channel': sender, 'data': data})
+
+    def read() -> object:
+        """ Read the next sample, stopping at the end of the range. """
+        if end_frame is None:
+            return source.read(frame_count)
+        return source.read(max(min(frame_count, end_frame - clock.index), 0))
+
+    signals = set(signals) # Only the signals recorded, so any other signal is skipped.
+    for signal in signals:
+        bus.connect(record, signal)
+    source.seek(clock.index)
+    try:
+        samples = read()
+        while len(samples):
+            capture = clock.tick(len(samples) // source.channels)
+            position = clock.index / source.sampling_rate
+            hierarchy.put(samples, capture)
+            hierarchy.join()
+            samples = read()
+    finally:
+        for signal in signals:
+            bus.disconnect(record, signal)
+        source.rewind()
+
+    LOGGER.info('Offline analysis finished, %d results recorded.', len(timeline))
+    return timeline
+
+def summarise(timeline: list) -> dict:
+    """ Reduce a timeline of results to a summary of the track.
+
+        Args:
+            - timeline: results produced by analyse().
+
+        Returns:
+            - dict: {'duration': float, 'bpm': float, 'beats': int,
+                     'notes': {note: share}, 'bands': {band: mean}, 'genres': {genre: votes}}
+    """
+    bpms = [result['data'] for result in timeline if result['signal'] == 'bpm' and result['data']]
+    notes = Counter(result['data']['note'] for result in timeline if result['signal'] == 'note')
+    genres = Counter(result['data'] for result in timeline
+                     if result['signal'] == 'genre' and result['data'] != 'N/A')
+    bands = {}
+    for result in timeline:
+        if result['signal'] == 'bands':
+            for band, presence in result['data'].items():
+                bands.setdefault(band, []).append(presence)
+
+    note_count = sum(notes.values())
+    return {
+        'duration': timeline[-1]['time'] if timeline else 0,
+        'bpm': bpms[-1] if bpms else 0, # BPM is estimated from every beat found so far.
+        'beats': sum(1 for result in timeline if result['signal'] == 'beats' and result['data']),
+        'notes': {note: count / note_count for note, count in notes.most_common()},
+        'bands': {band: statistics.mean(values) for band, values in bands.items()},
+        'genres': dict(genres.most_common()),
+    }
+
+def analyse_track(path: str, settings: dict = None, segments: int = None,
+                  max_workers: int = None) -> dict:
+    """ Analyse a single track with its own Config and Hierarchy, returning its summary.
+
+        Runs within a worker process when analysing a batch, so errors are returned,
+        rather than raised, to stop a single broken file from ending the batch.
+
+        Args:
+            - path: path of the wav file to analyse.
+            - settings: config settings to use, see the Config class for options.
+            - segments: if set, split the track into segments analysed in parallel.
+            - max_workers: amount of processes to analyse segments with.
+    """
+    try:
+        if segments:
+            summary = summarise(analyse_segments(path, segments, settings, max_workers))
+        else:
+            source = open_wave(path)
+            config = offline_config(settings)
+            config.set_source({'rate': source.sampling_rate, 'channels': source.channels})
+            hierarchy = Hierarchy(config, {})
+            try:
+                summary = summarise(analyse(hierarchy, source, config))
+            finally:
+                hierarchy.stop()
+                source.close()
+    except Exception as error: # pylint: disable=broad-except
+        LOGGER.error('Could not analyse %s: %s', path, error)
+        return {'path': path, 'error': str(error)}
+    summary['path'] = path
+    return summary
+
+def offline_config(settings: dict = None) -> Config:
+    """ Return the Config a track, or segment of one, is analysed with.
+
+        Args:
+            - settings: config settings to use, see the Config class for options.
+              Spectrograms aren't exported, even if set, see the module docstring.
+    """
+    config = Config(**(settings or {}))
+    config.set_config(tasks={'export_spectrograms': False})
+    return config
+
+def warm_up_frames(config: Config) -> int:
+    """ Frames analysed before a segment starts, so the histories of nodes are full.
+
+        Covers the energy history of beat detection (43 samples),
+        the spectrogram of genre prediction (128 samples) and the extended signal of pitch.
+
+        Args:
+            - config: configuration the segments are analysed with.
+    """
+    return max(config.get_config('block_size'), 128 * config.get_config('frames_per_sample'))
+
+def plan_segments(frames: int, frames_per_sample: int, segments: int, warm_up: int) -> list:
+    """ Split a source into segments, aligned to samples so each is read as in a full analysis.
+
+        Args:
+            - frames: amount of frames in the source.
+            - frames_per_sample: frames read per sample.
+            - segments: amount of segments to split the source into.
+            - warm_up: frames to analyse before the start of each segment.
+
+        Returns:
+            - list: (warm_up_start, start, end) frames of each segment.
+    """
+    samples = -(-frames // frames_per_sample)
+    warm_up = -(-warm_up // frames_per_sample) * frames_per_sample
+    bounds = [round(samples * index / segments) * frames_per_sample
+              for index in range(segments + 1)]
+    return [(max(start - warm_up, 0), start, min(end, frames))
+            for start, end in zip(bounds, bounds[1:]) if start < end]
+
+def analyse_segment(path: str, warm_up_start: int, start: int, end: int,
+                    settings: dict = None, signals: tuple = OFFLINE_SIGNALS) -> list:
+    """ Analyse a segment of a track with its own Config and Hierarchy.
+
+        Results from the warm up, and the sample ending on the segment's start, are dropped,
+        as they belong to the previous segment.
+
+        Args:
+            - path: path of the wav file to analyse.
+            - warm_up_start, start, end: frames of the segment, created by plan_segments().
+            - settings: config settings to use, see the Config class for options.
+            - signals: signals to record in the timeline.
+    """
+    source = open_wave(path)
+    try:
+        config = offline_config(settings)
+        config.set_source({'rate': source.sampling_rate, 'channels': source.channels})
+        hierarchy = Hierarchy(config, {})
+        try:
+            timeline = analyse(hierarchy, source, config, signals,
+                               warm_up_start / source.sampling_rate, end / source.sampling_rate)
+        finally:
+            hierarchy.stop()
+        first = start / source.sampling_rate
+    finally:
+        source.close()
+    return [result for result in timeline if result['time'] > first or not start]
+
+def analyse_segments(path: str, segments: int = None, settings: dict = None,
+                     max_workers: int = None, signals: tuple = OFFLINE_SIGNALS,
+                     warm_up: float = None) -> list:
+    """ Analyse a long track faster, by analysing segments of it in parallel processes.
+
+        Args:
+            - path: path of the wav file to analyse.
+            - segments: amount of segments to split the track into, defaults to max_workers.
+            - settings: config settings to use, see the Config class for options.
+            - max_workers: amount of processes to use, defaults to the amount of CPUs.
+            - signals: signals to record in the timeline.
+            - warm_up: seconds analysed before each segment, defaults to warm_up_frames().
+
+        Returns:
+            - list: Stitched timeline of the track, as returned by analyse().
+    """
+    source = open_wave(path)
+    rate, frames = source.sampling_rate, source.frames
+    source.close()
+    config = offline_config(settings)
+    warm_up = warm_up_frames(config) if warm_up is None else int(warm_up * rate)
+    segments = segments or max_workers or os.cpu_count()
+    plan = plan_segments(frames, config.get_config('frames_per_sample'), segments, warm_up)
+    # Beats are needed to recalculate the BPM across segments.
+    recorded = tuple(signals) + (('beats',) if 'bpm' in signals else ())
+    LOGGER.info('Analysing %s in %d segments.', path, len(plan))
+
+    # Hierarchies run threads, which aren't safe to fork.
+    with ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn')) \
+            as executor:
+        timelines = list(executor.map(analyse_segment, [path] * len(plan),
+                                      *zip(*plan), [settings] * len(plan),
+                                      [recorded] * len(plan)))
+    timeline = stitch_bpm([result for segment in timelines for result in segment])
+    return [result for result in timeline if result['signal'] in signals]
+
+def stitch_bpm(timeline: list) -> list:
+    """ Recalculate BPM results from every beat before them, as segments only know their own.
+
+        Args:
+            - timeline: stitched timeline including 'beats' and 'bpm' results.
+    """
+    intervals, last_beat = {}, {}
+    # Beats are counted before the BPM raised from the same sample.
+    for result in sorted(timeline, key=lambda result: (result['time'],
+                                                       result['signal'] != 'beats')):
+        channel = result['channel']
+        if result['signal'] == 'beats' and result['data']:
+            intervals.setdefault(channel, []).append(result['time'] - last_beat.get(channel, 0))
+            last_beat[channel] = result['time']
+        elif result['signal'] == 'bpm':
+            result['data'] = bpm.bpmsimple(bpm.cleanbeatarray(intervals.get(channel, [])))
+    return timeline
+
+def find_tracks(sources: object) -> list:
+    """ Expand a directory or list of paths into a list of wav files.
+
+        Args:
+            - sources: directory path (str) or list of file/directory paths.
+    """
+    sources = [sources] if isinstance(sources, str) else sources
+    tracks = []
+    for source in sources:
+        if os.path.isdir(source):
+            tracks.extend(sorted(os.path.join(root, name)
+                                 for root, _, names in os.walk(source)
+                                 for name in names if name.lower().endswith('.wav')))
+        else:
+            tracks.append(source)
+    return tracks
+
+def analyse_batch(sources: object, output: str = None, settings: dict = None,
+                  max_workers: int = None, segments: int = None) -> list:
+    """ Analyse many tracks in parallel, one track per worker process at a time.
+
+        Args:
+            - sources: directory path (str) or list of file/directory paths.
+            - output: path of file to write summaries to, .csv or .jsonl.
+            - settings: config settings to use for every track.
+            - max_workers: amount of processes to use, defaults to the amount of CPUs.
+            - segments: if set, tracks are analysed one at a time,
+              each split into this many segments analysed in parallel. Suits long tracks.
+
+        Returns:
+            - list: summary of each track, in the order of the tracks found.
+    """
+    tracks = find_tracks(sources)
+    LOGGER.info('Analysing %d tracks.', len(tracks))
+    if segments:
+        summaries = [analyse_track(track, settings, segments, max_workers) for track in tracks]
+    else:
+        with ProcessPoolExecutor(max_workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            summaries = list(executor.map(analyse_track, tracks, [settings] * len(tracks)))
+    if output:
+        write_summaries(summaries, output)
+    return summaries
+
+def write_summaries(summaries: list, output: str):
+    """ Write track summaries to a file, CSV if the extension is .csv, otherwise JSONL.
+
+        When writing to a CSV, the notes, bands and genres are flattened into columns,
+        i.e. 'note:A', 'band:bass' and 'genre:Rock'.
+
+        Args:
+            - summaries: summaries produced by analyse_track().
+            - output: path of the file to write.
+    """
+    with open(output, 'w', newline='') as output_file:
+        if not output.lower().endswith('.csv'):
+            for summary in summaries:
+                output_file.write(json.dumps(summary) + '\n')
+            return
+
+        rows = [flatten_summary(summary) for summary in summaries]
+        columns = ['path', 'error', 'duration', 'bpm', 'beats']
+        for row in rows:
+            columns.extend(key for key in row if key not in columns)
+        writer = csv.DictWriter(output_file, columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def flatten_summary(summary: dict) -> dict:
+    """ Flatten the nested dictionaries of a summary into prefixed keys.
+
+        Args:
+            - summary: summary produced by analyse_track().
+    """
+    prefixes = {'notes': 'note', 'bands': 'band', 'genres': 'genre'}
+    row = {}
+    for key, value in summary.items():
+        if key in prefixes:
+            row.update({'{}:{}'.format(prefixes[key], name): item for name, item in value.items()})
+        else:
+            row[key] = value
+    return row
+
+def main():
+    """ Commandline entry point for analysing a batch of tracks. """
+    parser = argparse.ArgumentParser(
+        description="Analyse a batch of wav files, writing a summary of each track.")
+    parser.add_argument("sources", nargs='+', help="Wav files or directories of wav files.")
+    parser.add_argument("-o", "--output", help="File to write summaries to, .csv or .jsonl",
+                        type=str, default='summaries.jsonl')
+    parser.add_argument("-c", "--config", help="Config settings to use as a dictionary.",
+                        type=json.loads, default=None)
+    parser.add_argument("-w", "--workers", help="Amount of processes to use.",
+                        type=int, default=None)
+    parser.add_argument("-s", "--segments", help="Split each track into segments analysed "
+                        "in parallel, for long tracks.", type=int, default=None)
+    args = parser.parse_args()
+    analyse_batch(args.sources, args.output, args.config, args.workers, args.segments)
+
+if __name__ == '__main__':
+    main()
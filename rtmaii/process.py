@@ -0,0 +1,448 @@
+""" PROCESS MODULE
+
+    - This module contains the nodes used to run a hierarchy node in a child process.
+
+    Every node is a thread, so heavy nodes such as HPS, autocorrelation and genre inference
+    all compete for the same GIL. Setting a node's execution to 'process' runs it in a
+    child process instead, behind a ProcessNode that takes its place in the hierarchy.
+
+    Arrays, i.e. blocks and spectra, are written to a SharedRing of shared memory slots,
+    only the location of the slot is pickled and sent through a pipe. Any other data is
+    pickled as normal. Signals raised by the node in the child process are forwarded back,
+    and raised on the event bus of the parent process.
+
+    A slot is never written whilst the other process may still read it. The parent sends
+    the node one item at a time, writing the next once the node is done with the last.
+    Arrays messaged by a coordinator are read by its peers in the parent process for as
+    long as they are queued, so the parent releases each slot once no peer holds it,
+    and the child waits for a slot to be released when every slot is in use.
+
+    NOTE: Child processes are spawned, so the node's class, init_args and kwargs must be
+    picklable, i.e. classes must be importable from a module.
+"""
+import threading
+import multiprocessing
+from collections import deque
+from numpy import (ndarray, asarray, frombuffer, prod, uint8, may_share_memory,
+                   dtype as numpy_dtype)
+from rtmaii import bus
+from rtmaii.timing import send, SENDER
+from rtmaii.workqueue import WorkQueue, Stopped, read_only
+from rtmaii.scheduler import add_by_priority
+from rtmaii.lazy import lazy_import
+
+shared_memory = lazy_import('multiprocessing.shared_memory') # Imported once a ring is created.
+
+class SharedBuffer(object):
+    """ Exposes a block of shared memory to numpy, keeping it mapped whilst any array uses it.
+
+        Args:
+            - memory: shared memory block to expose.
+    """
+    def __init__(self, memory: 'shared_memory.SharedMemory'):
+        self.memory = memory
+        address = frombuffer(memory.buf, dtype=uint8).ctypes.data
+        self.__array_interface__ = {'shape': (memory.size,), 'typestr': '|u1',
+                                    'data': (address, False), 'version': 3}
+
+class SharedRing(object):
+    """ Slots of shared memory that arrays are written to, for another process to read.
+
+        The ring is reallocated whenever an array is larger than a slot,
+        the reader attaches to the new ring when it sees its name.
+
+        Args:
+            - slots: amount of slots in the ring.
+
+        Attributes:
+            - memory: shared memory block holding the ring, None until an array is written.
+            - ring (ndarray): (slots, slot_size) bytes of the shared memory block.
+            - slot (int): index of the next slot to write to.
+
+        Notes:
+            - A slot is overwritten slots writes later, the writer must know the reader
+              is done with it by then, see ProcessNode.run and ParentPeer.
+    """
+    SLOTS = 8
+
+    def __init__(self, slots: int = SLOTS):
+        self.slots = slots
+        self.memory = None
+        self.ring = None
+        self.slot = 0
+
+    def pack(self, data: object) -> tuple:
+        """ Write data into the next slot, returning a message the reader can unpack.
+
+            Args:
+                - data: data to write, anything other than a numeric array is pickled.
+        """
+        if not self.shares(data):
+            return ('object', data)
+        if self.ring is None or data.nbytes > self.ring.shape[1]:
+            self.__allocate__(data.nbytes)
+        slot = self.slot
+        self.slot = (slot + 1) % self.slots
+        view = self.ring[slot, :data.nbytes].view(data.dtype).reshape(data.shape)
+        view[...] = data
+        return ('shared', self.memory.name, self.ring.shape[1], slot, data.shape, data.dtype.str)
+
+    @staticmethod
+    def shares(data: object) -> bool:
+        """ Check whether data is written to a slot when packed, rather than pickled.
+
+            Args:
+                - data: data to pack.
+        """
+        return isinstance(data, ndarray) and not data.dtype.hasobject
+
+    def close(self):
+        """ Remove the ring's shared memory, arrays using it keep it mapped until released. """
+        if self.memory:
+            try:
+                self.memory.unlink()
+            except FileNotFoundError:
+                pass # Already unlinked by the reader.
+        self.memory = None
+        self.ring = None
+
+    def __allocate__(self, nbytes: int):
+        """ Replace the ring with one whose slots hold nbytes, aligned to 64 bytes. """
+        self.close()
+        slot_size = -(-max(nbytes, 1) // 64) * 64
+        self.memory = shared_memory.SharedMemory(create=True, size=slot_size * self.slots)
+        self.ring = asarray(SharedBuffer(self.memory)).reshape(self.slots, slot_size)
+
+class SharedRingReader(object):
+    """ Reads arrays written to a SharedRing by another process, without copying them.
+
+        Attributes:
+            - name (str): name of the ring attached to.
+            - ring (ndarray): bytes of the ring attached to.
+    """
+    def __init__(self):
+        self.name = None
+        self.ring = None
+
+    def unpack(self, message: tuple) -> object:
+        """ Return the data of a message packed by a SharedRing.
+
+            Args:
+                - message: message returned by SharedRing.pack.
+        """
+        if message[0] == 'object':
+            return message[1]
+        _, name, slot_size, slot, shape, dtype = message
+        if name != self.name:
+            memory = shared_memory.SharedMemory(name)
+            # Both processes have it mapped, so the name is no longer needed.
+            memory.unlink()
+            self.name = name
+            self.ring = asarray(SharedBuffer(memory))[:memory.size // slot_size * slot_size]
+            self.ring = self.ring.reshape(-1, slot_size)
+        dtype = numpy_dtype(dtype)
+        nbytes = dtype.itemsize * int(prod(shape))
+        return self.ring[slot, :nbytes].view(dtype).reshape(shape)
+
+class ParentPeer(object):
+    """ Peer added to a coordinator run in a child process, messaging the parent process.
+
+        Args:
+            - reply: function sending a message to the parent process.
+            - releases: pipe the parent process releases slots of the ring on, oldest first.
+
+        Attributes:
+            - queue: the peer itself, coordinators message peers through peer.queue.put.
+            - ring (SharedRing): ring arrays are sent through.
+            - free (int): slots released by the parent process, that can be written to.
+    """
+    def __init__(self, reply: object, releases: object):
+        self.reply = reply
+        self.releases = releases
+        self.queue = self
+        self.ring = SharedRing()
+        self.free = self.ring.slots
+
+    def put(self, data: object, capture: object = None) -> bool:
+        """ Send data to the coordinator's peers in the parent process.
+
+            Raises:
+                - Stopped: if the parent process stops the node, whilst waiting for a slot.
+        """
+        if self.ring.shares(data):
+            self.__wait_for_slot__()
+        self.reply('peers', self.ring.pack(data), capture)
+        return True
+
+    def __wait_for_slot__(self):
+        """ Wait until the parent process has released a slot, if every slot is in use. """
+        try:
+            while not self.free or self.releases.poll():
+                self.releases.recv()
+                self.free += 1
+        except EOFError:
+            raise Stopped # The parent process has stopped the node.
+        self.free -= 1
+
+class ProcessNode(threading.Thread):
+    """ Takes the place of a node in the hierarchy, running the node in a child process.
+
+        Data put on the queue is sent to the node one item at a time, the next item is sent
+        once the node has finished with the last. So the queue's overflow policy applies,
+        and joining the queue waits for the node in the child process.
+
+        Args:
+            - node_class: class of the node to run in a child process.
+            - *init_args: positional arguments to pass to node instantiation.
+            - queue_length: length of the queue, see Worker and Coordinator.
+            - **kwargs: kwargs to pass to node instantiation.
+
+        Attributes:
+            - queue (WorkQueue): queue of data to send to the node.
+            - config (Config): configuration object the node was created with.
+            - channel_id (int): id of channel being analysed.
+            - priority (int): nodes with a higher priority are sent data first.
+            - process: child process running the node.
+            - child_config: configuration of the node's peers, if the node has one,
+              see DecimationCoordinator.
+            - outstanding (deque): arrays messaged by the node, whose slots are yet to be
+              released, oldest first.
+
+        Raises:
+            - Any exception raised creating the node in the child process.
+    """
+    def __init__(self, node_class: type, *init_args: list,
+                 queue_length: int = None, **kwargs: dict):
+        threading.Thread.__init__(self, args=(), kwargs=None)
+        self.setDaemon(True)
+        self.queue = WorkQueue(queue_length)
+        self.config = kwargs.get('config')
+        self.channel_id = kwargs.get('channel_id')
+        self.priority = 0
+        self.ring = SharedRing()
+        self.reader = SharedRingReader()
+        self.lock = threading.Lock()
+        self.done = threading.Semaphore(0)
+        self.reset = threading.Event()
+        self.outstanding = deque()
+
+        context = multiprocessing.get_context('spawn') # Forking a threaded process isn't safe.
+        self.requests, child_requests = context.Pipe(duplex=False)[::-1]
+        self.results, child_results = context.Pipe(duplex=False)
+        self.releases, child_releases = context.Pipe(duplex=False)[::-1]
+        self.process = context.Process(target=serve_node, daemon=True,
+                                       args=(node_class, init_args, kwargs,
+                                             child_requests, child_results, child_releases))
+        self.process.start()
+        child_requests.close()
+        child_results.close()
+        child_releases.close()
+
+        response = self.results.recv()
+        if response[0] == 'error':
+            raise response[1]
+        self.child_config = response[1]
+        threading.Thread(target=self.listen, daemon=True).start()
+        self.start()
+
+    def run(self):
+        """ Send each item to the node, waiting until the node has processed it.
+
+            So the slot an item is written to is free again, once the next item is sent.
+        """
+        try:
+            while True:
+                data = self.queue.get()
+                self.request('data', self.ring.pack(data), self.queue.capture)
+                while not self.done.acquire(timeout=0.1):
+                    if not self.process.is_alive():
+                        return # The node has stopped, see Hierarchy.join.
+        except Stopped:
+            pass
+        finally:
+            # Closing the pipe ends the child process.
+            with self.lock:
+                self.requests.close()
+            self.ring.close()
+
+    def set_hop(self, hop: float = None):
+        """ Analyse data at most once every hop frames of the source, skipping other items.
+
+            Args:
+                - hop: frames between analyses, every item is analysed if None.
+        """
+        self.queue.set_hop(hop)
+
+    def stop(self):
+        """ Stop the node, its child process exits once it has finished its current item. """
+        self.queue.close()
+
+    def join(self, timeout: float = None):
+        """ Wait for the node and its child process to stop, see stop().
+
+            Args:
+                - timeout: maximum time in seconds to wait for each, waits forever if None.
+        """
+        threading.Thread.join(self, timeout)
+        self.process.join(timeout)
+
+    def reset_attributes(self):
+        """ Send the latest config values to the node, waiting until it has been reset. """
+        self.reset.clear()
+        self.request('reset', self.config)
+        while self.is_alive() and self.process.is_alive() and not self.reset.wait(0.1):
+            pass
+
+    def request(self, *message: tuple):
+        """ Send a message to the child process, unless the node has stopped. """
+        with self.lock:
+            if not self.requests.closed:
+                self.requests.send(message)
+
+    def listen(self):
+        """ Handle messages from the child process, until it exits.
+
+            Whilst every slot of the node's ring is outstanding, the node may be waiting
+            for one to be released, so peers are checked for released slots as they run.
+        """
+        SENDER.queue = self.queue # Signals raised for the node are counted as its messages.
+        while True:
+            try:
+                if (len(self.outstanding) >= SharedRing.SLOTS and
+                        not self.results.poll(0.01)):
+                    self.__release__()
+                    continue
+                message = self.results.recv()
+            except EOFError:
+                self.releases.close()
+                return
+            if message[0] == 'signal':
+                send(*message[1:])
+            elif message[0] == 'peers':
+                data = self.reader.unpack(message[1])
+                self.message_peers(data, message[2])
+                if message[1][0] == 'shared':
+                    self.outstanding.append(data)
+                self.__release__()
+            elif message[0] == 'done':
+                self.done.release()
+            elif message[0] == 'ready':
+                if self.child_config is not None:
+                    # Peers hold the child config, so it is updated in place.
+                    self.child_config.__dict__.update(message[1].__dict__)
+                self.reset.set()
+
+class ProcessCoordinator(ProcessNode):
+    """ ProcessNode for coordinators, sending data messaged by the node to its peers.
+
+        Attributes:
+            - peer_list (list): List of peer threads to communicate processed data with.
+    """
+    def __init__(self, node_class: type, *init_args: list,
+                 queue_length: int = None, **kwargs: dict):
+        self.peer_list = []
+        ProcessNode.__init__(self, node_class, *init_args, queue_length=queue_length, **kwargs)
+
+    def message_peers(self, data: object, capture: object = None):
+        """ Sends data from the node to each peered thread.
+
+            Args:
+                - data: The data to send to each peer.
+                - capture: Capture of the data, see the timing module.
+        """
+        read_only(data)
+        self.queue.sent += len(self.peer_list)
+        for peer in self.peer_list:
+            peer.queue.put(data, capture)
+
+    def add_peer(self, thread_obj: object):
+        """ Add a thread to the peer_list, peers with a higher priority are messaged first.
+
+            Args:
+                - thread_obj: thread to add.
+        """
+        add_by_priority(self.peer_list, thread_obj)
+
+    def __release__(self):
+        """ Release the slots of arrays messaged by the node, oldest first,
+            once no peer holds them.
+        """
+        while self.outstanding:
+            data = self.outstanding[0]
+            def in_slot(item: object) -> bool:
+                """ Check whether an item is a view of the slot. """
+                return isinstance(item, ndarray) and may_share_memory(item, data)
+            if any(peer.queue.holds(in_slot) for peer in self.peer_list):
+                return
+            self.outstanding.popleft()
+            try:
+                self.releases.send(True)
+            except OSError:
+                return # The node has stopped.
+
+    def remove_peer(self, thread_obj: object):
+        """ Remove a thread from the peer_list
+
+            Args:
+                - thread_obj: thread to remove.
+        """
+        self.peer_list.remove(thread_obj)
+
+    def get_peer_list(self) -> list:
+        """ Returns peer list of the coordinator. """
+        return self.peer_list
+
+def serve_node(node_class: type, init_args: list, kwargs: dict,
+               requests: object, results: object, releases: object):
+    """ Run a node in the child process, until the parent process closes its pipe.
+
+        Args:
+            - node_class: class of the node to run.
+            - init_args: positional arguments to pass to node instantiation.
+            - kwargs: kwargs to pass to node instantiation.
+            - requests: pipe messages are received from the parent process on.
+            - results: pipe messages are sent to the parent process on.
+            - releases: pipe slots of arrays messaged by the node are released on.
+    """
+    lock = threading.Lock()
+    def reply(*message: tuple):
+        """ Send a message to the parent process, from any thread. """
+        with lock:
+            results.send(message)
+
+    def forward(signal: str, sender: object, data: object = None,
+                capture: object = None, **kwargs: dict):
+        """ Forward a signal raised by the node to the parent process. """
+        reply('signal', signal, sender, data, capture)
+    bus.connect(forward, weak=False)
+
+    try:
+        node = node_class(*init_args, **kwargs)
+    except Exception as error: # Raised in the parent process instead.
+        reply('error', error)
+        return
+    parent_peer = None
+    if hasattr(node, 'peer_list'):
+        parent_peer = ParentPeer(reply, releases)
+        node.add_peer(parent_peer)
+    reply('ready', getattr(node, 'child_config', None))
+
+    reader = SharedRingReader()
+    try:
+        while True:
+            message = requests.recv()
+            if message[0] == 'data':
+                node.queue.put(reader.unpack(message[1]), message[2])
+                while node.is_alive() and not node.queue.join(0.1):
+                    pass
+                reply('done')
+            elif message[0] == 'reset':
+                # Update in place, as any child config holds the node's config.
+                node.config.__dict__.update(message[1].__dict__)
+                node.reset_attributes()
+                reply('ready', getattr(node, 'child_config', None))
+    except EOFError:
+        pass # Parent process has exited, or the node was removed.
+    finally:
+        if parent_peer:
+            parent_peer.ring.close()
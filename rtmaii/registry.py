@@ -0,0 +1,36 @@
+""" REGISTRY MODULE
+
+    - This module keeps the node classes the hierarchy can create by name.
+
+    Every subclass of Worker or Coordinator is registered by its class name when it is
+    defined, however deep it is, i.e. a custom node inheriting from HPSWorker.
+    A class defined later with the same name replaces the earlier class.
+
+    Nodes can also be registered under another name, i.e. to avoid clashing class names.
+    ```python
+        registry.register(MyPitchWorker, 'MyPackagePitchWorker')
+    ```
+"""
+NODES = {} # Node classes, by the name they are created with.
+
+def register(node_class: type, name: str = None) -> type:
+    """ Register a node class, so the hierarchy can create it by name, returning the class.
+
+        Args:
+            - node_class: class inheriting from Worker or Coordinator.
+            - name: name to create the class by, its class name if None.
+    """
+    NODES[name if name else node_class.__name__] = node_class
+    return node_class
+
+def node_class(name: str) -> type:
+    """ Return the node class registered under a name, None if there isn't one.
+
+        Args:
+            - name: name the class was registered under.
+    """
+    return NODES.get(name)
+
+def node_classes() -> dict:
+    """ Return every registered node class, by the name it was registered under. """
+    return dict(NODES)
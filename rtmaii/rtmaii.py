@@ -8,13 +8,18 @@
     please see our Readme on our Github.
     https://github.com/RTMAAI/CO600-Musical-Analysis
 """
-import wave
 import logging
 from rtmaii.hierarchy import Hierarchy
 from rtmaii.configuration import Config
-from numpy import int16, frombuffer
-from pydispatch import dispatcher
-import pyaudio
+from rtmaii import offline
+from rtmaii.sources import AudioSource, open_wave
+from rtmaii.timing import CaptureClock
+from rtmaii.stream import SignalStream
+from numpy import frombuffer
+from rtmaii import bus
+from rtmaii.lazy import lazy_import
+
+pyaudio = lazy_import('pyaudio') # Imported once an audio device is used.
 
 FORMATTER = logging.Formatter('%(asctime)s [%(levelname)s]: %(message)s')
 LOGGER = logging.getLogger()
@@ -27,12 +32,31 @@ SH.setFormatter(FORMATTER)
 LOGGER.addHandler(FH)
 LOGGER.addHandler(SH)
 
+# Names of the Pyaudio formats of the sample types sources can provide.
+PYAUDIO_FORMATS = {
+    'uint8': 'paUInt8',
+    'int16': 'paInt16',
+    'int32': 'paInt32',
+    'float32': 'paFloat32'
+}
+
+def pyaudio_format(sample_format: str) -> int:
+    """ Return the Pyaudio format of a sample type, None if Pyaudio can't play it.
+
+        Args:
+            - sample_format: name of the sample type, i.e. 'int16'.
+    """
+    if sample_format not in PYAUDIO_FORMATS:
+        return None
+    return getattr(pyaudio, PYAUDIO_FORMATS[sample_format])
+
 class Rtmaii(object):
     """ Interface for real-time musical analysis library.
 
         Args:
             - Callbacks: List of dicts with a callback and the signal to will trigger it.
-            - Source: The path of a track to be played, defaults to microphone input.
+            - Source: The path of a track to be played or an AudioSource,
+              defaults to microphone input.
             - Config: Dict of settings to change. (See our Readme for a list of options.)
             - Custom_Nodes: List of custom nodes to add to Hierarchy. (See Readme for details.)
 
@@ -62,12 +86,13 @@ class Rtmaii(object):
                     pass #Keep main thread running.
             ```
     """
-    def __init__(self, callbacks: list = (), source: str = None,
+    def __init__(self, callbacks: list = (), source: object = None,
                  config: dict = None, custom_nodes: dict = None, **kwargs):
 
         self.config = Config()
-        self.audio = pyaudio.PyAudio()
-        self.stream = None
+        self.audio = None # Pyaudio is only started when an audio device is needed.
+        self.source = None
+        self.audio_stream = None # Pyaudio stream, named so it doesn't hide stream().
         self.set_source(source)
         self.set_callbacks(callbacks)
         if config:
@@ -78,11 +103,62 @@ class Rtmaii(object):
         SH.setLevel(mode)
         LOGGER.debug('RTMAAI Initiliazed')
 
-    def __stream_callback__(self, in_data, frame_count, _, __):
-        """ Convert raw stream data into signal bin and put data on the coordinator's queue. """
-        data = self.waveform.readframes(frame_count) if hasattr(self, 'waveform') else in_data
-        self.hierarchy.put(frombuffer(data, int16))
-        return (data, pyaudio.paContinue)
+    def __stream_callback__(self, in_data, frame_count, time_info, status_flags):
+        """ Convert raw stream data into signal bin and put data on the coordinator's queue.
+
+            Each signal is tagged with the time it was captured and the index of its first frame.
+            The clock counts the frames actually read, as sources return fewer once ending.
+        """
+        if self.source:
+            signal = self.source.read(frame_count)
+            frame_count = len(signal) // self.source.channels
+            in_data = signal.tobytes() # Played back through the output stream.
+        else:
+            signal = frombuffer(in_data, self.config.get_config('sample_format'))
+        capture = self.clock.tick(frame_count, time_info, status_flags)
+        self.hierarchy.put(signal, capture)
+        return (in_data, pyaudio.paContinue)
+
+    def __get_audio__(self) -> object:
+        """ Returns the Pyaudio instance, starting Pyaudio if it hasn't been used yet. """
+        if self.audio is None:
+            self.audio = pyaudio.PyAudio()
+        return self.audio
+
+    def analyse_file(self, source: object = None, signals: tuple = offline.OFFLINE_SIGNALS,
+                     start: float = 0, end: float = None) -> list:
+        """ Analyse a source as fast as possible, without playing it through an audio device.
+
+            Each sample is pushed through the hierarchy once the previous sample,
+            has been fully processed, so no data is dropped by greedy workers.
+            Any attached callbacks are still called as results are produced.
+
+            Args:
+                - source: Path of a wav file or an AudioSource to analyse,
+                  defaults to the current source.
+                - signals: Signals to record in the returned timeline.
+                - start: Position (seconds) in the source to start analysing from.
+                - end: Position (seconds) in the source to stop analysing at, the end if None.
+
+            Returns:
+                - list: Timeline of results in the form of
+                  {'time': float, 'signal': str, 'channel': int, 'data': object}.
+                  Where time is the position (seconds) in the track that was analysed
+                  up to when the result was produced.
+
+            Example:
+            ```python
+                analyser = rtmaii.Rtmaii(source=r'.\\Tracks\\LetItGo.wav')
+                for result in analyser.analyse_file():
+                    print(result['time'], result['signal'], result['data'])
+            ```
+        """
+        if source is not None:
+            self.set_source(source)
+        if not self.source:
+            raise ValueError('Offline analysis requires a wav file or AudioSource to be set.')
+
+        return offline.analyse(self.hierarchy, self.source, self.config, signals, start, end)
 
     def is_active(self) -> bool:
         """ Check that coordinator thread is still running.
@@ -90,40 +166,62 @@ class Rtmaii(object):
             Returns
                 - bool: True is alive, False otherwise.
         """
-        return bool(self.stream and self.stream.is_active())
+        return bool(self.audio_stream and self.audio_stream.is_active())
 
     def start(self):
         """ Start audio stream and analysis. """
         pyaudio_settings = self.config.get_config('pyaudio_settings')
         pyaudio_settings['stream_callback'] = self.__stream_callback__
-
-        if hasattr(self, 'waveform'):
-            min_start = self.waveform.getnframes() - self.config.get_config('frames_per_sample')
-            # Reset wav file to start, if next sample would retrieve less than the frame count.
-            if self.waveform.tell() >= min_start:
-                self.waveform.rewind() # Reset wave file to initial position.
-
-        self.stream = self.audio.open(**pyaudio_settings)
-        self.stream.start_stream()
+        if not self.source: # Capture in the format samples will be analysed in.
+            pyaudio_settings['format'] = pyaudio_format(self.config.get_config('sample_format'))
+        else: # Sources hold the name of their sample type, until Pyaudio is needed.
+            if isinstance(pyaudio_settings['format'], str):
+                pyaudio_settings['format'] = pyaudio_format(pyaudio_settings['format'])
+            if pyaudio_settings['format'] is None:
+                raise TypeError('Samples of type {} can not be played back, use analyse_file().'
+                                .format(self.source.dtype))
+
+        if self.source and self.source.frames is not None:
+            min_start = self.source.frames - self.config.get_config('frames_per_sample')
+            # Reset source to start, if next sample would retrieve less than the frame count.
+            if self.source.position >= min_start:
+                self.source.rewind() # Reset source to initial position.
+
+        self.audio_stream = self.__get_audio__().open(**pyaudio_settings)
+        self.audio_stream.start_stream()
 
         LOGGER.info('Stream started')
 
     def pause(self):
         """ Pause the stream. Analogous to stop if analysing live music. """
-        if self.stream:
-            self.stream.stop_stream()
+        if self.audio_stream:
+            self.audio_stream.stop_stream()
         else:
             LOGGER.warning('Stream is not active, pausing has no effect.')
 
     def stop(self):
         """ Stop the stream & reset track's position (if set). """
-        if hasattr(self, 'waveform'):
-            self.waveform.setpos(0) # Reset wave file to initial position.
-        if self.stream:
-            self.stream.stop_stream()
+        if self.source:
+            self.source.rewind() # Reset source to initial position.
+            self.clock.reset()
+        if self.audio_stream:
+            self.audio_stream.stop_stream()
         else:
             LOGGER.warning('Stream is not active, stopping has no effect.')
 
+    def close(self):
+        """ Close the stream and stop every node of the hierarchy, releasing their threads.
+
+            The analyser can't be used once closed.
+        """
+        if self.audio_stream:
+            self.audio_stream.close()
+            self.audio_stream = None
+        if self.audio:
+            self.audio.terminate()
+            self.audio = None
+        self.hierarchy.stop()
+
     def set_config(self, **kwargs: dict):
         """ Change configuration options, i.e. what bands should be look at.
 
@@ -132,11 +230,17 @@ class Rtmaii(object):
         """
         self.config.set_config(**kwargs)
         if hasattr(self, 'hierarchy'):
-            # As these changes require a change in the Hierarchy.
-            # We simply recreate the Hierarchy, which is currently quite expensive.
-            if 'merge_channels' in kwargs or 'tasks' in kwargs:
+            structural = ('merge_channels', 'tasks', 'decimation', 'execution',
+                          'default_execution', 'priorities', 'demand_driven',
+                          'vectorise_channels', 'blueprint')
+            if 'pool_size' in kwargs:
+                # The pool's threads are shared by every node, so the Hierarchy is recreated.
                 self.hierarchy.reset_hierarchy()
-            else:
+                return
+            if any(key in kwargs for key in structural):
+                # Only nodes affected are added or removed, the rest keep their state.
+                self.hierarchy.reconfigure()
+            if any(key not in structural for key in kwargs):
                 self.hierarchy.update_nodes()
 
     def set_source(self, source: object = None, **kwargs: dict):
@@ -154,27 +258,28 @@ class Rtmaii(object):
 
             Args:
                 - source: Int (Index of input device) || String (Path of audio file)
+                  || AudioSource (i.e. a numpy array, pipe or generated signal)
                 - kwargs: Additional configuration to be used in Pyaudio.
 
             Please see our readme for more information.
         """
-        if not isinstance(source, (type(None), int, str)):
-            raise TypeError('Provided source {}, should be a str, int or None type. '
+        if not isinstance(source, (type(None), int, str, AudioSource)):
+            raise TypeError('Provided source {}, should be a str, int, AudioSource or None type. '
                             .format(source))
 
         if isinstance(source, int) or source is None:
-            if hasattr(self, 'waveform'):
-                delattr(self, 'waveform')
+            self.source = None
             # Extract relevant configuration to use in waveform.
             try:
-                device = (self.audio.get_device_info_by_index(source) if source
-                          else self.audio.get_default_input_device_info())
+                audio = self.__get_audio__()
+                device = (audio.get_device_info_by_index(source) if source
+                          else audio.get_default_input_device_info())
             except Exception:
                 print('Exception: Input device could not be found.')
                 raise
 
             pyaudio_kwargs = {
-                'format': pyaudio.paInt16,
+                'format': pyaudio_format(self.config.get_config('sample_format')),
                 'input': True
             }
             # Grab relevant default settings to use as pyaudio args.
@@ -183,20 +288,26 @@ class Rtmaii(object):
                                    'rate': int(device['defaultSampleRate'])
                                   })
         else:
-            try:
-                self.waveform = wave.open(source)
-            except Exception:
-                print('Exception: Specified wav file {} could not be opened.'.format(source))
-                raise
-
-            pyaudio_kwargs = { # Extract relevant configuration from .wav file to use in Pyaudio.
-                'format': self.audio.get_format_from_width(self.waveform.getsampwidth()),
+            if isinstance(source, str):
+                try:
+                    source = open_wave(source)
+                except Exception:
+                    print('Exception: Specified wav file {} could not be opened.'.format(source))
+                    raise
+            self.source = source
+
+            pyaudio_kwargs = { # Extract relevant configuration from the source to use in Pyaudio.
+                # Sources that can't be played back, can still be analysed with analyse_file().
+                # The sample type is converted to a Pyaudio format on start(), so analysing
+                # files doesn't import Pyaudio.
+                'format': self.source.dtype.name,
                 'output': True,
-                'rate': self.waveform.getframerate(),
-                'channels': self.waveform.getnchannels()
+                'rate': self.source.sampling_rate,
+                'channels': self.source.channels
             }
 
         self.config.set_source(pyaudio_kwargs, **kwargs)
+        self.clock = CaptureClock(self.config.get_config('sampling_rate'))
         LOGGER.debug('Audio source has been successfully configured.')
 
         if hasattr(self, 'hierarchy'):
@@ -206,20 +317,29 @@ class Rtmaii(object):
             else:
                 self.hierarchy.reset_hierarchy()
 
+    def get_xruns(self) -> dict:
+        """ Returns how many input/output overflows and underflows the stream has reported.
+
+            Input overflows mean audio was lost before it could be analysed,
+            'skipped_frames' estimates how many frames were lost.
+        """
+        return dict(self.clock.xruns)
+
     def get_input_devices(self):
         """ Lists the names and IDs of the input devices on your system. """
-        info = self.audio.get_host_api_info_by_index(0)
+        audio = self.__get_audio__()
+        info = audio.get_host_api_info_by_index(0)
         numdevices = info.get('deviceCount')
         for i in range(0, numdevices):
-            audio_device = self.audio.get_device_info_by_host_api_device_index(0, i)
+            audio_device = audio.get_device_info_by_host_api_device_index(0, i)
             if (audio_device.get('maxInputChannels')) > 0:
                 print("Input Device index {} - {}".format(i, audio_device.get('name')))
 
     @staticmethod
     def set_callbacks(callbacks: list):
-        """ Attach supplied callbacks to signals on the dispatcher.
-            Dispatcher is a loose form of the observer pattern.
-            When the dispatcher is sent a signal, each observee will have their callback run.
+        """ Attach supplied callbacks to signals on the event bus.
+            The bus is a loose form of the observer pattern.
+            When the bus is sent a signal, each observee will have their callback run.
 
             Example:
             ```python
@@ -229,7 +349,7 @@ class Rtmaii(object):
         if isinstance(callbacks, (tuple, list)):
             for callback in callbacks:
                 __validate_callback__(callback)
-                dispatcher.connect(callback['function'], callback['signal'], sender=dispatcher.Any)
+                bus.connect(callback['function'], callback['signal'])
         else:
             raise TypeError('Provided callbacks {}, should be in the form of a list. '
                             .format(callbacks))
@@ -237,7 +357,7 @@ class Rtmaii(object):
 
     @staticmethod
     def remove_callbacks(callbacks: list):
-        """ Remove supplied callbacks from the dispatcher.
+        """ Remove supplied callbacks from the event bus.
 
             Example:
             ```python
@@ -247,12 +367,32 @@ class Rtmaii(object):
         if isinstance(callbacks, (tuple, list)):
             for callback in callbacks:
                 __validate_callback__(callback)
-                dispatcher.disconnect(callback['function'], callback['signal'],
-                                      sender=dispatcher.Any)
+                bus.disconnect(callback['function'], callback['signal'])
         else:
             raise TypeError('Provided callbacks {}, should be in the form of a list/tuple. '
                             .format(callbacks))
 
+    @staticmethod
+    def stream(signal: str, sender: object = bus.ANY,
+               buffer_size: int = 64) -> SignalStream:
+        """ Return an async iterator over the data of a signal, for use in an event loop.
+
+            Must be called from a coroutine, results are consumed on its running loop.
+
+            Example:
+            ```python
+                async with analyser.stream('pitch') as pitches:
+                    async for pitch in pitches:
+                        print(pitch)
+            ```
+
+            Args:
+                - signal: name of the signal to stream, i.e. 'pitch'.
+                - sender: only stream results from this channel, every channel by default.
+                - buffer_size: most results held until consumed, the oldest are dropped.
+        """
+        return SignalStream(signal, sender, buffer_size)
+
     def add_node(self, class_name: str, node_id: str = None, parent: str = 'root',
                  init_args: list = (), **kwargs: dict):
         """ Add a new node to the hierarchy on each channel tree.
@@ -283,6 +423,25 @@ class Rtmaii(object):
         """
         self.hierarchy.remove_node(node_id)
 
+    def queue_stats(self) -> dict:
+        """ Return how many items each node's queue has enqueued, processed and dropped.
+
+            A node dropping most of its input is the bottleneck of analysis,
+            set the 'queue_policies' config option to change how it handles overflows.
+        """
+        return self.hierarchy.queue_stats()
+
+    def stats(self, as_json: bool = False) -> object:
+        """ Return each node's messages in and out, drops, queue depth and processing times.
+
+            Times are measured whilst analysing, so stats can be polled in production,
+            i.e. logging stats(as_json=True) periodically. See Hierarchy.stats().
+
+            Args:
+                - as_json: return the stats as a JSON string.
+        """
+        return self.hierarchy.stats(as_json)
+
 def __validate_callback__(callback: dict):
     """ Validate that a given callbacks parameters.
 
@@ -0,0 +1,192 @@
+""" SCHEDULER MODULE
+
+    - This module contains the Scheduler, running hierarchy nodes on a bounded pool of threads.
+
+    By default every node is started on its own thread, for each channel being analysed.
+    Nodes run by a Scheduler are tasks instead, a node is queued on the pool whenever data
+    is put on its queue, following the hierarchy's parent/peer edges.
+
+    A scheduled node's run loop is left unchanged, when it asks its queue for another item
+    and has already processed one, WorkQueue.get raises Idle to give the pool thread back.
+    The node is run again from the start of run() once it is next scheduled,
+    so any state a node keeps between items must be stored on the node.
+
+    Nodes with a higher priority are run first, when several are waiting for a thread,
+    and are sent data before their siblings, see add_by_priority.
+
+    Execution modes of a node:
+    - 'thread': the node is run on its own thread. [Default]
+    - 'process': the node is run in a child process, see the process module.
+    - 'pool': the node is run on the hierarchy's pool of threads.
+"""
+import threading
+import logging
+from heapq import heappush, heappop
+from itertools import count
+from contextlib import contextmanager
+from rtmaii.workqueue import Idle, Stopped
+
+EXECUTION_MODES = ('thread', 'process', 'pool')
+LOGGER = logging.getLogger()
+BUILDING = threading.local() # Scheduler nodes being created on this thread are added to.
+
+class Scheduler(object):
+    """ Runs nodes on a bounded pool of threads, whenever they have data to process.
+
+        Args:
+            - threads: amount of threads in the pool.
+
+        Attributes:
+            - condition: Lock of the ready queue, notified whenever a node is scheduled or stops.
+            - ready (list): heap of nodes waiting for a thread from the pool,
+              by highest priority then the order they were scheduled in.
+            - nodes (set): nodes run by the scheduler, nodes are removed if they stop.
+            - threads (list): threads of the pool.
+            - stopped (bool): True once the pool has been stopped, see stop().
+    """
+    def __init__(self, threads: int):
+        self.condition = threading.Condition()
+        self.ready = []
+        self.order = count()
+        self.nodes = set()
+        self.stopped = False
+        self.threads = [threading.Thread(target=self.__work__, daemon=True)
+                        for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def add(self, node: object):
+        """ Run a node on the pool, instead of starting its thread.
+
+            Args:
+                - node: node to run, with a WorkQueue as its queue.
+        """
+        with self.condition:
+            self.nodes.add(node)
+        node.queue.set_scheduler(lambda: self.schedule(node))
+
+    def schedule(self, node: object):
+        """ Queue a node to be run by the next free thread of the pool.
+
+            Args:
+                - node: node with data to process.
+        """
+        with self.condition:
+            heappush(self.ready, (-getattr(node, 'priority', 0), next(self.order), node))
+            self.condition.notify()
+
+    def is_running(self, node: object) -> bool:
+        """ Check whether a node is still run by the scheduler, nodes that stop are removed. """
+        return node in self.nodes
+
+    def join_node(self, node: object, timeout: float = None) -> bool:
+        """ Wait until a node has stopped, returning False if the timeout expired.
+
+            Args:
+                - node: node to wait for.
+                - timeout: maximum time in seconds to wait, waits forever if None.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: node not in self.nodes, timeout)
+
+    def stop(self):
+        """ Stop the threads of the pool, once they finish the node they are running. """
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def join(self, timeout: float = None):
+        """ Wait for the threads of the pool to stop, see stop().
+
+            Args:
+                - timeout: maximum time in seconds to wait for each thread.
+        """
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def __work__(self):
+        """ Run scheduled nodes, until they give their thread back. """
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.ready or self.stopped)
+                if self.stopped:
+                    return
+                node = heappop(self.ready)[2]
+            try:
+                node.run()
+            except Idle:
+                continue
+            except Exception: # Matches a node's thread dying, as with the 'thread' mode.
+                LOGGER.exception('Node %s stopped running on the scheduler.', node)
+            with self.condition:
+                self.nodes.discard(node)
+                self.condition.notify_all()
+
+@contextmanager
+def scheduling(scheduler: Scheduler):
+    """ Add nodes created within the context to a scheduler, rather than starting their thread.
+
+        Args:
+            - scheduler: scheduler to add nodes to.
+    """
+    BUILDING.scheduler = scheduler
+    try:
+        yield scheduler
+    finally:
+        BUILDING.scheduler = None
+
+def start_node(node: threading.Thread):
+    """ Start a node on the scheduler nodes are being created for, or on its own thread.
+
+        Args:
+            - node: node to start, called by the Worker and Coordinator base classes.
+    """
+    run = node.run
+    def run_until_stopped():
+        """ Run the node, returning once its queue is closed. """
+        try:
+            run()
+        except Stopped:
+            pass
+    node.run = run_until_stopped
+
+    scheduler = getattr(BUILDING, 'scheduler', None)
+    if scheduler:
+        node.scheduler = scheduler
+        scheduler.add(node)
+    else:
+        node.start()
+
+def add_by_priority(peers: list, node: object):
+    """ Add a node to a list of peers, after any peer with the same or a higher priority.
+
+        Args:
+            - peers: peer list of the node's parent, in the order peers are sent data.
+            - node: node to add, nodes without a priority have a priority of 0.
+    """
+    priority = getattr(node, 'priority', 0)
+    index = next((index for index, peer in enumerate(peers)
+                  if getattr(peer, 'priority', 0) < priority), len(peers))
+    peers.insert(index, node)
+
+def join_node(node: threading.Thread, timeout: float = None):
+    """ Wait for a node to stop, on its own thread or on a scheduler.
+
+        Args:
+            - node: node to wait for.
+            - timeout: maximum time in seconds to wait, waits forever if None.
+    """
+    scheduler = getattr(node, 'scheduler', None)
+    if scheduler:
+        scheduler.join_node(node, timeout)
+    elif node.ident is not None: # Nodes that were never started have nothing to wait for.
+        threading.Thread.join(node, timeout)
+
+def is_running(node: threading.Thread) -> bool:
+    """ Check whether a node is still running, on its own thread or on a scheduler.
+
+        Args:
+            - node: node to check.
+    """
+    scheduler = getattr(node, 'scheduler', None)
+    return scheduler.is_running(node) if scheduler else node.is_alive()
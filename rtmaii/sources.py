@@ -0,0 +1,442 @@
+""" SOURCES MODULE
+
+    - This module contains the audio sources that can feed samples into the library.
+
+    All sources inherit the AudioSource base class, and return interleaved samples,
+    i.e. [L, R, L, R, ...] for a stereo source, so they can be pushed straight to the Hierarchy.
+
+    Samples are returned in the source's native type (AudioSource.dtype),
+    the RootCoordinator converts them to the configured 'sample_format' with convert_samples().
+
+    None of these sources require an audio device, so they can be used for headless analysis,
+    tests and benchmarks.
+
+    MappedWave reads wav files through a memory map of the file's data chunk,
+    so samples are read straight from the page cache as views, without copying them
+    into a new bytes object for every sample. This keeps the memory footprint flat,
+    even when analysing multi-GB multi-channel recordings.
+
+    Users wanting to feed their own audio into the library, should inherit from AudioSource.
+"""
+import os
+import struct
+import sys
+import wave
+from numpy import (memmap, dtype as numpy_dtype, asarray, empty, zeros, int16, float32,
+                   frombuffer, arange, sin, pi, repeat, clip, multiply, issubdtype, floating)
+from numpy.random import RandomState
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# Numpy types of (format, sample width) pairs, 24-bit samples are mapped as bytes and unpacked.
+SAMPLE_TYPES = {
+    (WAVE_FORMAT_PCM, 1): 'u1',
+    (WAVE_FORMAT_PCM, 2): '<i2',
+    (WAVE_FORMAT_PCM, 3): 'u1',
+    (WAVE_FORMAT_PCM, 4): '<i4',
+    (WAVE_FORMAT_IEEE_FLOAT, 4): '<f4',
+    (WAVE_FORMAT_IEEE_FLOAT, 8): '<f8',
+}
+# Sample formats the library can analyse in.
+SAMPLE_FORMATS = ('int16', 'float32')
+# Integer types of arrays read by ArraySource, 8-bit samples are unsigned as in wav files.
+ARRAY_TYPES = ('uint8', 'int16', 'int32')
+
+class AudioSource(object):
+    """ Base class of audio sources, responsible for initializing shared attributes.
+
+        Args:
+            - sampling_rate: sampling rate of the source (Hz).
+            - channels: amount of interleaved channels in the source.
+            - frames: total amount of frames in the source, None if unknown (i.e. a pipe).
+            - dtype: type of the samples returned by read().
+
+        Attributes:
+            - position (int): index of the next frame to be read.
+    """
+    def __init__(self, sampling_rate: int, channels: int = 1, frames: int = None,
+                 dtype: str = 'int16'):
+        self.sampling_rate = sampling_rate
+        self.channels = channels
+        self.frames = frames
+        self.dtype = numpy_dtype(dtype)
+        self.position = 0
+
+    def read(self, frame_count: int) -> object:
+        """ Return the next frame_count frames of interleaved samples.
+
+            Fewer frames are returned when the source is ending, and an empty array once it has.
+
+            Args:
+                - frame_count: amount of frames to read.
+        """
+        raise NotImplementedError("Read should be implemented")
+
+    def seek(self, frame: int):
+        """ Move to a frame of the source, so the next read starts from it.
+
+            Sources that can't seek directly read and discard frames to get there,
+            sources that can't rewind (i.e. a pipe) can only seek forwards.
+
+            Args:
+                - frame: index of the frame to move to.
+        """
+        if frame < self.position:
+            self.rewind()
+        if frame < self.position:
+            raise ValueError('Source can not seek backwards to frame {}.'.format(frame))
+        while self.position < frame:
+            if not len(self.read(min(frame - self.position, 65536))):
+                break # Reached the end of the source.
+
+    def rewind(self):
+        """ Move back to the start of the source, sources that can't rewind ignore this. """
+        pass
+
+    def close(self):
+        """ Release any resources held by the source. """
+        pass
+
+class ArraySource(AudioSource):
+    """ Source reading from a numpy array already in memory.
+
+        Args:
+            - samples: array of shape (frames,) or (frames, channels).
+              Floating point arrays are expected to be in the range [-1, 1] and are read as
+              float32, integer arrays must be one of ARRAY_TYPES and are read as they are,
+              full scale for their type, as samples of wav files are.
+            - sampling_rate: sampling rate of the samples (Hz).
+
+        Raises:
+            - TypeError: if the array holds any other type, i.e. int64, numpy's default
+              integer type, whose scale can't be known.
+    """
+    def __init__(self, samples: object, sampling_rate: int):
+        samples = asarray(samples)
+        if issubdtype(samples.dtype, floating):
+            dtype = 'float32'
+        elif samples.dtype.name in ARRAY_TYPES:
+            dtype = samples.dtype.name
+        else:
+            raise TypeError('Samples of type {} can not be read, convert them to one of {}, '
+                            'or a floating point type.'.format(samples.dtype, ARRAY_TYPES))
+        channels = 1 if samples.ndim == 1 else samples.shape[1]
+        AudioSource.__init__(self, sampling_rate, channels, len(samples), dtype)
+        # A C ordered (frames, channels) array is already interleaved.
+        self.samples = samples.astype(self.dtype, copy=False).reshape(-1)
+
+    def read(self, frame_count: int) -> object:
+        start = self.position * self.channels
+        self.position = min(self.position + frame_count, self.frames)
+        return self.samples[start:self.position * self.channels]
+
+    def seek(self, frame: int):
+        self.position = min(max(frame, 0), self.frames)
+
+    def rewind(self):
+        self.position = 0
+
+class PCMSource(AudioSource):
+    """ Source reading raw little-endian PCM from a binary stream.
+
+        Useful for analysing the output of other programs through a pipe, i.e.
+        ```bash
+            ffmpeg -i track.mp3 -f s16le -ac 2 -ar 44100 - | python analyse.py
+        ```
+
+        Args:
+            - sampling_rate: sampling rate of the stream (Hz).
+            - channels: amount of interleaved channels in the stream.
+            - stream: binary stream to read from, defaults to stdin.
+            - dtype: type of the samples, '<i2' for s16le, '<i4' for s32le or '<f4' for f32le.
+    """
+    def __init__(self, sampling_rate: int, channels: int = 1, stream: object = None,
+                 dtype: str = '<i2'):
+        AudioSource.__init__(self, sampling_rate, channels, dtype=dtype)
+        self.stream = stream if stream is not None else sys.stdin.buffer
+
+    def read(self, frame_count: int) -> object:
+        samples = empty(frame_count * self.channels, dtype=self.dtype)
+        buffer = memoryview(samples).cast('B')
+        filled = 0
+        while filled < len(buffer): # Pipes can return less than requested, so keep reading.
+            count = self.stream.readinto(buffer[filled:])
+            if not count:
+                break
+            filled += count
+        # Drop any incomplete frame at the end.
+        frames = filled // (self.dtype.itemsize * self.channels)
+        self.position += frames
+        return samples[:frames * self.channels]
+
+    def close(self):
+        self.stream.close()
+
+class SyntheticSource(AudioSource):
+    """ Source generating a mix of sine waves with optional seeded noise.
+
+        Generated audio is the same every time the source is created with the same seed,
+        so it can be used to create repeatable tests and benchmarks.
+
+        Args:
+            - frequencies: frequencies (Hz) of the sine waves to mix.
+            - sampling_rate: sampling rate to generate at (Hz).
+            - channels: amount of channels, each channel receives the same signal.
+            - duration: length of the source in seconds, runs forever if None.
+            - amplitude: peak amplitude of the mix, in the range [0, 1].
+            - noise: standard deviation of gaussian noise added, in the range [0, 1].
+            - seed: seed of the noise generator.
+            - dtype: 'int16' or 'float32', float32 samples are in the range [-1, 1].
+    """
+    def __init__(self, frequencies: tuple = (440,), sampling_rate: int = 44100,
+                 channels: int = 1, duration: float = None, amplitude: float = 0.5,
+                 noise: float = 0, seed: int = None, dtype: str = 'int16'):
+        frames = None if duration is None else int(duration * sampling_rate)
+        AudioSource.__init__(self, sampling_rate, channels, frames, dtype)
+        self.frequencies = frequencies
+        self.amplitude = amplitude
+        self.noise = noise
+        self.seed = seed
+        self.random = RandomState(seed)
+
+    def read(self, frame_count: int) -> object:
+        if self.frames is not None:
+            frame_count = max(min(frame_count, self.frames - self.position), 0)
+        time_step = (self.position + arange(frame_count)) / self.sampling_rate
+        signal = sum(sin(2 * pi * frequency * time_step) for frequency in self.frequencies)
+        signal = signal * self.amplitude / max(len(self.frequencies), 1)
+        if self.noise:
+            signal = signal + self.random.normal(0, self.noise, frame_count)
+        self.position += frame_count
+        signal = clip(signal, -1, 1)
+        if self.dtype == float32:
+            samples = signal.astype(float32)
+        else:
+            samples = (signal * 32767).astype(int16)
+        return repeat(samples, self.channels) # Interleave the same signal on each channel.
+
+    def rewind(self):
+        self.position = 0
+        self.random = RandomState(self.seed)
+
+class MappedWave(AudioSource):
+    """ Read-only wav file reader backed by a numpy memmap of the data chunk.
+
+        Mirrors the methods of the standard library's wave reader used by the library,
+        so it can be used as a drop in replacement for wave.open().
+
+        Supports 8/16/24/32-bit integer and 32/64-bit float files,
+        24-bit samples are unpacked to full scale int32, so can't be read as views.
+
+        Args:
+            - path: path of the wav file to open.
+
+        Attributes:
+            - samples (memmap): interleaved samples of the file, read-only.
+            - position (int): index of the next frame to be read. (Inherited)
+    """
+    def __init__(self, path: str):
+        self.path = path
+        format_tag, channels, self.sample_width, sampling_rate, offset, size = read_header(path)
+        frames = min(size, os.path.getsize(path) - offset) // (channels * self.sample_width)
+        mapped_type = numpy_dtype(SAMPLE_TYPES[format_tag, self.sample_width])
+        AudioSource.__init__(self, sampling_rate, channels, frames,
+                             'int32' if self.sample_width == 3 else mapped_type)
+        # 24-bit samples are mapped as individual bytes.
+        mapped_width = self.sample_width // mapped_type.itemsize
+        self.samples = memmap(path, dtype=mapped_type, mode='r', offset=offset,
+                              shape=(self.frames * self.channels * mapped_width,))
+
+    def read(self, frame_count: int) -> object:
+        """ Return a view of the next frame_count frames of interleaved samples.
+
+            Args:
+                - frame_count: amount of frames to read, fewer are returned at the end of a file.
+        """
+        start = self.position * self.channels
+        self.position = min(self.position + frame_count, self.frames)
+        if self.sample_width == 3:
+            return unpack_24bit(self.samples[start * 3:self.position * self.channels * 3])
+        return self.samples[start:self.position * self.channels]
+
+    def readframes(self, frame_count: int) -> memoryview:
+        """ Return the next frame_count frames as a read-only buffer, like wave.readframes(). """
+        return memoryview(self.read(frame_count)).cast('B')
+
+    def getnchannels(self) -> int:
+        """ Returns amount of channels in the file. """
+        return self.channels
+
+    def getsampwidth(self) -> int:
+        """ Returns the sample width of the file in bytes. """
+        return self.sample_width
+
+    def getframerate(self) -> int:
+        """ Returns the sampling rate of the file. """
+        return self.sampling_rate
+
+    def getnframes(self) -> int:
+        """ Returns amount of frames in the file. """
+        return self.frames
+
+    def tell(self) -> int:
+        """ Returns the current frame position. """
+        return self.position
+
+    def setpos(self, position: int):
+        """ Move to a frame position in the file.
+
+            Args:
+                - position: frame index to move to.
+        """
+        if not 0 <= position <= self.frames:
+            raise ValueError('Position {} is outside of the file.'.format(position))
+        self.position = position
+
+    def seek(self, frame: int):
+        """ Move to a frame of the file, without reading any samples before it.
+
+            Args:
+                - frame: index of the frame to move to.
+        """
+        self.setpos(min(max(frame, 0), self.frames))
+
+    def rewind(self):
+        """ Move back to the start of the file. """
+        self.position = 0
+
+    def close(self):
+        """ Release the memory map. """
+        del self.samples
+
+class WaveFile(AudioSource):
+    """ Wav file reader using the standard library's wave module.
+
+        Used for files that can't be memory mapped.
+
+        Args:
+            - path: path of the wav file to open.
+    """
+    def __init__(self, path: str):
+        self.waveform = wave.open(path)
+        self.sample_width = self.waveform.getsampwidth()
+        mapped_type = SAMPLE_TYPES[WAVE_FORMAT_PCM, self.sample_width]
+        AudioSource.__init__(self, self.waveform.getframerate(), self.waveform.getnchannels(),
+                             self.waveform.getnframes(),
+                             'int32' if self.sample_width == 3 else mapped_type)
+
+    def read(self, frame_count: int) -> object:
+        data = self.waveform.readframes(frame_count)
+        self.position = self.waveform.tell()
+        if self.sample_width == 3:
+            return unpack_24bit(frombuffer(data, 'u1'))
+        return frombuffer(data, self.dtype)
+
+    def seek(self, frame: int):
+        self.waveform.setpos(min(max(frame, 0), self.frames))
+        self.position = self.waveform.tell()
+
+    def rewind(self):
+        self.waveform.rewind()
+        self.position = 0
+
+    def close(self):
+        self.waveform.close()
+
+def open_wave(path: str) -> AudioSource:
+    """ Open a wav file as an audio source, memory mapping it if possible.
+
+        Args:
+            - path: path of the wav file.
+    """
+    try:
+        return MappedWave(path)
+    except (ValueError, OSError):
+        return WaveFile(path)
+
+def unpack_24bit(data: object) -> object:
+    """ Unpack little-endian 24-bit samples into full scale int32 samples.
+
+        Args:
+            - data: uint8 array of packed samples, 3 bytes per sample.
+    """
+    unpacked = zeros((len(data) // 3, 4), dtype='u1')
+    unpacked[:, 1:] = data.reshape(-1, 3) # Lowest byte is left empty, keeping the sign bit.
+    return unpacked.view('<i4').reshape(-1)
+
+def convert_samples(samples: object, sample_format: str, out: object = None) -> object:
+    """ Convert samples of any source type to the sample format used for analysis.
+
+        Samples are kept on the int16 scale, i.e. a full scale float32 sample of 1.0
+        becomes 32768, so amplitude thresholds behave the same for each format.
+
+        Args:
+            - samples: samples returned by an audio source.
+            - sample_format: 'int16' or 'float32'.
+            - out: (optional) array of the same length to write the converted samples into,
+              int16 and float sources are converted without allocating a new array.
+    """
+    target = numpy_dtype(sample_format)
+    kind = samples.dtype.kind
+    if samples.dtype == target and kind == 'i':
+        if out is None:
+            return samples
+        out[...] = samples
+        return out
+    if kind == 'f':
+        scale, offset = 32768, 0
+    elif kind == 'u': # 8-bit wav files are unsigned.
+        scale, offset = 256, 128
+    else:
+        scale, offset = 2.0 ** (16 - 8 * samples.dtype.itemsize), 0
+
+    if out is not None and target.kind == 'f' and not offset:
+        return multiply(samples, target.type(scale), out=out, casting='unsafe')
+    scaled = (samples.astype(float32) - offset) * float32(scale)
+    if target.kind == 'i':
+        scaled = clip(scaled, -32768, 32767)
+    if out is None:
+        return scaled.astype(target, copy=False)
+    out[...] = scaled
+    return out
+
+def read_header(path: str) -> tuple:
+    """ Find the format and location of the sample data of a wav file.
+
+        Args:
+            - path: path of the wav file.
+
+        Returns:
+            - tuple: (format_tag, channels, sample_width, sampling_rate, data_offset, data_size)
+    """
+    with open(path, 'rb') as wav_file:
+        riff, _, wave = struct.unpack('<4sI4s', wav_file.read(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError('{} is not a RIFF wav file.'.format(path))
+
+        fmt = None
+        while True:
+            chunk_header = wav_file.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError('{} does not contain a data chunk.'.format(path))
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+            if chunk_id == b'fmt ':
+                chunk = wav_file.read(chunk_size + chunk_size % 2)
+                fmt = list(struct.unpack('<HHIIHH', chunk[:16]))
+                if fmt[0] == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                    # The actual format is stored at the start of the sub format GUID.
+                    fmt[0] = struct.unpack('<H', chunk[24:26])[0]
+            elif chunk_id == b'data':
+                break
+            else:
+                wav_file.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+        if fmt is None:
+            raise ValueError('{} does not contain a format chunk.'.format(path))
+        format_tag, channels, sampling_rate, _, block_align, _ = fmt
+        sample_width = block_align // channels
+        if (format_tag, sample_width) not in SAMPLE_TYPES:
+            raise ValueError('Format {} with {} byte samples is not supported.'
+                             .format(format_tag, sample_width))
+        return format_tag, channels, sample_width, sampling_rate, wav_file.tell(), chunk_size
@@ -0,0 +1,110 @@
+""" STREAM MODULE
+
+    - This module contains SignalStream, an async iterator over the results of a signal.
+
+    Results are raised on the threads of the hierarchy's nodes, a SignalStream hands them
+    to an asyncio event loop so they can be consumed with `async for`.
+
+    Each stream buffers a bounded amount of results, dropping the oldest when full.
+    Only one wake up is scheduled with loop.call_soon_threadsafe at a time,
+    so a burst of results costs the node's thread a single call into the loop.
+"""
+import asyncio
+import threading
+from collections import deque
+from rtmaii import bus
+
+class SignalStream(object):
+    """ Async iterator over the data of a signal, raised on any thread.
+
+        Example:
+        ```python
+            async with SignalStream('pitch') as pitches:
+                async for pitch in pitches:
+                    print(pitch)
+        ```
+
+        Args:
+            - signal: name of the signal to stream, i.e. 'pitch'.
+            - sender: only stream results from this channel, every channel by default.
+            - buffer_size: most results held until they are consumed.
+            - loop: event loop to consume results on, the running loop by default.
+
+        Attributes:
+            - buffer (deque): results waiting to be consumed, oldest first.
+            - dropped (int): amount of results dropped, as the buffer was full.
+            - closed (bool): True once the stream has been closed, see close().
+    """
+    def __init__(self, signal: str, sender: object = bus.ANY, buffer_size: int = 64,
+                 loop: asyncio.AbstractEventLoop = None):
+        if buffer_size < 1:
+            raise ValueError('Streams need a buffer_size of at least 1.')
+        self.signal = signal
+        self.sender = sender
+        self.loop = loop or asyncio.get_running_loop()
+        self.lock = threading.Lock()
+        self.buffer = deque()
+        self.buffer_size = buffer_size
+        self.dropped = 0
+        self.closed = False
+        self.wake_pending = False
+        self.waiter = None
+        bus.connect(self.__receive__, signal, sender, weak=False)
+
+    def close(self):
+        """ Stop receiving results, iteration ends once the buffered results are consumed. """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        bus.disconnect(self.__receive__, self.signal, self.sender)
+        self.__schedule_wake__()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> object:
+        while True:
+            with self.lock:
+                if self.buffer:
+                    return self.buffer.popleft()
+                if self.closed:
+                    raise StopAsyncIteration
+            # Wakes are only run on the loop, so none can be missed before waiting.
+            self.waiter = self.loop.create_future()
+            await self.waiter
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info: tuple):
+        self.close()
+
+    def __receive__(self, data: object = None):
+        """ Buffer a result raised on a node's thread, waking the consumer if needed. """
+        with self.lock:
+            if self.closed:
+                return
+            if len(self.buffer) >= self.buffer_size:
+                self.buffer.popleft()
+                self.dropped += 1
+            self.buffer.append(data)
+        self.__schedule_wake__()
+
+    def __schedule_wake__(self):
+        """ Schedule a wake up of the consumer on the loop, unless one is already pending. """
+        with self.lock:
+            if self.wake_pending:
+                return
+            self.wake_pending = True
+        try:
+            self.loop.call_soon_threadsafe(self.__wake__)
+        except RuntimeError: # The loop has been closed, nothing is left to consume results.
+            self.close()
+
+    def __wake__(self):
+        """ Wake the consumer, run on the loop. """
+        with self.lock:
+            self.wake_pending = False
+        if self.waiter and not self.waiter.done():
+            self.waiter.set_result(None)
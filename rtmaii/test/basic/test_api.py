@@ -10,8 +10,11 @@
 
     Configuration based tests, are already covered by the configuration module.
 """
+import asyncio
 import unittest
 from rtmaii import rtmaii
+from rtmaii.timing import send
+from rtmaii.sources import SyntheticSource
 
 class TestSuite(unittest.TestCase):
     """ Test Suite for the RTMA module. """
@@ -50,3 +53,28 @@ class TestSuite(unittest.TestCase):
         """ Throw error on invalid input to remove_callbacks function. """
         mock = 'ishouldntbeastring'
         self.assertRaises(TypeError, rtmaii.Rtmaii.set_callbacks, mock)
+
+    def test_stream_frames(self):
+        """ Test that only the frames read from an ending source are counted by the clock. """
+        source = SyntheticSource(duration=0.05, channels=2)
+        analyser = rtmaii.Rtmaii(source=source, config={'tasks': {'genre': False}})
+        try:
+            for _ in range(3):
+                analyser.__stream_callback__(None, 1024, {}, 0)
+            self.assertEqual(analyser.clock.index, source.frames)
+        finally:
+            analyser.hierarchy.stop()
+
+    def test_stream(self):
+        """ Test that signals can be streamed from an analyser, which closes its audio stream. """
+        analyser = rtmaii.Rtmaii(source=SyntheticSource(duration=0.05),
+                                 config={'tasks': {'genre': False}})
+        async def consume():
+            async with analyser.stream('api_streamed') as stream:
+                send('api_streamed', 0, 440)
+                return await stream.__anext__()
+        try:
+            self.assertEqual(asyncio.run(consume()), 440)
+        finally:
+            analyser.close()
+        self.assertIsNone(analyser.audio_stream)
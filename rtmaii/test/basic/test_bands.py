@@ -3,7 +3,7 @@
     - Any tests against the bands analysis module methods will be contained here.
 """
 import unittest
-from numpy import arange, zeros
+from numpy import arange, zeros, stack
 from rtmaii.analysis import frequency
 
 class TestSuite(unittest.TestCase):
@@ -53,6 +53,17 @@ class TestSuite(unittest.TestCase):
         bands = frequency.frequency_bands(spectrum, {'full_range': [2, 3]}, len(spectrum) * 2)
         self.assertEqual(bands['full_range'], 1)
 
+    def test_frequency_bands_block(self):
+        """ Test that each channel of a block gets the presence it would get alone. """
+        bands = {'low': [0, 20], 'high': [20, 100]}
+        spectra = stack((self.spectrum, self.spectrum[::-1]))
+        presence = frequency.frequency_bands(spectra, bands, self.spectrum_len * 2)
+        self.assertEqual(len(presence), 2)
+        for channel, spectrum in enumerate(spectra):
+            expected = frequency.frequency_bands(spectrum, bands, self.spectrum_len * 2)
+            for band, value in expected.items():
+                self.assertAlmostEqual(presence[channel][band], value)
+
     def test_frequency_bands_to_bins(self):
         """ Tests that the frequency bins points are correctly found. """
         spectrum = arange(0, 102, 1)
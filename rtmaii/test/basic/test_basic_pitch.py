@@ -5,7 +5,7 @@
     By basic I mean just tests against a basic sine wave to make sure the components work.
 """
 import unittest
-from numpy import sin, pi, arange, zeros
+from numpy import sin, pi, arange, zeros, stack, isnan
 from rtmaii.analysis import pitch
 from rtmaii.analysis import spectral
 
@@ -69,11 +69,57 @@ class TestSuite(unittest.TestCase):
         spectrum[9] = 19
         self.assertEqual(pitch.pitch_from_hps(spectrum, 160, 3), 9)
 
+    def test_read_only_hps(self):
+        """ Test that hps works on a read-only spectrum, leaving it unchanged. """
+        spectrum = zeros(80)
+        spectrum[19] = 20
+        spectrum[9] = 19
+        spectrum.flags.writeable = False
+        self.assertEqual(pitch.pitch_from_hps(spectrum, 160, 4), 9)
+        self.assertEqual(spectrum[9], 19)
+
     def test_basic_hps(self):
         """ Test that the harmonic product spectrum algorithm can detect the pitch. """
         self.assertAlmostEqual(pitch.pitch_from_hps(self.frequency_spectrum, self.sampling_rate, 2),
                                self.frequency, 2)
 
+    def test_block_pitch(self):
+        """ Test that each channel of a block gets the pitch it would get alone. """
+        spectra = stack((self.frequency_spectrum, self.frequency_spectrum * 2))
+        for estimate in (pitch.pitch_from_fft(spectra, self.sampling_rate),
+                         pitch.pitch_from_hps(spectra, self.sampling_rate, 2)):
+            self.assertEqual(len(estimate), 2)
+            for channel_pitch in estimate:
+                self.assertAlmostEqual(channel_pitch, self.frequency, 2)
+        signals = stack((self.sin_wave, self.sin_wave))
+        single = pitch.pitch_from_zero_crossings(self.sin_wave, self.sampling_rate)
+        self.assertListEqual(pitch.pitch_from_zero_crossings(signals, self.sampling_rate),
+                             [single] * 2)
+
+    def test_block_silent_channel(self):
+        """ Test that a silent channel of a block has no pitch, without affecting the others. """
+        signals = stack((self.sin_wave, zeros(len(self.sin_wave))))
+        convolved = stack([spectral.convolve_signal(signal) for signal in signals])
+        for estimate, inputs in ((pitch.pitch_from_zero_crossings, signals),
+                                 (pitch.pitch_from_auto_correlation, convolved)):
+            channel_pitch, silent_pitch = estimate(inputs, self.sampling_rate)
+            self.assertAlmostEqual(channel_pitch, estimate(inputs[0], self.sampling_rate))
+            self.assertTrue(isnan(silent_pitch))
+
+    def test_block_channels(self):
+        """ Test that channels of a block with different pitches are estimated independently. """
+        signals = stack((self.sin_wave, sin(2 * pi * 8 * self.timestep / self.sampling_rate)))
+        convolved = stack([spectral.convolve_signal(signal) for signal in signals])
+        spectra = stack((self.frequency_spectrum, self.frequency_spectrum[::-1] * 2))
+        for estimate, inputs in ((pitch.pitch_from_zero_crossings, signals),
+                                 (pitch.pitch_from_auto_correlation, convolved),
+                                 (pitch.pitch_from_fft, spectra),
+                                 (lambda data, rate: pitch.pitch_from_hps(data, rate, 3), spectra)):
+            block = estimate(inputs, self.sampling_rate)
+            for channel, channel_pitch in enumerate(block):
+                self.assertAlmostEqual(channel_pitch,
+                                       estimate(inputs[channel], self.sampling_rate))
+
     def test_interpolation(self):
         """ Test that interpolation works on basic values. """
         values = [20, 50, 40] # The index will be interpolated to 1.5.
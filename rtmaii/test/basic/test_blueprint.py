@@ -0,0 +1,109 @@
+""" BLUEPRINT MODULE TESTS
+
+    - Any tests against validating, loading and compiling blueprints will be contained here.
+"""
+import unittest
+import json
+import os
+import tempfile
+from rtmaii.blueprint import compile_blueprint, COMPILED, CACHE_SIZE
+from rtmaii.worker import HPSWorker
+from rtmaii import registry
+
+class DeepHPSWorker(HPSWorker):
+    """ Grandchild of Worker, to test that deep subclasses are registered. """
+    pass
+
+BLUEPRINT = {
+    'nodes': {
+        'HPSWorker': {'queue_policy': {'policy': 'drop_newest', 'queue_length': 1},
+                      'deadline': 0.1},
+        'Spectrum': {'class': 'SpectrumCoordinator', 'analysis_rate': 20},
+        'FrequencyCoordinator': {},
+    },
+    'edges': [['Spectrum', 'HPSWorker'], ['FrequencyCoordinator', 'Spectrum']]
+}
+
+class TestSuite(unittest.TestCase):
+    """ Test Suite for the blueprint module. """
+
+    def test_compile(self):
+        """ Test that nodes are ordered parents first, with their settings. """
+        plan = compile_blueprint(BLUEPRINT)
+        self.assertListEqual([spec['node_id'] for spec in plan],
+                             ['FrequencyCoordinator', 'Spectrum', 'HPSWorker'])
+        self.assertEqual(plan[1]['class_name'], 'SpectrumCoordinator')
+        self.assertEqual(plan[1]['parent'], 'FrequencyCoordinator')
+        self.assertEqual(plan[1]['settings'], {'analysis_rate': 20})
+        self.assertEqual(plan[2]['settings']['deadline'], 0.1)
+
+    def test_cached(self):
+        """ Test that a blueprint is only compiled once. """
+        plan = compile_blueprint(BLUEPRINT)
+        self.assertIs(compile_blueprint(json.loads(json.dumps(BLUEPRINT))), plan)
+
+    def test_cache_size(self):
+        """ Test that only the plans used last are cached, and callables aren't cached. """
+        COMPILED.clear()
+        for rate in range(CACHE_SIZE + 1):
+            compile_blueprint({'nodes': {'HPSWorker': {'analysis_rate': rate + 1}}})
+        self.assertEqual(len(COMPILED), CACHE_SIZE)
+        blueprint = {'nodes': {'HPSWorker': {'queue_policy': {
+            'policy': 'coalesce', 'coalesce': lambda queued, new: new}}}}
+        plan = compile_blueprint(blueprint)
+        self.assertIsNot(compile_blueprint(blueprint), plan)
+        self.assertEqual(len(COMPILED), CACHE_SIZE)
+        COMPILED.clear()
+
+    def test_file(self):
+        """ Test that JSON blueprint files are loaded, and compiled again once edited. """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'blueprint.json')
+            with open(path, 'w') as blueprint_file:
+                json.dump(BLUEPRINT, blueprint_file)
+            plan = compile_blueprint(path)
+            self.assertEqual(len(plan), 3)
+            self.assertIs(compile_blueprint(path), plan)
+            with open(path, 'w') as blueprint_file:
+                json.dump({'nodes': {'FrequencyCoordinator': {}}}, blueprint_file)
+            os.utime(path, ns=(0, 0)) # Make sure the modification time changes.
+            self.assertEqual(len(compile_blueprint(path)), 1)
+            COMPILED.clear()
+
+    def test_yaml(self):
+        """ Test that YAML blueprint files are loaded, if PyYAML is installed. """
+        try:
+            import yaml
+        except ImportError:
+            self.skipTest('PyYAML is not installed.')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'blueprint.yaml')
+            with open(path, 'w') as blueprint_file:
+                yaml.safe_dump(BLUEPRINT, blueprint_file)
+            self.assertEqual(compile_blueprint(path)[-1]['node_id'], 'HPSWorker')
+
+    def test_invalid(self):
+        """ Test that invalid blueprints are rejected when compiled. """
+        invalid = [
+            ({'nodes': {'MissingWorker': {}}}, ValueError),
+            ({'nodes': {'HPSWorker': {'rate': 20}}}, KeyError),
+            ({'nodes': {'HPSWorker': {'analysis_rate': -1}}}, ValueError),
+            ({'nodes': {'HPSWorker': {'queue_policy': {'policy': 'coalesce'}}}}, TypeError),
+            ({'nodes': {'HPSWorker': {}}, 'edges': [['SpectrumCoordinator', 'HPSWorker']]},
+             KeyError),
+            ({'nodes': {'HPSWorker': {}, 'BandsWorker': {}},
+              'edges': [['BandsWorker', 'HPSWorker']]}, ValueError),
+            ({'nodes': {'A': {'class': 'SpectrumCoordinator'},
+                        'B': {'class': 'SpectrumCoordinator'}},
+              'edges': [['A', 'B'], ['B', 'A']]}, ValueError),
+            ({'nodes': {'root': {'class': 'HPSWorker'}}}, ValueError),
+        ]
+        for blueprint, error in invalid:
+            with self.assertRaises(error):
+                compile_blueprint(blueprint)
+
+    def test_registry(self):
+        """ Test that deep subclasses of nodes are registered by name. """
+        self.assertIs(registry.node_class('DeepHPSWorker'), DeepHPSWorker)
+        plan = compile_blueprint({'nodes': {'Pitch': {'class': 'DeepHPSWorker'}}})
+        self.assertEqual(plan[0]['class_name'], 'DeepHPSWorker')
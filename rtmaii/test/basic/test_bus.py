@@ -0,0 +1,134 @@
+""" BUS MODULE TESTS
+
+    - Any tests against raising signals on the event bus will be contained here.
+"""
+import gc
+import unittest
+from pydispatch import dispatcher
+from rtmaii.bus import EventBus, ANY, accepted_arguments
+from rtmaii import bus
+
+class Receiver(object):
+    """ Receiver storing the data of each signal it is sent. """
+    def __init__(self):
+        self.results = []
+
+    def receive(self, data: object):
+        """ Store the data of a signal. """
+        self.results.append(data)
+
+class Watcher(object):
+    """ Watcher counting the times receivers of the bus change. """
+    def __init__(self):
+        self.changes = 0
+
+    def changed(self):
+        """ Count a change. """
+        self.changes += 1
+
+class TestSuite(unittest.TestCase):
+    """ Test Suite for the bus module. """
+
+    def setUp(self):
+        """ Perform setup of initial parameters. """
+        self.bus = EventBus()
+        self.results = []
+
+    def receive(self, data: object, sender: object = None):
+        """ Store the data and sender of a signal. """
+        self.results.append((data, sender))
+
+    def test_routes(self):
+        """ Test that signals are only sent to receivers of the signal, or of every signal. """
+        every = []
+        self.bus.connect(self.receive, 'pitch')
+        self.bus.connect(lambda signal, data: every.append(signal), weak=False)
+        self.bus.send('pitch', 0, data=440)
+        self.bus.send('note', 0, data='A')
+        self.assertListEqual(self.results, [(440, 0)])
+        self.assertListEqual(every, ['pitch', 'note'])
+
+    def test_no_receivers(self):
+        """ Test that signals without receivers aren't routed to anything. """
+        self.bus.connect(self.receive, 'pitch')
+        self.bus.disconnect(self.receive, 'pitch')
+        self.assertEqual(self.bus.routes, {})
+        self.bus.send('pitch', 0, data=440)
+        self.assertListEqual(self.results, [])
+
+    def test_sender(self):
+        """ Test that receivers connected to a sender, only receive signals from that sender. """
+        self.bus.connect(self.receive, 'pitch', 1)
+        self.bus.send('pitch', 0, data=440)
+        self.bus.send('pitch', 1, data=220)
+        self.assertListEqual(self.results, [(220, 1)])
+
+    def test_accepted_arguments(self):
+        """ Test that receivers are only passed the arguments they accept. """
+        def old_callback(data):
+            pass
+        def any_callback(data, **kwargs):
+            pass
+        self.assertEqual(accepted_arguments(old_callback), frozenset({'data'}))
+        self.assertIsNone(accepted_arguments(any_callback))
+
+    def test_weak_receiver(self):
+        """ Test that deleted receivers are removed from the bus, unless held. """
+        receiver = Receiver()
+        self.bus.connect(receiver.receive, 'pitch')
+        self.bus.send('pitch', 0, data=440)
+        self.assertListEqual(receiver.results, [440])
+        del receiver
+        gc.collect()
+        self.assertEqual(self.bus.receivers('pitch'), [])
+
+    def test_connect_once(self):
+        """ Test that connecting a receiver twice only calls it once. """
+        self.bus.connect(self.receive, 'pitch')
+        self.bus.connect(self.receive, 'pitch')
+        self.bus.send('pitch', 0, data=440)
+        self.assertEqual(len(self.results), 1)
+        self.assertRaises(KeyError, self.bus.disconnect, self.receive, 'note')
+
+    def test_pydispatch_compatibility(self):
+        """ Test that signals reach receivers of either pydispatch or the bus once. """
+        direct = []
+        def direct_receive(data):
+            direct.append(data)
+        bus.connect(self.receive, 'bus_test')
+        dispatcher.connect(direct_receive, 'bus_test', sender=ANY)
+        try:
+            bus.send('bus_test', 0, data='bus')
+            dispatcher.send(signal='bus_test', sender=0, data='dispatcher')
+        finally:
+            bus.disconnect(self.receive, 'bus_test')
+            dispatcher.disconnect(direct_receive, 'bus_test', sender=ANY)
+        self.assertListEqual(self.results, [('bus', 0), ('dispatcher', 0)])
+        self.assertListEqual(direct, ['bus', 'dispatcher'])
+        self.assertFalse(bus.direct_receivers())
+
+    def test_subscribed(self):
+        """ Test that subscribed signals are tracked, None once every signal is received. """
+        self.bus.connect(self.receive, 'pitch')
+        self.assertSetEqual(self.bus.subscribed(), {'pitch'})
+        self.bus.connect(self.receive)
+        self.assertIsNone(self.bus.subscribed())
+        direct_receive = lambda data: None
+        dispatcher.connect(direct_receive, 'bus_test', sender=ANY)
+        try:
+            self.assertSetEqual(bus.subscribed(), {'bus_test'})
+        finally:
+            dispatcher.disconnect(direct_receive, 'bus_test', sender=ANY)
+        self.assertSetEqual(bus.subscribed(), set())
+
+    def test_watch(self):
+        """ Test that watchers are called when receivers change, until they are deleted. """
+        watcher = Watcher()
+        self.bus.watch(watcher.changed)
+        self.bus.watch(lambda: watcher.changed()) # Only weakly held, so never called.
+        self.bus.connect(self.receive, 'pitch')
+        self.bus.disconnect(self.receive, 'pitch')
+        self.assertEqual(watcher.changes, 2)
+        del watcher
+        gc.collect()
+        self.bus.connect(self.receive, 'pitch')
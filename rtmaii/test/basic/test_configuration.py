@@ -2,6 +2,7 @@
 
     - Any tests against the configuration module methods will be contained here.
 """
+import pickle
 import unittest
 from rtmaii.configuration import Config
 
@@ -111,6 +112,99 @@ class TestSuite(unittest.TestCase):
         """ Test that frequency config throws error when invalid type is supplied. """
         self.assertRaises(TypeError, self.config.set_config, **{'block_size': None})
 
+    def test_sample_format(self):
+        """ Test that sample format is correctly set when a valid setting is used. """
+        self.config.set_config(**{'sample_format': 'float32'})
+        self.assertEqual(self.config.get_config('sample_format'), 'float32')
+
+    def test_invalid_sample_format(self):
+        """ Test that sample format config throws error when an unsupported format is used. """
+        self.assertRaises(ValueError, self.config.set_config, **{'sample_format': 'int8'})
+
+    def test_decimation(self):
+        """ Test that decimation rates are merged into the existing settings. """
+        self.config.set_config(**{'decimation': {'beat': 11025}})
+        self.assertDictEqual(self.config.get_config('decimation'), {'beat': 11025, 'pitch': None})
+
+    def test_invalid_decimation(self):
+        """ Test that decimation config throws errors for unknown tasks or invalid rates. """
+        self.assertRaises(KeyError, self.config.set_config, **{'decimation': {'bands': 8000}})
+        self.assertRaises(ValueError, self.config.set_config, **{'decimation': {'beat': 0}})
+        self.assertRaises(TypeError, self.config.set_config, **{'decimation': {'beat': '8k'}})
+
+    def test_queue_policies(self):
+        """ Test that queue policies are correctly set when valid policies are used. """
+        policies = {'BandsWorker': {'policy': 'block', 'timeout': 0.1}}
+        self.config.set_config(**{'queue_policies': policies})
+        self.assertEqual(self.config.get_config('queue_policies'), policies)
+
+    def test_invalid_queue_policy(self):
+        """ Test that queue policies config throws error when an unknown policy is used. """
+        self.assertRaises(ValueError, self.config.set_config,
+                          **{'queue_policies': {'root': {'policy': 'drop_all'}}})
+        self.assertRaises(KeyError, self.config.set_config,
+                          **{'queue_policies': {'root': {'policy': 'block', 'wait': 1}}})
+
+    def test_analysis_rates(self):
+        """ Test that analysis rates are correctly set, and invalid rates are rejected. """
+        self.config.set_config(**{'analysis_rates': {'BandsWorker': 20, 'HPSWorker': None}})
+        self.assertEqual(self.config.get_config('analysis_rates')['BandsWorker'], 20)
+        self.assertRaises(ValueError, self.config.set_config,
+                          **{'analysis_rates': {'BandsWorker': 0}})
+        self.assertRaises(TypeError, self.config.set_config,
+                          **{'analysis_rates': {'BandsWorker': '20'}})
+
+    def test_deadlines(self):
+        """ Test that deadlines are correctly set, and invalid deadlines are rejected. """
+        self.config.set_config(**{'deadlines': {'HPSWorker': 0.1}})
+        self.assertEqual(self.config.get_config('deadlines'), {'HPSWorker': 0.1})
+        self.assertRaises(ValueError, self.config.set_config, **{'deadlines': {'HPSWorker': -1}})
+
+    def test_priorities(self):
+        """ Test that priorities update the defaults, so beat nodes keep their priority. """
+        self.config.set_config(**{'priorities': {'HPSWorker': 2}})
+        self.assertEqual(self.config.get_config('priorities')['HPSWorker'], 2)
+        self.assertEqual(self.config.get_config('priorities')['BPMWorker'], 1)
+        self.assertRaises(TypeError, self.config.set_config, **{'priorities': {'HPSWorker': 0.5}})
+
+    def test_execution(self):
+        """ Test that execution modes are correctly set, and unknown modes are rejected. """
+        self.config.set_config(**{'execution': {'HPSWorker': 'process'}})
+        self.assertEqual(self.config.get_config('execution'), {'HPSWorker': 'process'})
+        self.assertRaises(ValueError, self.config.set_config,
+                          **{'execution': {'HPSWorker': 'gpu'}})
+
+    def test_default_execution(self):
+        """ Test that nodes can be run on a pool by default, with a valid pool size. """
+        self.config.set_config(**{'default_execution': 'pool', 'pool_size': 2})
+        self.assertEqual(self.config.get_config('pool_size'), 2)
+        self.assertRaises(ValueError, self.config.set_config, **{'default_execution': 'process'})
+        self.assertRaises(ValueError, self.config.set_config, **{'pool_size': 0})
+
+    def test_pool_block(self):
+        """ Test that nodes run on the pool can't block their producers. """
+        block = {'BPMWorker': {'policy': 'block'}}
+        self.config.set_config(**{'default_execution': 'pool', 'pool_size': 1})
+        self.assertRaises(ValueError, self.config.set_config, **{'queue_policies': block})
+        self.config.set_config(**{'queue_policies': block, 'execution': {'BPMWorker': 'thread'}})
+        self.assertRaises(ValueError, self.config.set_config, **{'execution': {}})
+
+    def test_pickle(self):
+        """ Test that queue policies are left out when a config is pickled. """
+        self.config.set_config(**{'queue_policies': {'root': {'policy': 'coalesce',
+                                                             'coalesce': lambda a, b: a}}})
+        config = pickle.loads(pickle.dumps(self.config))
+        self.assertEqual(config.get_config('queue_policies'), {})
+        self.assertIn('root', self.config.get_config('queue_policies'))
+
+    def test_pickle_started(self):
+        """ Test that the stream callback set on start() is left out when a config is pickled. """
+        self.config.set_source({'rate': 44100, 'channels': 1})
+        self.config.get_config('pyaudio_settings')['stream_callback'] = lambda *args: None
+        config = pickle.loads(pickle.dumps(self.config))
+        self.assertIsNone(config.get_config('pyaudio_settings'))
+        self.assertEqual(config.get_config('sampling_rate'), 44100)
+
     def __test_merge_channels_valid__(self):
         """ Test that merge_channels is correctly set when a valid setting is used. """
         arguments = {'merge_channels': False}
@@ -0,0 +1,155 @@
+""" COORDINATOR MODULE TESTS
+
+    - Any tests against the inbuilt coordinators will be contained here.
+"""
+import unittest
+from types import SimpleNamespace
+from numpy import array, arange, int16, float32, shares_memory, testing
+from rtmaii.configuration import Config
+from rtmaii.coordinator import RootCoordinator, DecimationCoordinator, FrequencyCoordinator
+from rtmaii.workqueue import WorkQueue
+from rtmaii.timing import Capture
+
+def create_root(channels: int, merge_channels: bool, frames: int = 4, **kwargs: dict):
+    """ Create a root coordinator with a peer queue attached to each channel it sends to. """
+    config = Config(merge_channels=merge_channels, frames_per_sample=frames, **kwargs)
+    config.set_source({'rate': 44100, 'channels': channels})
+    root = RootCoordinator(config=config)
+    peers = [SimpleNamespace(queue=WorkQueue())
+             for _ in range(1 if merge_channels else channels)]
+    root.peer_list.extend([peer] for peer in peers)
+    root.update_peers()
+    return root, peers
+
+def process(root: RootCoordinator, signal: object):
+    """ Push a signal through the root coordinator, waiting until it has been sent. """
+    root.queue.put(signal)
+    root.queue.join()
+
+class TestSuite(unittest.TestCase):
+    """ Test Suite for the coordinator module. """
+
+    def test_split_channels(self):
+        """ Test that interleaved samples are split into a signal per channel. """
+        root, peers = create_root(2, False)
+        process(root, arange(8, dtype=int16))
+        testing.assert_array_equal(peers[0].queue.get(), [0, 2, 4, 6])
+        testing.assert_array_equal(peers[1].queue.get(), [1, 3, 5, 7])
+
+    def test_merge_channels(self):
+        """ Test that channels are averaged without overflowing 16 bit samples. """
+        root, peers = create_root(2, True)
+        process(root, array([32767, 32767, -32768, -32768, 3, 4, 0, 0], dtype=int16))
+        testing.assert_array_equal(peers[0].queue.get(), [32767, -32768, 3, 0])
+
+    def test_merge_float(self):
+        """ Test that float32 samples are averaged in float32. """
+        root, peers = create_root(2, True, sample_format='float32')
+        process(root, array([1, 2, 3, 4, 5, 6, 7, 8], dtype=float32) / 32768)
+        signal = peers[0].queue.get()
+        self.assertEqual(signal.dtype, float32)
+        testing.assert_allclose(signal, [1.5, 3.5, 5.5, 7.5])
+
+    def test_pad_signal(self):
+        """ Test that short signals are zero padded, overwriting older samples in the slot. """
+        root, peers = create_root(1, True)
+        for _ in range(RootCoordinator.RING_SLOTS):
+            process(root, array([9, 9, 9, 9], dtype=int16))
+            peers[0].queue.get() # Each signal is finished with, so its slot is reused.
+        process(root, array([1, 2], dtype=int16))
+        testing.assert_array_equal(peers[0].queue.get(), [1, 2, 0, 0])
+        self.assertEqual(root.lapped, 0)
+
+    def test_lagging_peer(self):
+        """ Test that a peer more than RING_SLOTS samples behind still sees the original samples.
+        """
+        root, peers = create_root(1, True)
+        process(root, arange(4, dtype=int16))
+        held = peers[0].queue.get() # The peer stalls whilst processing its first signal.
+        samples = 4 * (RootCoordinator.RING_SLOTS + 8)
+        for index in range(4, samples, 4):
+            process(root, arange(index, index + 4, dtype=int16))
+        testing.assert_array_equal(held, arange(4))
+        testing.assert_array_equal(peers[0].queue.get_all(), arange(4, samples))
+        self.assertEqual(root.lapped, 1)
+
+    def test_update_peers(self):
+        """ Test that a peer kept when peers change still keeps the signal it holds. """
+        root, peers = create_root(1, True)
+        process(root, arange(4, dtype=int16))
+        held = peers[0].queue.get()
+        root.peer_list[0].append(SimpleNamespace(queue=WorkQueue()))
+        root.update_peers()
+        for index in range(4, 4 * (RootCoordinator.RING_SLOTS + 1), 4):
+            process(root, arange(index, index + 4, dtype=int16))
+        testing.assert_array_equal(held, arange(4))
+        self.assertEqual(root.lapped, 1)
+
+    def test_ring_views(self):
+        """ Test that channel signals are views of the preallocated ring. """
+        root, peers = create_root(2, False)
+        process(root, arange(8, dtype=int16))
+        self.assertTrue(shares_memory(peers[0].queue.get(), root.ring))
+        self.assertEqual(root.slot, 1)
+
+    def test_read_only_signals(self):
+        """ Test that channel signals are shared read-only, whilst the ring is still written. """
+        root, peers = create_root(1, True)
+        process(root, arange(4, dtype=int16))
+        signal = peers[0].queue.get()
+        self.assertFalse(signal.flags.writeable)
+        self.assertTrue(root.ring.flags.writeable)
+        with self.assertRaises(ValueError):
+            signal[0] = 1
+
+    def test_shared_fan_out(self):
+        """ Test that every peer is sent the same read-only array, rather than a copy. """
+        config = Config()
+        config.set_source({'rate': 44100, 'channels': 1})
+        coordinator = FrequencyCoordinator(config=config, channel_id=0)
+        peers = [SimpleNamespace(queue=WorkQueue()) for _ in range(3)]
+        for peer in peers:
+            coordinator.add_peer(peer)
+        process(coordinator, arange(config.get_config('block_size'), dtype=int16))
+        signals = [peer.queue.get() for peer in peers]
+        self.assertTrue(all(signal is signals[0] for signal in signals))
+        self.assertFalse(signals[0].flags.writeable)
+
+    def test_frequency_hop(self):
+        """ Test that a hop limits how often blocks are messaged, whilst every chunk is kept. """
+        config = Config()
+        config.set_source({'rate': 44100, 'channels': 1})
+        coordinator = FrequencyCoordinator(config=config, channel_id=0)
+        peer = SimpleNamespace(queue=WorkQueue())
+        coordinator.add_peer(peer)
+        coordinator.set_hop(4096)
+        block_size = config.get_config('block_size')
+        for index in range(0, block_size + 1024 * 8, 1024):
+            coordinator.queue.put(arange(index, index + 1024, dtype=int16), Capture(index, 0))
+            coordinator.queue.join()
+        self.assertEqual(peer.queue.stats()['enqueued'], 3)
+        signal = peer.queue.get_all()[-block_size:]
+        testing.assert_array_equal(signal, arange(1024 * 8, block_size + 1024 * 8, dtype=int16))
+
+    def test_capture(self):
+        """ Test that the capture of a signal is passed on to peers. """
+        root, peers = create_root(1, True)
+        root.queue.put(arange(4, dtype=int16), Capture(1024, 0.5))
+        root.queue.join()
+        peers[0].queue.get()
+        self.assertEqual(peers[0].queue.capture, Capture(1024, 0.5))
+
+    def test_decimation(self):
+        """ Test that decimated signals are sent with a matching configuration for peers. """
+        config = Config(frames_per_sample=1024)
+        config.set_source({'rate': 44100, 'channels': 1})
+        decimator = DecimationCoordinator(config=config, channel_id=0, target_rate=8000)
+        peer = SimpleNamespace(queue=WorkQueue())
+        decimator.add_peer(peer)
+        for _ in range(2):
+            decimator.queue.put(arange(1024, dtype=int16))
+        decimator.queue.join()
+        self.assertEqual(len(peer.queue.get()) + len(peer.queue.get()), 2048 // 5 + 1)
+        self.assertEqual(decimator.child_config.get_config('sampling_rate'), 8820)
+        self.assertEqual(decimator.child_config.get_config('block_size'), 16384 // 5)
+        self.assertEqual(decimator.child_config.get_config('channels'), 1)
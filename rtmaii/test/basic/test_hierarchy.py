@@ -15,10 +15,24 @@
 """
 import unittest
 import logging
+import os
+import threading
+import json
+from numpy import zeros, int16
 from rtmaii.hierarchy import Hierarchy
 from rtmaii.configuration import Config
 from rtmaii.worker import Worker
 from rtmaii.coordinator import Coordinator
+from rtmaii.timing import Capture
+from rtmaii import bus
+
+def resident_memory() -> int:
+    """ Resident memory of this process in bytes, read from /proc on Linux, otherwise 0. """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, AttributeError, ValueError):
+        return 0
 
 LOGGER = logging.getLogger()
 LOGGER.setLevel(logging.ERROR) # Stop module logging.
@@ -56,6 +70,10 @@ class TestSuite(unittest.TestCase):
             })
         self.hierarchy = Hierarchy(self.config, [])
 
+    def tearDown(self):
+        """ Stop the hierarchy's nodes, so threads don't build up between tests. """
+        self.hierarchy.stop()
+
     def test_coordinator_removal(self):
         """ Test that hierarchy removed disabled task coordinators, when initialized. """
         self.assertIn('EnergyBPMCoordinator', self.hierarchy.root['channels'][0])
@@ -170,15 +188,15 @@ class TestSuite(unittest.TestCase):
                           CustomCoordinator.__name__, None, 'nullparent')
 
     def test_empty_peer_removal(self):
-        """ Test that Coordinators with no peers are removed on cleanup. """
+        """ Test that Coordinators with no peers are removed when reconfigured. """
         self.hierarchy.add_node('FrequencyCoordinator')
-        self.hierarchy.clean_hierarchy()
+        self.hierarchy.reconfigure()
         self.assertNotIn('FrequencyCoordinator', self.hierarchy.root['channels'][0])
 
     def test_empty_peer_custom_removal(self):
-        """ Test that Custom Coordinators with no peers aren't removed on cleanup. """
+        """ Test that Custom Coordinators with no peers aren't removed when reconfigured. """
         self.hierarchy.add_custom_node('FrequencyCoordinator')
-        self.hierarchy.clean_hierarchy()
+        self.hierarchy.reconfigure()
         self.assertIn('FrequencyCoordinator', self.hierarchy.root['channels'][0])
 
     def test_channel_creation(self):
@@ -194,3 +212,316 @@ class TestSuite(unittest.TestCase):
         self.assertEqual(len(self.hierarchy.root['channels']), 3)
         self.config.set_config(**{'merge_channels': True})
         self.hierarchy.reset_hierarchy()
+
+    def test_join(self):
+        """ Test that joining waits until pushed data has been processed by every node. """
+        self.hierarchy.put(zeros(1024 * 3, dtype=int16))
+        self.hierarchy.join()
+        self.assertFalse(self.hierarchy.root['thread'].queue.queue)
+        for node in self.hierarchy.root['channels'][0].values():
+            if 'thread' in node:
+                self.assertFalse(node['thread'].queue.queue)
+
+    def test_queue_policies(self):
+        """ Test that configured queue policies are applied to nodes, and counted in stats. """
+        self.config.set_config(**{'queue_policies': {'root': {'policy': 'drop_newest',
+                                                              'queue_length': 4}}})
+        self.hierarchy.update_nodes()
+        self.assertEqual(self.hierarchy.root['thread'].queue.policy, 'drop_newest')
+        self.hierarchy.put(zeros(1024 * 3, dtype=int16))
+        self.hierarchy.join()
+        stats = self.hierarchy.queue_stats()
+        self.assertEqual(stats['root']['processed'], 1)
+        self.assertEqual(len(stats['channels']), self.hierarchy.channels)
+
+    def test_stats(self):
+        """ Test that each node's messages and processing times are exportable as JSON. """
+        for chunk in range(3):
+            self.hierarchy.put(zeros(1024, dtype=int16), Capture(chunk * 1024, 0))
+            self.hierarchy.join()
+        stats = json.loads(self.hierarchy.stats(as_json=True))
+        self.assertEqual(stats['root']['enqueued'], 3)
+        self.assertEqual(stats['root']['processing']['count'], 3)
+        peers = len(self.hierarchy.root['thread'].peer_list[0])
+        self.assertGreaterEqual(stats['root']['sent'], 3 * peers)
+        for node in stats['channels'][0].values():
+            self.assertGreaterEqual(node['blocked'], 0)
+
+    def test_analysis_rates(self):
+        """ Test that analysis rates are applied to nodes, skipping chunks that aren't due. """
+        self.config.set_config(**{'analysis_rates': {'EnergyBPMCoordinator': 44100 / 2048}})
+        self.hierarchy.update_nodes()
+        for chunk in range(8):
+            self.hierarchy.put(zeros(1024 * 3, dtype=int16), Capture(chunk * 1024, 0))
+            self.hierarchy.join()
+        stats = self.hierarchy.queue_stats()['channels'][0]
+        self.assertEqual(stats['EnergyBPMCoordinator']['skipped'], 4)
+        self.assertEqual(stats['BPMWorker']['skipped'], 0)
+
+    def test_priorities(self):
+        """ Test that beat nodes are messaged before other peers of their parent. """
+        self.config.set_config(**{'tasks': {'bands': True}})
+        self.hierarchy.reset_hierarchy()
+        channel = self.hierarchy.root['channels'][0]
+        peers = self.hierarchy.root['peer_list'][0]
+        self.assertIs(peers[0], channel['EnergyBPMCoordinator']['thread'])
+        self.assertEqual(peers[0].priority, 1)
+        self.assertEqual(channel['FrequencyCoordinator']['thread'].priority, 0)
+
+    def test_thread_priority(self):
+        """ Test that priorities set for nodes that aren't run on the pool are warned about. """
+        self.config.set_config(**{'priorities': {'BPMWorker': 2}})
+        with self.assertLogs(level='WARNING') as logs:
+            self.hierarchy.reconfigure()
+        self.assertIn('BPMWorker', logs.output[0])
+        self.config.set_config(**{'execution': {'BPMWorker': 'pool'}})
+        with self.assertRaises(AssertionError): # Nothing is logged.
+            with self.assertLogs(level='WARNING'):
+                self.hierarchy.reconfigure()
+
+    def test_deadlines(self):
+        """ Test that deadlines are applied to node queues, and updated with the config. """
+        self.config.set_config(**{'deadlines': {'BPMWorker': 0.2}})
+        self.hierarchy.update_nodes()
+        queue = self.hierarchy.root['channels'][0]['BPMWorker']['thread'].queue
+        self.assertEqual(queue.deadline, 0.2)
+        self.assertEqual(queue.deadline_frames, 0.2 * 44100) # Measured in audio of the source.
+
+    def test_exporter(self):
+        """ Test that channels share one exporter, closed once no channel has a genre worker. """
+        self.config.set_config(**{'merge_channels': False,
+                                  'tasks': {'genre': True, 'export_spectrograms': True}})
+        self.hierarchy.reconfigure()
+        exporter = self.hierarchy.exporters['GenrePredictorWorker']
+        workers = [channel['GenrePredictorWorker']['thread']
+                   for channel in self.hierarchy.root['channels']]
+        self.assertTrue(all(worker.exporter is exporter for worker in workers))
+        self.config.set_source({'channels': 1, 'rate': 44100})
+        self.hierarchy.reconfigure()
+        self.assertFalse(exporter.queue.closed)
+        self.hierarchy.remove_node('GenrePredictorWorker')
+        self.assertTrue(exporter.queue.closed)
+        self.assertDictEqual(self.hierarchy.exporters, {})
+
+    def test_demand_driven(self):
+        """ Test that only nodes raising, or feeding, subscribed signals are kept. """
+        receiver = lambda data: None
+        self.config.set_config(**{'tasks': {'bands': True}, 'demand_driven': True})
+        bus.connect(receiver, 'beats', weak=False)
+        try:
+            self.hierarchy.reset_hierarchy()
+            channel = self.hierarchy.root['channels'][0]
+            self.assertTrue('EnergyBPMCoordinator' in channel)
+            for node_id in ('BPMWorker', 'FrequencyCoordinator', 'BandsWorker'):
+                self.assertFalse(node_id in channel)
+            bus.connect(receiver, 'bands', weak=False) # Nodes are added back when subscribed.
+            channel = self.hierarchy.root['channels'][0]
+            self.assertTrue('BandsWorker' in channel and 'FrequencyCoordinator' in channel)
+        finally:
+            bus.disconnect(receiver, 'beats')
+            bus.disconnect(receiver, 'bands')
+        self.assertFalse('BandsWorker' in self.hierarchy.root['channels'][0])
+
+    def test_demand_driven_concurrent(self):
+        """ Test that receivers connected on several threads, whilst data is pushed,
+            leave the hierarchy matching the signals subscribed to.
+        """
+        self.config.set_config(**{'tasks': {'bands': True}, 'demand_driven': True})
+        beats = lambda data: None
+        bus.connect(beats, 'beats', weak=False)
+        errors = []
+        def toggle(signal: str):
+            receiver = lambda data: None
+            try:
+                for _ in range(10):
+                    bus.connect(receiver, signal, weak=False)
+                    bus.disconnect(receiver, signal)
+            except Exception as error: # pylint: disable=broad-except
+                errors.append(error)
+        try:
+            self.hierarchy.reset_hierarchy()
+            threads = [threading.Thread(target=toggle, args=(signal,))
+                       for signal in ('bands', 'spectrum', 'pitch', 'bands')]
+            for thread in threads:
+                thread.start()
+            while any(thread.is_alive() for thread in threads):
+                self.hierarchy.put(zeros(1024, dtype=int16))
+            for thread in threads:
+                thread.join()
+        finally:
+            bus.disconnect(beats, 'beats')
+        self.assertListEqual(errors, [])
+        bus.connect(beats, 'beats', weak=False)
+        try:
+            channel = self.hierarchy.root['channels'][0]
+            self.assertTrue('EnergyBPMCoordinator' in channel)
+            for node_id in ('BandsWorker', 'FrequencyCoordinator', 'SpectrumCoordinator'):
+                self.assertFalse(node_id in channel)
+            for node_id, node in channel.items():
+                if 'thread' in node:
+                    parent = channel[node['parent']]
+                    peers = parent['peer_list'] if 'peer_list' in parent \
+                        else parent['thread'].get_peer_list()
+                    self.assertIn(node['thread'], peers, node_id)
+        finally:
+            bus.disconnect(beats, 'beats')
+
+    def test_demand_driven_custom(self):
+        """ Test that custom nodes, and their parents, are kept without any subscribers. """
+        self.config.set_config(**{'demand_driven': True})
+        self.hierarchy.add_custom_node('CustomWorker', parent_id='EnergyBPMCoordinator')
+        self.hierarchy.reset_hierarchy()
+        channel = self.hierarchy.root['channels'][0]
+        self.assertTrue('CustomWorker' in channel and 'EnergyBPMCoordinator' in channel)
+        self.assertFalse('BPMWorker' in channel)
+
+    def test_reconfigure(self):
+        """ Test that toggling a task only adds its nodes, leaving other nodes running. """
+        channel = self.hierarchy.root['channels'][0]
+        beats = channel['EnergyBPMCoordinator']['thread']
+        self.config.set_config(**{'tasks': {'bands': True}})
+        self.hierarchy.reconfigure()
+        self.assertIs(channel['EnergyBPMCoordinator']['thread'], beats)
+        self.assertTrue('BandsWorker' in channel and 'SpectrumCoordinator' in channel)
+        self.config.set_config(**{'tasks': {'bands': False}})
+        self.hierarchy.reconfigure()
+        self.assertFalse('FrequencyCoordinator' in channel)
+        self.assertIs(channel['EnergyBPMCoordinator']['thread'], beats)
+        self.assertTrue(beats.is_alive())
+
+    def test_reconfigure_changed(self):
+        """ Test that nodes whose settings change are replaced, along with their children. """
+        channel = self.hierarchy.root['channels'][0]
+        beats = channel['EnergyBPMCoordinator']['thread']
+        self.config.set_config(**{'decimation': {'beat': 11025}})
+        self.hierarchy.reconfigure()
+        self.assertEqual(channel['EnergyBPMCoordinator']['parent'], 'BeatDecimationCoordinator')
+        beats.join(1)
+        self.assertFalse(beats.is_alive())
+
+    def test_reconfigure_channels(self):
+        """ Test that channel trees are added and removed, keeping the first tree's nodes. """
+        beats = self.hierarchy.root['channels'][0]['EnergyBPMCoordinator']['thread']
+        self.config.set_config(**{'merge_channels': False})
+        self.hierarchy.reconfigure()
+        self.assertEqual(len(self.hierarchy.root['channels']), 3)
+        self.assertIs(self.hierarchy.root['channels'][0]['EnergyBPMCoordinator']['thread'], beats)
+        self.hierarchy.put(zeros(1024 * 3, dtype=int16))
+        self.hierarchy.join()
+        for channel in self.hierarchy.root['channels']:
+            self.assertEqual(channel['EnergyBPMCoordinator']['thread'].queue.processed, 1)
+        self.config.set_config(**{'merge_channels': True})
+        self.hierarchy.reconfigure()
+        self.assertEqual(len(self.hierarchy.root['peer_list']), 1)
+        self.assertIs(self.hierarchy.root['channels'][0]['EnergyBPMCoordinator']['thread'], beats)
+
+    def test_vectorise_channels(self):
+        """ Test that vectorised nodes share one tree, sent a block of every channel. """
+        self.config.set_config(**{'merge_channels': False, 'vectorise_channels': True,
+                                  'tasks': {'bands': True}})
+        self.hierarchy.reconfigure()
+        channels = self.hierarchy.root['channels']
+        self.assertEqual(channels[0]['FrequencyCoordinator']['parent'], 'block')
+        self.assertEqual(channels[0]['BandsWorker']['parent'], 'SpectrumCoordinator')
+        self.assertFalse('FrequencyCoordinator' in channels[1])
+        self.assertTrue('EnergyBPMCoordinator' in channels[1]) # Beat nodes aren't vectorised.
+        self.hierarchy.put(zeros(1024 * 3, dtype=int16))
+        self.hierarchy.join()
+        frequency = channels[0]['FrequencyCoordinator']['thread']
+        self.assertEqual(frequency.extended_signal.shape, (3, 1024))
+        self.config.set_config(**{'vectorise_channels': False})
+        self.hierarchy.reconfigure()
+        self.assertTrue('FrequencyCoordinator' in channels[1] and not 'block' in channels[0])
+
+    def test_blueprint(self):
+        """ Test that a blueprint replaces the task nodes, applying each node's settings. """
+        self.config.set_config(blueprint={
+            'nodes': {
+                'FrequencyCoordinator': {},
+                'Spectrum': {'class': 'SpectrumCoordinator', 'analysis_rate': 20},
+                'Pitch': {'class': 'HPSWorker', 'deadline': 0.1, 'priority': 2,
+                          'queue_policy': {'policy': 'drop_newest', 'queue_length': 2}},
+            },
+            'edges': [['FrequencyCoordinator', 'Spectrum'], ['Spectrum', 'Pitch']]
+        })
+        self.hierarchy.reconfigure()
+        for channel in self.hierarchy.root['channels']:
+            self.assertNotIn('EnergyBPMCoordinator', channel)
+            spectrum, pitch = channel['Spectrum']['thread'], channel['Pitch']['thread']
+            self.assertIn(pitch, spectrum.get_peer_list())
+            self.assertEqual(spectrum.queue.limiter.hop, 44100 / 20)
+            self.assertEqual((pitch.queue.policy, pitch.queue.queue_length), ('drop_newest', 2))
+            self.assertEqual((pitch.queue.deadline, pitch.priority), (0.1, 2))
+        self.config.set_config(deadlines={'Pitch': 0.5}) # The config takes precedence.
+        self.hierarchy.update_nodes()
+        self.assertEqual(self.hierarchy.root['channels'][0]['Pitch']['thread'].queue.deadline, 0.5)
+
+    def test_decimation(self):
+        """ Test that decimated beat nodes are placed below a DecimationCoordinator. """
+        self.config.set_config(**{'decimation': {'beat': 11025}})
+        self.hierarchy.reset_hierarchy()
+        channel = self.hierarchy.root['channels'][0]
+        self.assertEqual(channel['EnergyBPMCoordinator']['parent'], 'BeatDecimationCoordinator')
+        self.assertEqual(channel['EnergyBPMCoordinator']['thread'].sampling_rate, 11025)
+        self.hierarchy.remove_node('BeatDecimationCoordinator')
+        self.assertFalse('EnergyBPMCoordinator' in channel)
+
+    def test_process_execution(self):
+        """ Test that nodes can be run in a child process, feeding their peers in this one. """
+        self.config.set_config(**{'decimation': {'beat': 11025},
+                                  'execution': {'BeatDecimationCoordinator': 'process'}})
+        self.hierarchy.reset_hierarchy()
+        channel = self.hierarchy.root['channels'][0]
+        decimator = channel['BeatDecimationCoordinator']['thread']
+        self.assertNotEqual(decimator.process.pid, None)
+        self.assertEqual(channel['EnergyBPMCoordinator']['thread'].sampling_rate, 11025)
+        self.hierarchy.put(zeros(1024 * 3, dtype=int16))
+        self.hierarchy.join()
+        self.assertEqual(channel['EnergyBPMCoordinator']['thread'].queue.processed, 1)
+
+    def test_pool_execution(self):
+        """ Test that nodes run on a pool of threads, independent of the amount of channels. """
+        self.hierarchy.stop()
+        threads = threading.active_count()
+        self.config.set_config(**{'default_execution': 'pool', 'pool_size': 2})
+        self.hierarchy.reset_hierarchy()
+        self.assertEqual(threading.active_count() - threads, 2)
+        self.hierarchy.put(zeros(1024 * 3, dtype=int16))
+        self.hierarchy.join()
+        for channel in self.hierarchy.root['channels']:
+            self.assertEqual(channel['EnergyBPMCoordinator']['thread'].queue.processed, 1)
+
+    def test_pool_block(self):
+        """ Test that blueprint nodes run on a single thread pool can't block producers. """
+        self.config.set_config(**{'default_execution': 'pool', 'pool_size': 1, 'blueprint': {
+            'nodes': {'EnergyBPMCoordinator': {},
+                      'BPMWorker': {'queue_policy': {'policy': 'block'}}},
+            'edges': [['EnergyBPMCoordinator', 'BPMWorker']]
+        }})
+        self.assertRaises(ValueError, self.hierarchy.reset_hierarchy)
+
+    def test_stop(self):
+        """ Test that stopping the hierarchy ends the thread of every node. """
+        nodes = self.hierarchy.__nodes__()
+        self.hierarchy.stop()
+        for node in nodes:
+            self.assertFalse(node.is_alive())
+
+    def test_removed_node_stopped(self):
+        """ Test that removed nodes, and their children, are stopped. """
+        node = self.hierarchy.root['channels'][0]['EnergyBPMCoordinator']['thread']
+        child = node.peer_list[0]
+        self.hierarchy.remove_node('EnergyBPMCoordinator')
+        node.join(1)
+        child.join(1)
+        self.assertFalse(node.is_alive() or child.is_alive())
+
+    def test_reconfiguration_leak(self):
+        """ Test that thread count and memory stay flat across 1000 reconfigurations. """
+        for _ in range(100): # Warm up, so allocator pools and caches are filled.
+            self.hierarchy.reset_hierarchy()
+        threads, memory = threading.active_count(), resident_memory()
+        for _ in range(1000):
+            self.hierarchy.reset_hierarchy()
+        self.assertEqual(threading.active_count(), threads)
+        self.assertLess(resident_memory() - memory, 20 * 1024 * 1024)
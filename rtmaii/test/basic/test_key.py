@@ -3,7 +3,9 @@
     - Any tests against the key analysis module methods will be contained here.
 """
 import unittest
+from rtmaii import bus
 from rtmaii.analysis import key
+from rtmaii.worker import Key
 
 class TestSuite(unittest.TestCase):
     """ Test Suite for the key module. """
@@ -50,3 +52,16 @@ class TestSuite(unittest.TestCase):
         self.assertEqual(key.get_cents_off(self.off_f5_freq['frequency'],
                                            self.off_f5_freq['midi_num']),
                          self.off_f5_freq['cents_off'])
+
+    def test_block_silent_note(self):
+        """ Test that a channel of a block without a pitch has no note. """
+        notes = {}
+        def receiver(sender, data):
+            notes[sender] = data
+        bus.connect(receiver, 'note', weak=False)
+        try:
+            Key.analyse_note([self.a4_freq['frequency'], float('nan')], 0, block=True)
+        finally:
+            bus.disconnect(receiver, 'note')
+        self.assertEqual(notes[0]['note'], self.a4_freq['note'])
+        self.assertIsNone(notes[1])
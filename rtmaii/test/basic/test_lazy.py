@@ -0,0 +1,28 @@
+""" LAZY MODULE TESTS
+
+    - Any tests against deferring imports until first use will be contained here.
+"""
+import unittest
+import subprocess
+import sys
+from rtmaii.lazy import lazy_import, LOADED
+
+class TestSuite(unittest.TestCase):
+    """ Test Suite for the lazy module. """
+
+    def test_import_on_use(self):
+        """ Test that a lazy module is imported when first used, and timed. """
+        lazy_json = lazy_import('json')
+        self.assertNotIn('json', LOADED)
+        self.assertEqual(lazy_json.dumps([1]), '[1]')
+        self.assertIn('json', LOADED)
+        self.assertIn('dumps', lazy_json.__dict__) # Cached after the first use.
+
+    def test_library_import(self):
+        """ Test that importing the library doesn't import its heavy dependencies. """
+        heavy = ('scipy.signal', 'scipy.fftpack', 'tensorflow', 'pyaudio')
+        script = ('import sys, rtmaii.rtmaii; '
+                  'print([module for module in {} if module in sys.modules])'.format(heavy))
+        output = subprocess.run([sys.executable, '-c', script], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, check=True).stdout
+        self.assertEqual(output.decode().strip(), '[]')
@@ -0,0 +1,125 @@
+""" OFFLINE MODULE TESTS
+
+    - Any tests against the offline analysis module methods will be contained here.
+
+    Full analysis of tracks is covered by the hierarchy tests,
+    these tests check that the results of analysis are summarised correctly.
+"""
+import unittest
+import os
+import csv
+import json
+import tempfile
+from rtmaii import offline
+from rtmaii.configuration import Config
+from rtmaii.hierarchy import Hierarchy
+from rtmaii.sources import SyntheticSource
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'test_data')
+
+class TestSuite(unittest.TestCase):
+    """ Test Suite for the offline module. """
+
+    def setUp(self):
+        """ Create a basic timeline to summarise. """
+        self.timeline = [
+            {'time': 0.1, 'signal': 'beats', 'channel': 0, 'data': True},
+            {'time': 0.1, 'signal': 'note', 'channel': 0, 'data': {'note': 'A', 'cents_off': 0}},
+            {'time': 0.2, 'signal': 'note', 'channel': 0, 'data': {'note': 'A', 'cents_off': 2}},
+            {'time': 0.2, 'signal': 'bands', 'channel': 0, 'data': {'bass': 0.2}},
+            {'time': 0.3, 'signal': 'note', 'channel': 0, 'data': {'note': 'B', 'cents_off': 0}},
+            {'time': 0.3, 'signal': 'bands', 'channel': 0, 'data': {'bass': 0.4}},
+            {'time': 0.3, 'signal': 'bpm', 'channel': 0, 'data': 120},
+            {'time': 0.4, 'signal': 'genre', 'channel': 0, 'data': 'Rock'},
+            {'time': 0.4, 'signal': 'beats', 'channel': 0, 'data': False},
+        ]
+
+    def test_summary(self):
+        """ Test that a timeline is reduced to the expected summary. """
+        summary = offline.summarise(self.timeline)
+        self.assertEqual(summary['duration'], 0.4)
+        self.assertEqual(summary['bpm'], 120)
+        self.assertEqual(summary['beats'], 1)
+        self.assertAlmostEqual(summary['notes']['A'], 2 / 3)
+        self.assertAlmostEqual(summary['bands']['bass'], 0.3)
+        self.assertEqual(summary['genres'], {'Rock': 1})
+
+    def test_empty_summary(self):
+        """ Test that an empty timeline can be summarised. """
+        summary = offline.summarise([])
+        self.assertEqual(summary['bpm'], 0)
+        self.assertEqual(summary['notes'], {})
+
+    def test_flatten_summary(self):
+        """ Test that nested results are flattened into prefixed columns. """
+        row = offline.flatten_summary(offline.summarise(self.timeline))
+        self.assertIn('note:A', row)
+        self.assertIn('band:bass', row)
+        self.assertIn('genre:Rock', row)
+        self.assertNotIn('notes', row)
+
+    def test_find_tracks(self):
+        """ Test that a directory is expanded into the wav files it contains. """
+        tracks = offline.find_tracks(TEST_DATA)
+        self.assertEqual(len(tracks), 3)
+        self.assertEqual(offline.find_tracks(['a.wav', 'b.wav']), ['a.wav', 'b.wav'])
+
+    def test_write_summaries(self):
+        """ Test that summaries are written as CSV or JSONL depending on the extension. """
+        summaries = [offline.summarise(self.timeline), {'path': 'broken.wav', 'error': 'bad'}]
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'summaries.csv')
+            offline.write_summaries(summaries, csv_path)
+            with open(csv_path) as csv_file:
+                rows = list(csv.DictReader(csv_file))
+            self.assertEqual(len(rows), 2)
+            self.assertEqual(rows[1]['error'], 'bad')
+
+            jsonl_path = os.path.join(directory, 'summaries.jsonl')
+            offline.write_summaries(summaries, jsonl_path)
+            with open(jsonl_path) as jsonl_file:
+                lines = [json.loads(line) for line in jsonl_file]
+            self.assertEqual(lines[0]['bpm'], 120)
+
+    def test_analyse_error(self):
+        """ Test that a file which can't be analysed returns an error rather than raising. """
+        summary = offline.analyse_track(os.path.join(TEST_DATA, 'missing.wav'))
+        self.assertIn('error', summary)
+
+    def test_analyse_range(self):
+        """ Test that only the requested range of a source is analysed. """
+        source = SyntheticSource((440,), duration=6)
+        config = Config(tasks={'genre': False, 'export_spectrograms': False, 'pitch': False,
+                               'bands': False})
+        config.set_source({'rate': 44100, 'channels': 1})
+        timeline = offline.analyse(Hierarchy(config, {}), source, config, ('beats',), 2, 5)
+        times = [result['time'] for result in timeline]
+        self.assertGreater(min(times), 2)
+        self.assertAlmostEqual(max(times), 5)
+
+    def test_no_export(self):
+        """ Test that spectrograms aren't exported offline, even if set in the settings. """
+        config = offline.offline_config({'tasks': {'export_spectrograms': True}})
+        self.assertFalse(config.get_config('tasks')['export_spectrograms'])
+        config.set_source({'rate': 44100, 'channels': 1})
+        hierarchy = Hierarchy(config, {})
+        try:
+            genre = hierarchy.root['channels'][0]['GenrePredictorWorker']['thread']
+            self.assertIsNone(genre.exporter)
+        finally:
+            hierarchy.stop()
+
+    def test_plan_segments(self):
+        """ Test that segments are aligned to samples and warm up before their start. """
+        plan = offline.plan_segments(10000, 1000, 4, 1500)
+        self.assertListEqual(plan, [(0, 0, 2000), (0, 2000, 5000),
+                                    (3000, 5000, 8000), (6000, 8000, 10000)])
+
+    def test_stitch_bpm(self):
+        """ Test that the BPM is recalculated from beats found in earlier segments. """
+        timeline = [{'time': time, 'signal': 'beats', 'channel': 0, 'data': True}
+                    for time in (0.5, 1.0, 1.5, 2.0)]
+        # The second segment's worker only saw the last beat.
+        timeline.append({'time': 2.0, 'signal': 'bpm', 'channel': 0, 'data': 0})
+        offline.stitch_bpm(timeline)
+        self.assertEqual(timeline[-1]['data'], 120)
@@ -0,0 +1,145 @@
+""" PROCESS MODULE TESTS
+
+    - Any tests against running nodes in child processes will be contained here.
+"""
+import os
+import threading
+import unittest
+from types import SimpleNamespace
+from numpy import arange, float32, int16, testing
+from pydispatch import dispatcher
+from rtmaii.configuration import Config
+from rtmaii.process import SharedRing, SharedRingReader, ProcessNode, ProcessCoordinator
+from rtmaii.workqueue import WorkQueue
+from rtmaii.timing import Capture, send
+
+class DoublingNode(threading.Thread):
+    """ Node raising each signal doubled, with the id of the process it was run in. """
+    def __init__(self, **kwargs: dict):
+        threading.Thread.__init__(self, daemon=True)
+        self.queue = WorkQueue(1)
+        self.config = kwargs['config']
+        self.channel_id = kwargs['channel_id']
+        self.reset_attributes()
+        self.start()
+
+    def reset_attributes(self):
+        self.scale = self.config.get_config('frames_per_sample') // 1024
+
+    def run(self):
+        while True:
+            signal = self.queue.get()
+            send('doubled', self.channel_id, (signal * 2 * self.scale, os.getpid()),
+                 self.queue.capture)
+
+class DoublingCoordinator(DoublingNode):
+    """ Coordinator messaging each signal doubled to its peers. """
+    def __init__(self, **kwargs: dict):
+        self.peer_list = []
+        DoublingNode.__init__(self, **kwargs)
+
+    def add_peer(self, peer: object):
+        self.peer_list.append(peer)
+
+    def run(self):
+        while True:
+            signal = self.queue.get()
+            for peer in self.peer_list:
+                peer.queue.put(signal * 2, self.queue.capture)
+
+class FailingNode(object):
+    """ Node that can't be created. """
+    def __init__(self, **kwargs: dict):
+        raise ValueError('Failed to create node.')
+
+class TestSuite(unittest.TestCase):
+    """ Test Suite for the process module. """
+
+    def setUp(self):
+        self.config = Config()
+        self.results = []
+        dispatcher.connect(self.receive, signal='doubled', sender=0)
+
+    def tearDown(self):
+        dispatcher.disconnect(self.receive, signal='doubled', sender=0)
+
+    def receive(self, data: object):
+        """ Store the results of doubled signals. """
+        self.results.append(data)
+
+    def test_shared_ring(self):
+        """ Test that arrays written to the ring are read back with their shape and dtype. """
+        ring, reader = SharedRing(2), SharedRingReader()
+        first = reader.unpack(ring.pack(arange(6, dtype=int16).reshape(2, 3)))
+        second = reader.unpack(ring.pack(arange(4, dtype=float32)))
+        testing.assert_array_equal(first, [[0, 1, 2], [3, 4, 5]])
+        testing.assert_array_equal(second, [0, 1, 2, 3])
+        self.assertEqual(second.dtype, float32)
+        ring.close()
+
+    def test_shared_ring_grow(self):
+        """ Test that the ring is reallocated for larger arrays, and objects are pickled. """
+        ring, reader = SharedRing(), SharedRingReader()
+        small = reader.unpack(ring.pack(arange(4)))
+        large = reader.unpack(ring.pack(arange(4096)))
+        testing.assert_array_equal(small, arange(4)) # Still mapped after the ring is replaced.
+        testing.assert_array_equal(large, arange(4096))
+        self.assertEqual(ring.pack([1, 2]), ('object', [1, 2]))
+        ring.close()
+
+    def test_process_node(self):
+        """ Test that a node is run in a child process, raising signals in the parent. """
+        node = ProcessNode(DoublingNode, config=self.config, channel_id=0)
+        node.queue.put(arange(4, dtype=int16), Capture(0, 0.5))
+        node.queue.join()
+        self.assertEqual(len(self.results), 1)
+        data, pid = self.results[0]
+        testing.assert_array_equal(data, [0, 2, 4, 6])
+        self.assertNotEqual(pid, os.getpid())
+
+    def test_process_reset(self):
+        """ Test that config changes are sent to the node in the child process. """
+        node = ProcessNode(DoublingNode, config=self.config, channel_id=0)
+        self.config.set_config(frames_per_sample=2048)
+        node.reset_attributes()
+        node.queue.put(arange(2))
+        node.queue.join()
+        testing.assert_array_equal(self.results[0][0], [0, 4])
+
+    def test_process_coordinator(self):
+        """ Test that data messaged by a coordinator in a child process reaches its peers. """
+        node = ProcessCoordinator(DoublingCoordinator, config=self.config, channel_id=0)
+        peer = SimpleNamespace(queue=WorkQueue())
+        node.add_peer(peer)
+        node.queue.put(arange(4, dtype=float32), Capture(4, 0.5))
+        node.queue.join()
+        testing.assert_array_equal(peer.queue.get(), [0, 2, 4, 6])
+        self.assertEqual(peer.queue.capture, Capture(4, 0.5))
+
+    def test_process_stalled_peer(self):
+        """ Test that a child coordinator waits for a stalled peer, rather than overwrite its data.
+        """
+        node = ProcessCoordinator(DoublingCoordinator, config=self.config, channel_id=0)
+        peer = SimpleNamespace(queue=WorkQueue())
+        node.add_peer(peer)
+        items = SharedRing.SLOTS + 4
+        for item in range(items):
+            node.queue.put(arange(item, item + 4, dtype=float32))
+        node.queue.join(0.5)
+        self.assertEqual(peer.queue.stats()['depth'], SharedRing.SLOTS)
+        for item in range(items):
+            testing.assert_array_equal(peer.queue.get(timeout=5), arange(item, item + 4) * 2)
+        node.stop()
+        node.join(5)
+
+    def test_process_error(self):
+        """ Test that errors creating the node are raised in the parent process. """
+        self.assertRaises(ValueError, ProcessNode, FailingNode, config=self.config)
+
+    def test_process_stop(self):
+        """ Test that stopping a node ends its child process. """
+        node = ProcessNode(DoublingNode, config=self.config, channel_id=0)
+        node.stop()
+        node.join(5)
+        self.assertFalse(node.is_alive())
+        self.assertFalse(node.process.is_alive())
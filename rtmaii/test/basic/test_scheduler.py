@@ -0,0 +1,107 @@
+""" SCHEDULER MODULE TESTS
+
+    - Any tests against running nodes on the Scheduler's pool will be contained here.
+"""
+import threading
+import unittest
+from heapq import heappop
+from types import SimpleNamespace
+from rtmaii.scheduler import (Scheduler, scheduling, start_node, join_node, is_running,
+                               add_by_priority)
+from rtmaii.workqueue import WorkQueue
+
+class RecordingNode(threading.Thread):
+    """ Node recording each item it processes, passing it on to its peers. """
+    def __init__(self, log: list, name: str):
+        threading.Thread.__init__(self, daemon=True)
+        self.queue = WorkQueue()
+        self.log = log
+        self.label = name
+        self.peer_list = []
+        start_node(self)
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                raise ValueError('Node failed.')
+            self.log.append((self.label, item))
+            for peer in self.peer_list:
+                peer.queue.put(item)
+
+class TestSuite(unittest.TestCase):
+    """ Test Suite for the scheduler module. """
+
+    def test_pool(self):
+        """ Test that nodes created whilst scheduling are run on the pool, not their own thread. """
+        log, scheduler = [], Scheduler(2)
+        with scheduling(scheduler):
+            node = RecordingNode(log, 'node')
+        self.assertFalse(node.is_alive())
+        self.assertTrue(is_running(node))
+        for item in range(3):
+            node.queue.put(item)
+        node.queue.join()
+        self.assertListEqual(log, [('node', 0), ('node', 1), ('node', 2)])
+
+    def test_thread(self):
+        """ Test that nodes created outside of a scheduling context start their own thread. """
+        node = RecordingNode([], 'node')
+        self.assertTrue(node.is_alive())
+        self.assertTrue(is_running(node))
+
+    def test_edges(self):
+        """ Test that peers are scheduled in turn with their parent, on a single thread. """
+        log, scheduler = [], Scheduler(1)
+        with scheduling(scheduler):
+            parent, child = RecordingNode(log, 'parent'), RecordingNode(log, 'child')
+        parent.peer_list.append(child)
+        for item in range(3):
+            parent.queue.put(item)
+        parent.queue.join()
+        child.queue.join()
+        # The parent gives its thread back after each item, so the child isn't starved.
+        self.assertEqual(log.index(('child', 0)), 1)
+        self.assertEqual(sorted(log), sorted([('parent', item) for item in range(3)] +
+                                             [('child', item) for item in range(3)]))
+
+    def test_failure(self):
+        """ Test that a node raising an error stops, as its thread would. """
+        scheduler = Scheduler(1)
+        with scheduling(scheduler):
+            node = RecordingNode([], 'node')
+        node.queue.put(None)
+        for _ in range(100):
+            if not is_running(node):
+                break
+            threading.Event().wait(0.01)
+        self.assertFalse(is_running(node))
+
+    def test_stop(self):
+        """ Test that idle nodes are stopped on the pool, before the pool itself is stopped. """
+        scheduler = Scheduler(2)
+        with scheduling(scheduler):
+            node = RecordingNode([], 'node')
+        node.queue.close()
+        join_node(node, 1)
+        self.assertFalse(is_running(node))
+        scheduler.stop()
+        scheduler.join(1)
+        self.assertFalse(any(thread.is_alive() for thread in scheduler.threads))
+
+    def test_priority(self):
+        """ Test that nodes with a higher priority are run first, then in the order scheduled. """
+        scheduler = Scheduler(0) # Without threads, so nodes stay ready.
+        nodes = [SimpleNamespace(priority=priority, label=label)
+                 for label, priority in (('first', 0), ('beats', 1), ('second', 0))]
+        for node in nodes:
+            scheduler.schedule(node)
+        order = [heappop(scheduler.ready)[2].label for _ in nodes]
+        self.assertListEqual(order, ['beats', 'first', 'second'])
+
+    def test_add_by_priority(self):
+        """ Test that peers are ordered by priority, then in the order they were added. """
+        peers = []
+        for label, priority in (('first', 0), ('beats', 1), ('second', 0), ('bpm', 1)):
+            add_by_priority(peers, SimpleNamespace(priority=priority, label=label))
+        self.assertListEqual([peer.label for peer in peers], ['beats', 'bpm', 'first', 'second'])
@@ -0,0 +1,220 @@
+""" SOURCES MODULE TESTS
+
+    - Any tests against the audio sources module will be contained here.
+
+    The memory mapped reader is compared against the standard library's wave module,
+    to make sure the same samples are read.
+"""
+import unittest
+import wave
+import os
+import io
+import struct
+import tempfile
+from numpy import frombuffer, int16, float32, array, array_equal, arange, zeros, column_stack
+from rtmaii.sources import (MappedWave, WaveFile, ArraySource, PCMSource, SyntheticSource,
+                            open_wave, convert_samples)
+
+TRACK = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'test_data', 'sine_440.wav')
+
+class TestSuite(unittest.TestCase):
+    """ Test Suite for the sources module. """
+
+    def setUp(self):
+        """ Open the test track with both readers. """
+        self.mapped = MappedWave(TRACK)
+        self.waveform = wave.open(TRACK)
+
+    def tearDown(self):
+        """ Close the test track. """
+        self.mapped.close()
+        self.waveform.close()
+
+    def test_params(self):
+        """ Test that the format of the file is read correctly. """
+        self.assertEqual(self.mapped.getnchannels(), self.waveform.getnchannels())
+        self.assertEqual(self.mapped.getsampwidth(), self.waveform.getsampwidth())
+        self.assertEqual(self.mapped.getframerate(), self.waveform.getframerate())
+        # Frames are limited to those present, in case the data chunk header is wrong.
+        self.assertLessEqual(self.mapped.getnframes(), self.waveform.getnframes())
+
+    def test_seek(self):
+        """ Test that seeking reads the same samples as the wave module's setpos. """
+        self.mapped.seek(5000)
+        self.waveform.setpos(5000)
+        expected = frombuffer(self.waveform.readframes(1024), int16)
+        self.assertTrue(array_equal(self.mapped.read(1024), expected))
+
+    def test_readframes(self):
+        """ Test that the same samples are read as the wave module. """
+        for _ in range(3):
+            expected = frombuffer(self.waveform.readframes(1024), int16)
+            actual = frombuffer(self.mapped.readframes(1024), int16)
+            self.assertTrue(array_equal(expected, actual))
+        self.assertEqual(self.mapped.tell(), self.waveform.tell())
+
+    def test_read_view(self):
+        """ Test that read returns a read-only view rather than a copy. """
+        samples = self.mapped.read(1024)
+        self.assertEqual(len(samples), 1024 * self.mapped.getnchannels())
+        self.assertFalse(samples.flags.writeable)
+        self.assertFalse(samples.flags.owndata)
+
+    def test_end_of_file(self):
+        """ Test that reading past the end of the file returns the remaining frames. """
+        self.mapped.setpos(self.mapped.getnframes() - 10)
+        self.assertEqual(len(self.mapped.read(1024)), 10 * self.mapped.getnchannels())
+        self.assertEqual(len(self.mapped.readframes(1024)), 0)
+
+    def test_rewind(self):
+        """ Test that rewinding returns the reader to the first frame. """
+        first = self.mapped.read(1024).copy()
+        self.mapped.rewind()
+        self.assertTrue(array_equal(first, self.mapped.read(1024)))
+
+    def test_invalid_position(self):
+        """ Test that moving outside of the file raises an error. """
+        self.assertRaises(ValueError, self.mapped.setpos, self.mapped.getnframes() + 1)
+
+    def test_invalid_file(self):
+        """ Test that a file which isn't a wav file raises an error. """
+        self.assertRaises(ValueError, MappedWave, __file__)
+
+class SourceTestSuite(unittest.TestCase):
+    """ Test Suite for the device-less audio sources. """
+
+    def test_array_interleaved(self):
+        """ Test that a (frames, channels) array is read as interleaved samples. """
+        left = arange(10, dtype=int16)
+        source = ArraySource(column_stack((left, -left)), 44100)
+        self.assertEqual(source.channels, 2)
+        samples = source.read(3)
+        self.assertListEqual(list(samples), [0, 0, 1, -1, 2, -2])
+
+    def test_array_float(self):
+        """ Test that floating point arrays are read as float32. """
+        source = ArraySource([1.0, -1.0, 0.0], 44100)
+        self.assertEqual(source.dtype, float32)
+        self.assertListEqual(list(source.read(3)), [1.0, -1.0, 0.0])
+
+    def test_array_unsigned(self):
+        """ Test that unsigned 8-bit arrays keep their offset, so silence converts to 0. """
+        source = ArraySource(array([128, 255, 0], dtype='u1'), 44100)
+        self.assertEqual(source.dtype.name, 'uint8')
+        self.assertListEqual(list(convert_samples(source.read(3), 'int16')), [0, 32512, -32768])
+
+    def test_array_type_error(self):
+        """ Test that integer arrays of an unknown scale are rejected, rather than wrapped. """
+        self.assertRaises(TypeError, ArraySource, array([40000, -40000], dtype='int64'), 44100)
+        self.assertRaises(TypeError, ArraySource, array([1, 2], dtype='uint16'), 44100)
+
+    def test_array_end(self):
+        """ Test that an empty array is returned once the source has finished. """
+        source = ArraySource(zeros(10, dtype=int16), 44100)
+        self.assertEqual(len(source.read(8)), 8)
+        self.assertEqual(len(source.read(8)), 2)
+        self.assertEqual(len(source.read(8)), 0)
+        source.rewind()
+        self.assertEqual(len(source.read(8)), 8)
+
+    def test_pcm(self):
+        """ Test that raw PCM is read from a stream, dropping incomplete frames. """
+        raw = arange(9, dtype='<i2').tobytes() + b'\x01' # Half a sample at the end.
+        source = PCMSource(44100, 2, io.BytesIO(raw))
+        self.assertListEqual(list(source.read(2)), [0, 1, 2, 3])
+        self.assertListEqual(list(source.read(4)), [4, 5, 6, 7])
+        self.assertEqual(len(source.read(4)), 0)
+
+    def test_synthetic_seeded(self):
+        """ Test that synthetic sources with the same seed generate the same signal. """
+        first = SyntheticSource((440, 880), noise=0.1, seed=1)
+        second = SyntheticSource((440, 880), noise=0.1, seed=1)
+        self.assertTrue(array_equal(first.read(1024), second.read(1024)))
+        first.rewind()
+        second.rewind()
+        self.assertTrue(array_equal(first.read(512), second.read(512)))
+
+    def test_synthetic_continuous(self):
+        """ Test that reading in chunks generates the same signal as reading at once. """
+        chunked = SyntheticSource((440,), channels=2)
+        whole = SyntheticSource((440,), channels=2)
+        samples = list(chunked.read(100)) + list(chunked.read(100))
+        self.assertListEqual(samples, list(whole.read(200)))
+
+    def test_synthetic_duration(self):
+        """ Test that a synthetic source stops after its duration. """
+        source = SyntheticSource(sampling_rate=1000, duration=1.5)
+        self.assertEqual(len(source.read(1024)), 1024)
+        self.assertEqual(len(source.read(1024)), 476)
+        self.assertEqual(len(source.read(1024)), 0)
+
+    def test_synthetic_seek(self):
+        """ Test that sources without direct seeking read forwards to the frame. """
+        seeked = SyntheticSource((440,), noise=0.1, seed=1)
+        whole = SyntheticSource((440,), noise=0.1, seed=1)
+        seeked.seek(100000)
+        seeked.seek(1000) # Seeking backwards rewinds first.
+        self.assertTrue(array_equal(seeked.read(100), whole.read(1100)[1000:]))
+
+    def test_pcm_seek_backwards(self):
+        """ Test that a pipe can't seek backwards. """
+        source = PCMSource(44100, 1, io.BytesIO(arange(10, dtype='<i2').tobytes()))
+        source.seek(4)
+        self.assertListEqual(list(source.read(2)), [4, 5])
+        self.assertRaises(ValueError, source.seek, 0)
+
+    def test_open_wave(self):
+        """ Test that wav files are memory mapped when possible. """
+        self.assertIsInstance(open_wave(TRACK), MappedWave)
+
+class FormatTestSuite(unittest.TestCase):
+    """ Test Suite for reading and converting different sample formats. """
+
+    def setUp(self):
+        """ Create a directory to write test files to. """
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """ Remove test files. """
+        self.directory.cleanup()
+
+    def write_wave(self, name, data, format_tag, sample_width):
+        """ Write a mono 44.1kHz wav file containing the raw sample bytes given. """
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'wb') as wav_file:
+            wav_file.write(struct.pack('<4sI4s', b'RIFF', 36 + len(data), b'WAVE'))
+            wav_file.write(struct.pack('<4sIHHIIHH', b'fmt ', 16, format_tag, 1, 44100,
+                                       44100 * sample_width, sample_width, sample_width * 8))
+            wav_file.write(struct.pack('<4sI', b'data', len(data)) + data)
+        return path
+
+    def test_24bit(self):
+        """ Test that 24-bit files are unpacked to full scale int32, by both readers. """
+        data = b'\x00\x00\x80' + b'\x01\x00\x00' + b'\xff\xff\x7f' # Min, 1, Max.
+        path = self.write_wave('24bit.wav', data, 1, 3)
+        expected = [-2 ** 31, 256, (2 ** 23 - 1) * 256]
+        self.assertListEqual(list(MappedWave(path).read(3)), expected)
+        self.assertListEqual(list(WaveFile(path).read(3)), expected)
+
+    def test_float(self):
+        """ Test that 32-bit float files are memory mapped as float32. """
+        path = self.write_wave('float.wav', array([0.5, -0.25], dtype='<f4').tobytes(), 3, 4)
+        source = open_wave(path)
+        self.assertIsInstance(source, MappedWave)
+        self.assertListEqual(list(source.read(2)), [0.5, -0.25])
+
+    def test_convert_float(self):
+        """ Test that float samples are converted on the int16 scale. """
+        samples = array([0.5, -1.0], dtype=float32)
+        self.assertListEqual(list(convert_samples(samples, 'float32')), [16384, -32768])
+        self.assertListEqual(list(convert_samples(samples, 'int16')), [16384, -32768])
+
+    def test_convert_int(self):
+        """ Test that integer samples of each width are converted on the int16 scale. """
+        self.assertListEqual(list(convert_samples(array([-2 ** 31, 2 ** 16], dtype='<i4'),
+                                                  'float32')), [-32768, 1])
+        self.assertListEqual(list(convert_samples(array([0, 128], dtype='u1'), 'int16')),
+                             [-32768, 0])
+        samples = array([1, -2], dtype=int16)
+        self.assertIs(convert_samples(samples, 'int16'), samples)
+        self.assertEqual(convert_samples(samples, 'float32').dtype, float32)
@@ -3,7 +3,8 @@
     - Any tests against the spectral analysis module methods will be contained here.
 """
 import unittest
-from numpy import sin, pi, arange
+from numpy import sin, pi, arange, concatenate, allclose, stack
+from scipy.signal import lfilter
 from rtmaii.analysis import spectral
 
 class SpectralTestSuite(unittest.TestCase):
@@ -80,3 +81,41 @@ class SpectralTestSuite(unittest.TestCase):
         peak = self.conv_signal[5]
         for i in range(len(self.spectrum)):
             self.assertLessEqual(peak, self.conv_signal[i])
+
+    def test_decimation_factor(self):
+        """ Test that the decimated rate never falls below the target rate. """
+        self.assertEqual(spectral.decimation_factor(44100, 8000), 5)
+        self.assertEqual(spectral.decimation_factor(96000, 11025), 8)
+        self.assertEqual(spectral.decimation_factor(8000, 11025), 1)
+
+    def test_decimate_chunks(self):
+        """ Test that decimating chunks matches filtering and downsampling the whole signal. """
+        signal = concatenate([self.complex_wave] * 10)
+        taps = spectral.decimation_filter(3)
+        state = None
+        chunks = []
+        for start in range(0, len(signal), 70): # Chunks that aren't a multiple of the factor.
+            chunk, state = spectral.decimate(signal[start:start + 70], taps, 3, state)
+            chunks.append(chunk)
+        self.assertTrue(allclose(concatenate(chunks), lfilter(taps, 1, signal)[::3]))
+
+    def test_decimate_aliasing(self):
+        """ Test that frequencies above the decimated nyquist frequency are removed. """
+        taps = spectral.decimation_filter(2)
+        signal = concatenate([self.high_frequency] * 10) # 20Hz, above the decimated 12.5Hz.
+        decimated, _ = spectral.decimate(signal, taps, 2)
+        self.assertLess(abs(decimated[len(taps):]).max(), 0.05)
+
+    def test_spectrum_block(self):
+        """ Test that a block of channels gives the same spectra as each channel alone. """
+        block = stack((self.low_frequency, self.complex_wave))
+        bp_filter = spectral.butter_bandpass(1, 24, self.sampling_rate, 10)
+        spectra = spectral.spectrum(block, self.window, bp_filter)
+        self.assertTrue(allclose(spectra[0], self.spectrum))
+        self.assertTrue(allclose(spectra[1],
+                                 spectral.spectrum(self.complex_wave, self.window, bp_filter)))
+
+    def test_convolve_block(self):
+        """ Test that a block of channels is convolved as each channel alone. """
+        convolved = spectral.convolve_signal(stack((self.low_frequency, self.complex_wave)))
+        self.assertTrue(allclose(convolved[0], self.conv_signal))
@@ -0,0 +1,65 @@
+""" STREAM MODULE TESTS
+
+    - Any tests against consuming signals from an event loop will be contained here.
+"""
+import asyncio
+import threading
+import unittest
+from rtmaii import bus
+from rtmaii.stream import SignalStream
+from rtmaii.timing import send
+
+def send_from_thread(signal: str, values: list, sender: object = 0):
+    """ Raise each value on a separate thread, as a node would. """
+    thread = threading.Thread(target=lambda: [send(signal, sender, value) for value in values])
+    thread.start()
+    thread.join()
+
+class TestSuite(unittest.TestCase):
+    """ Test Suite for the stream module. """
+
+    def test_stream_order(self):
+        """ Test that values raised on another thread are received in order. """
+        async def consume():
+            async with SignalStream('streamed', buffer_size=100) as stream:
+                def produce():
+                    send_from_thread('streamed', list(range(100)))
+                    stream.close()
+                threading.Thread(target=produce).start()
+                return [value async for value in stream]
+        self.assertEqual(asyncio.run(consume()), list(range(100)))
+
+    def test_stream_bounded(self):
+        """ Test that the oldest values are dropped once the buffer is full. """
+        async def consume():
+            async with SignalStream('streamed', buffer_size=4) as stream:
+                send_from_thread('streamed', list(range(10)))
+                stream.close()
+                return [value async for value in stream], stream.dropped
+        self.assertEqual(asyncio.run(consume()), ([6, 7, 8, 9], 6))
+
+    def test_stream_sender(self):
+        """ Test that a stream only receives values from its sender. """
+        async def consume():
+            async with SignalStream('streamed', sender=1) as stream:
+                send_from_thread('streamed', [0], sender=0)
+                send_from_thread('streamed', [1], sender=1)
+                return await stream.__anext__()
+        self.assertEqual(asyncio.run(consume()), 1)
+
+    def test_stream_close(self):
+        """ Test that closing a stream ends iteration and disconnects it from the signal. """
+        async def consume():
+            stream = SignalStream('streamed')
+            waiting = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0)
+            stream.close()
+            with self.assertRaises(StopAsyncIteration):
+                await waiting
+            return stream
+        asyncio.run(consume())
+        self.assertEqual(bus.receivers('streamed'), [])
+
+    def test_stream_requires_loop(self):
+        """ Test that streams can't be created outside of an event loop. """
+        self.assertRaises(RuntimeError, SignalStream, 'streamed')
@@ -0,0 +1,94 @@
+""" TIMING MODULE TESTS
+
+    - Any tests against capture timestamps, xrun counting and latency will be contained here.
+"""
+import unittest
+from time import perf_counter
+from pydispatch import dispatcher
+from rtmaii.timing import CaptureClock, Capture, RateLimiter, Histogram, send, STATUS_FLAGS
+
+class TestSuite(unittest.TestCase):
+    """ Test Suite for the timing module. """
+
+    def setUp(self):
+        """ Perform setup of initial parameters. """
+        self.clock = CaptureClock(1000)
+
+    def test_index(self):
+        """ Test that each capture holds the index of its first frame. """
+        indexes = [self.clock.tick(100).index for _ in range(3)]
+        self.assertListEqual(indexes, [0, 100, 200])
+
+    def test_adc_time(self):
+        """ Test that the capture time is taken from the ADC time when available. """
+        capture = self.clock.tick(100, {'input_buffer_adc_time': 9.5, 'current_time': 10.0})
+        self.assertAlmostEqual(perf_counter() - capture.time, 0.5, places=2)
+
+    def test_xruns(self):
+        """ Test that status flags are counted, and frames lost to overflows are skipped. """
+        self.clock.tick(100, {'input_buffer_adc_time': 1.0, 'current_time': 1.0})
+        capture = self.clock.tick(100, {'input_buffer_adc_time': 1.3, 'current_time': 1.3},
+                                  STATUS_FLAGS['input_overflow'] | STATUS_FLAGS['output_underflow'])
+        self.assertEqual(capture.index, 300)
+        self.assertEqual(self.clock.xruns['input_overflow'], 1)
+        self.assertEqual(self.clock.xruns['output_underflow'], 1)
+        self.assertEqual(self.clock.xruns['skipped_frames'], 200)
+
+    def test_reset(self):
+        """ Test that resetting the clock restarts the index and counters. """
+        self.clock.tick(100, None, STATUS_FLAGS['input_underflow'])
+        self.clock.reset()
+        self.assertEqual(self.clock.index, 0)
+        self.assertEqual(self.clock.xruns['input_underflow'], 0)
+
+    def test_send_latency(self):
+        """ Test that signals carry their capture and latency, without breaking old callbacks. """
+        results = []
+        def callback(data, capture=None, latency=None):
+            results.append((data, capture, latency))
+        def old_callback(data):
+            results.append(data)
+
+        dispatcher.connect(callback, 'timing_test', sender=dispatcher.Any)
+        dispatcher.connect(old_callback, 'timing_test', sender=dispatcher.Any)
+        capture = Capture(0, perf_counter() - 1)
+        send('timing_test', 0, 'result', capture)
+        dispatcher.disconnect(callback, 'timing_test', sender=dispatcher.Any)
+        dispatcher.disconnect(old_callback, 'timing_test', sender=dispatcher.Any)
+
+        self.assertEqual(results[0][1], capture)
+        self.assertGreaterEqual(results[0][2], 1)
+        self.assertEqual(results[1], 'result')
+
+    def test_send_unsubscribed(self):
+        """ Test that signals nobody subscribes to return before their latency is measured. """
+        send('timing_test', 0, 'result', object()) # Has no time, so would raise if measured.
+
+    def test_rate_limiter(self):
+        """ Test that captures are due once every hop frames on average, for shorter chunks. """
+        limiter = RateLimiter(2.5)
+        due = [limiter.due(self.clock.tick(1)) for _ in range(10)]
+        self.assertListEqual(due, [True, False, False, True, False,
+                                   True, False, False, True, False])
+        self.assertTrue(limiter.due(None))
+
+    def test_rate_limiter_gap(self):
+        """ Test that captures after a gap don't cause a burst of due captures. """
+        limiter = RateLimiter(4)
+        self.assertTrue(limiter.due(Capture(0, 0)))
+        self.assertTrue(limiter.due(Capture(100, 0)))
+        self.assertFalse(limiter.due(Capture(101, 0)))
+
+    def test_histogram(self):
+        """ Test that histogram percentiles are within a bucket of the durations added. """
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        for duration in range(1, 101):
+            histogram.add(duration / 1000)
+        summary = histogram.summary()
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['mean'], 0.0505)
+        for percent in (50, 95, 99):
+            self.assertGreaterEqual(summary['p{}'.format(percent)], percent / 1000)
+            self.assertLessEqual(summary['p{}'.format(percent)], percent / 1000 * 1.25)
+        self.assertEqual(summary['max'], 0.1)
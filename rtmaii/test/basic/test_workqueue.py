@@ -0,0 +1,209 @@
+""" WORK QUEUE MODULE TESTS
+
+    - Any tests against the WorkQueue overflow policies and counters will be contained here.
+"""
+import unittest
+import threading
+from time import perf_counter
+from queue import Empty
+from numpy import arange, ndarray, testing
+from rtmaii.workqueue import WorkQueue, Stopped
+from rtmaii.timing import Capture, count_sent
+
+class TestSuite(unittest.TestCase):
+    """ Test Suite for the workqueue module. """
+
+    def test_drop_oldest(self):
+        """ Test that the oldest item is dropped by default when the queue is full. """
+        queue = WorkQueue(2)
+        for item in range(3):
+            queue.put(item)
+        self.assertListEqual(list(queue.queue), [1, 2])
+        self.assertEqual(queue.dropped, 1)
+
+    def test_drop_newest(self):
+        """ Test that new items are dropped when the queue is full. """
+        queue = WorkQueue(2, 'drop_newest')
+        results = [queue.put(item) for item in range(3)]
+        self.assertListEqual(results, [True, True, False])
+        self.assertListEqual(list(queue.queue), [0, 1])
+
+    def test_block_timeout(self):
+        """ Test that a blocked producer drops its item once the timeout expires. """
+        queue = WorkQueue(1, 'block', timeout=0.01)
+        queue.put(0)
+        self.assertFalse(queue.put(1))
+        self.assertEqual(queue.stats()['dropped'], 1)
+
+    def test_block(self):
+        """ Test that a blocked producer continues once the consumer takes an item. """
+        queue = WorkQueue(1, 'block')
+        queue.put(0)
+        producer = threading.Thread(target=queue.put, args=(1,))
+        producer.start()
+        self.assertEqual(queue.get(), 0)
+        producer.join(1)
+        self.assertListEqual(list(queue.queue), [1])
+        self.assertEqual(queue.dropped, 0)
+
+    def test_coalesce(self):
+        """ Test that new items are merged into the newest item when the queue is full. """
+        queue = WorkQueue(1, 'coalesce', coalesce=lambda queued, new: queued + new)
+        for item in ([1], [2], [3]):
+            queue.put(item)
+        self.assertListEqual(queue.get(), [1, 2, 3])
+        self.assertEqual(queue.coalesced, 2)
+
+    def test_invalid_policy(self):
+        """ Test that unknown policies, or coalescing without a callback, are rejected. """
+        self.assertRaises(ValueError, WorkQueue, 1, 'drop_all')
+        self.assertRaises(TypeError, WorkQueue, 1, 'coalesce')
+
+    def test_counters(self):
+        """ Test that the counters add up to the amount of items enqueued. """
+        queue = WorkQueue(2)
+        for item in range(5):
+            queue.put([item])
+        queue.get()
+        stats = queue.stats()
+        self.assertEqual(stats['enqueued'], 5)
+        self.assertEqual(stats['processed'] + stats['dropped'] + stats['depth'], 5)
+
+    def test_set_policy_length(self):
+        """ Test that shrinking a queue drops its oldest items. """
+        queue = WorkQueue()
+        for item in range(4):
+            queue.put(item)
+        queue.set_policy('drop_newest', queue_length=2)
+        self.assertListEqual(list(queue.queue), [2, 3])
+        self.assertEqual(queue.dropped, 2)
+
+    def test_capture(self):
+        """ Test that the capture of the item taken last is kept, following dropped items. """
+        queue = WorkQueue(1)
+        queue.put([0], 'first')
+        queue.put([1], 'second')
+        queue.get()
+        self.assertEqual(queue.capture, 'second')
+
+    def test_get_timeout(self):
+        """ Test that getting from an empty queue raises Empty once the timeout expires. """
+        queue = WorkQueue()
+        self.assertRaises(Empty, queue.get, 0.01)
+        self.assertFalse(queue.waiting)
+
+    def test_get_batch(self):
+        """ Test that a batch holds at most max_items, oldest first. """
+        queue = WorkQueue()
+        for item in range(5):
+            queue.put(item)
+        self.assertListEqual(queue.get_batch(3), [0, 1, 2])
+        self.assertListEqual(queue.get_batch(3), [3, 4])
+        self.assertEqual(queue.processed, 5)
+
+    def test_holds(self):
+        """ Test that items are held whilst queued, or until the consumer asks for more. """
+        queue = WorkQueue()
+        queue.put(1)
+        queue.put(2)
+        self.assertTrue(queue.holds(lambda item: item == 1))
+        queue.get()
+        self.assertTrue(queue.holds(lambda item: item == 1))
+        queue.get()
+        self.assertFalse(queue.holds(lambda item: item == 1))
+        self.assertTrue(queue.holds(lambda item: item == 2))
+
+    def test_released(self):
+        """ Test that items are released once dropped, or once the consumer asks for more. """
+        queue = WorkQueue(2)
+        for item in range(3):
+            queue.put([item])
+        self.assertEqual((queue.appended, queue.released), (3, 1))
+        queue.get()
+        queue.put([3])
+        self.assertEqual(queue.released, 1) # Held by the consumer, whilst 2 and 3 are queued.
+        queue.get_all()
+        self.assertEqual(queue.released, 2)
+        queue.put([4])
+        queue.close()
+        self.assertEqual(queue.released, 2)
+
+    def test_get_all(self):
+        """ Test that queued chunks are concatenated into a single array. """
+        queue = WorkQueue()
+        queue.put(arange(2))
+        queue.put(arange(2, 5))
+        signal = queue.get_all()
+        self.assertIsInstance(signal, ndarray)
+        testing.assert_array_equal(signal, arange(5))
+
+    def test_contention(self):
+        """ Test that no items are lost or duplicated with several producers. """
+        queue = WorkQueue()
+        producers = [threading.Thread(target=lambda: [queue.put([item]) for item in range(500)])
+                     for _ in range(4)]
+        for producer in producers:
+            producer.start()
+        received = []
+        while len(received) < 2000:
+            received.extend(queue.get_all(timeout=5))
+        for producer in producers:
+            producer.join()
+        self.assertListEqual(sorted(received), sorted(list(range(500)) * 4))
+
+    def test_close(self):
+        """ Test that closing a queue wakes its consumer with Stopped, dropping any new items. """
+        queue = WorkQueue()
+        stopped = []
+        def consume():
+            try:
+                queue.get()
+            except Stopped:
+                stopped.append(True)
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        queue.close()
+        consumer.join(1)
+        self.assertListEqual(stopped, [True])
+        self.assertFalse(queue.put(0))
+        self.assertTrue(queue.join(0))
+
+    def test_hop(self):
+        """ Test that items put before they are due are skipped, without being enqueued. """
+        queue = WorkQueue()
+        queue.set_hop(2048)
+        accepted = [queue.put(index, Capture(index * 1024, 0)) for index in range(8)]
+        self.assertListEqual(accepted, [True, False] * 4)
+        stats = queue.stats()
+        self.assertEqual((stats['enqueued'], stats['skipped']), (4, 4))
+        queue.set_hop(None)
+        self.assertTrue(queue.put(8, Capture(8 * 1024, 0)))
+
+    def test_deadline(self):
+        """ Test that items past their deadline are dropped when the consumer gets an item.
+            Deadlines are in audio, so items are dropped however long ago they were captured.
+        """
+        queue = WorkQueue()
+        queue.set_deadline(0.5, 1024)
+        queue.put('stale', Capture(0, perf_counter()))
+        queue.put('untimed')
+        queue.put('fresh', Capture(1024, perf_counter() - 1))
+        self.assertEqual(queue.get(), 'untimed')
+        self.assertEqual(queue.get(), 'fresh')
+        stats = queue.stats()
+        self.assertEqual(stats['stale'], 1)
+        self.assertEqual(stats['processed'] + stats['stale'], stats['enqueued'])
+
+    def test_timings(self):
+        """ Test that the consumer's processing and blocked time, and messages sent are kept. """
+        queue = WorkQueue()
+        queue.put(0)
+        queue.get()
+        count_sent(2) # Counted against the queue this thread last took an item from.
+        queue.put(1)
+        queue.get()
+        stats = queue.stats()
+        self.assertEqual(stats['sent'], 2)
+        self.assertEqual(stats['processing']['count'], 1)
+        self.assertGreaterEqual(stats['busy'], 0)
+        self.assertGreater(stats['blocked'], 0)
@@ -0,0 +1,244 @@
+""" TIMING MODULE
+
+    - This module contains methods for tracking when audio was captured.
+
+    Each chunk of audio is tagged with a Capture, holding the index of its first frame
+    and the time it was captured, measured with time.perf_counter().
+    The capture travels with the data through the hierarchy, so signals can be raised
+    with the end-to-end latency between the audio being captured and the result.
+
+    Callbacks can accept the extra 'capture' and 'latency' arguments of a signal,
+    callbacks that only accept 'data' will continue to work.
+
+    As captures index frames of the source, a RateLimiter uses them to analyse data
+    at a set rate of the audio, rather than of the wall clock, so offline analysis matches.
+
+    Each node's queue times how long its node spends processing items, in a Histogram,
+    and counts the messages the node sends, see WorkQueue.stats().
+"""
+import threading
+from collections import namedtuple
+from math import frexp
+from time import perf_counter
+from rtmaii import bus
+
+Capture = namedtuple('Capture', ['index', 'time'])
+
+# PortAudio stream callback status flags.
+STATUS_FLAGS = {
+    'input_underflow': 0x1,
+    'input_overflow': 0x2,
+    'output_underflow': 0x4,
+    'output_overflow': 0x8,
+}
+
+SENDER = threading.local() # Queue of the node last given an item on this thread.
+
+def latency(capture: Capture) -> float:
+    """ Seconds passed since the audio of a capture was captured, None if unknown.
+
+        Args:
+            - capture: capture of the audio the result was produced from.
+    """
+    return perf_counter() - capture.time if capture else None
+
+def send(signal: str, sender: object, data: object, capture: Capture = None):
+    """ Raise a signal on the event bus, with the capture and latency of the data.
+
+        Args:
+            - signal: name of the signal to raise.
+            - sender: channel id, or name of the node raising the signal.
+            - data: result to send to callbacks.
+            - capture: capture of the audio the result was produced from.
+    """
+    count_sent(1)
+    if not bus.listened(signal):
+        return # Nobody is subscribed, so the latency isn't worth measuring.
+    bus.send(signal, sender, data=data, capture=capture, latency=latency(capture))
+
+def send_channels(signal: str, sender: object, data: object, capture: Capture = None,
+                  block: bool = False):
+    """ Raise a signal for a node's result, once for each channel if it analysed a block.
+
+        Vectorised nodes analyse (channels, samples) blocks, the result of each row is sent
+        by the index of its channel, as if each channel had its own node.
+
+        Args:
+            - signal: name of the signal to raise.
+            - sender: channel id, or name of the node raising the signal.
+            - data: result to send to callbacks, a result per channel if block is True.
+            - capture: capture of the audio the result was produced from.
+            - block: whether the data holds the results of a block.
+    """
+    if not block:
+        send(signal, sender, data, capture)
+        return
+    for channel, result in enumerate(data):
+        send(signal, channel, result, capture)
+
+def count_sent(count: int):
+    """ Count messages sent by the node running on this thread, see WorkQueue.stats().
+
+        Args:
+            - count: amount of messages sent.
+    """
+    queue = getattr(SENDER, 'queue', None)
+    if queue is not None:
+        queue.sent += count # Only the thread running the node writes its count.
+
+class Histogram(object):
+    """ Histogram of durations, in buckets a quarter of a doubling wide from a microsecond.
+
+        Adding a duration takes constant time and the buckets are a fixed size,
+        so every node can keep one whilst running. Percentiles are the upper edge of
+        the bucket they fall in, at most 25% above the true duration.
+
+        Attributes:
+            - buckets (list): amount of durations in each bucket.
+            - count (int): amount of durations added.
+            - total (float): sum of the durations added, in seconds.
+            - max (float): longest duration added, in seconds.
+    """
+    MINIMUM = 1e-6 # Lower edge of the first bucket, in seconds, shorter durations go in it too.
+    STEPS = 4 # Buckets per doubling.
+    SIZE = 120 # Up to around 18 minutes, longer durations are added to the last bucket.
+
+    def __init__(self):
+        self.buckets = [0] * self.SIZE
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration: float):
+        """ Add a duration to the histogram.
+
+            Args:
+                - duration: seconds taken.
+        """
+        mantissa, exponent = frexp(duration / self.MINIMUM)
+        bucket = (exponent - 1) * self.STEPS + int((mantissa - 0.5) * 2 * self.STEPS)
+        self.buckets[min(max(bucket, 0), self.SIZE - 1)] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def edge(self, bucket: int) -> float:
+        """ Upper edge of a bucket, in seconds.
+
+            Args:
+                - bucket: index of the bucket.
+        """
+        doublings, step = divmod(bucket, self.STEPS)
+        return self.MINIMUM * 2 ** doublings * (1 + (step + 1) / self.STEPS)
+
+    def percentile(self, percent: float) -> float:
+        """ Duration the given percent of durations took at most, None if none were added.
+
+            Args:
+                - percent: percentage of durations, between 0 and 100.
+        """
+        if not self.count:
+            return None
+        target = max(1, percent / 100 * self.count)
+        seen = 0
+        for bucket, amount in enumerate(self.buckets):
+            seen += amount
+            if seen >= target:
+                return min(self.edge(bucket), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """ Return the count, mean, p50, p95, p99 and max of the durations, in seconds. """
+        return {'count': self.count,
+                'mean': self.total / self.count if self.count else None,
+                'p50': self.percentile(50), 'p95': self.percentile(95),
+                'p99': self.percentile(99), 'max': self.max if self.count else None}
+
+class RateLimiter(object):
+    """ Decides whether data is due to be analysed, at a rate of once every hop frames.
+
+        Data is due on average every hop frames, so the rate holds when chunks are shorter
+        than the hop, without bursts after frames are skipped.
+
+        Args:
+            - hop: frames of the source between analyses, every capture is due if None.
+
+        Attributes:
+            - next_index (int): index of the frame the next capture is due at.
+    """
+    def __init__(self, hop: float = None):
+        self.hop = hop
+        self.next_index = None
+
+    def due(self, capture: Capture) -> bool:
+        """ Check whether the data of a capture is due, data without a capture always is.
+
+            Args:
+                - capture: capture of the audio the data was produced from.
+        """
+        if not self.hop or capture is None:
+            return True
+        if self.next_index is None or capture.index >= self.next_index + self.hop:
+            self.next_index = capture.index
+        if capture.index < self.next_index:
+            return False
+        self.next_index += self.hop
+        return True
+
+class CaptureClock(object):
+    """ Tags chunks of captured audio with a Capture, counting any xruns reported by PortAudio.
+
+        Args:
+            - sampling_rate: sampling rate of the audio source (Hz).
+
+        Attributes:
+            - index (int): index of the next frame to be captured, this never decreases.
+            - xruns (dict): amount of each STATUS_FLAGS reported,
+              and 'skipped_frames', the frames estimated to be lost to input overflows.
+    """
+    def __init__(self, sampling_rate: int):
+        self.sampling_rate = sampling_rate
+        self.reset()
+
+    def reset(self):
+        """ Restart the frame index and xrun counters. """
+        self.index = 0
+        self.xruns = dict.fromkeys(STATUS_FLAGS, 0)
+        self.xruns['skipped_frames'] = 0
+        self.last_adc_time = None
+        self.last_frame_count = 0
+
+    def tick(self, frame_count: int, time_info: dict = None, status_flags: int = 0) -> Capture:
+        """ Tag a chunk of audio passed to the stream callback.
+
+            The capture time is taken from PortAudio's input ADC time when it is available,
+            otherwise from the time the callback was called.
+
+            Args:
+                - frame_count: amount of frames in the chunk.
+                - time_info: time_info dictionary passed to the stream callback.
+                - status_flags: status_flags passed to the stream callback.
+        """
+        now = perf_counter()
+        time_info = time_info or {}
+        adc_time = time_info.get('input_buffer_adc_time', 0)
+        current_time = time_info.get('current_time', 0)
+        capture_time = now - (current_time - adc_time) if adc_time and current_time else now
+
+        for name, flag in STATUS_FLAGS.items():
+            if status_flags & flag:
+                self.xruns[name] += 1
+
+        if status_flags & STATUS_FLAGS['input_overflow'] and adc_time and self.last_adc_time:
+            # Frames dropped by the device, keeps the index in line with the audio's timing.
+            expected = self.last_frame_count
+            skipped = round((adc_time - self.last_adc_time) * self.sampling_rate) - expected
+            if skipped > 0:
+                self.index += skipped
+                self.xruns['skipped_frames'] += skipped
+
+        capture = Capture(self.index, capture_time)
+        self.index += frame_count
+        self.last_adc_time = adc_time
+        self.last_frame_count = frame_count
+        return capture
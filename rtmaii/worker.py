@@ -13,11 +13,11 @@ import threading
 import os
 import logging
 from rtmaii.workqueue import WorkQueue
-from scipy.signal import resample
 from rtmaii.analysis import frequency, pitch, key, spectral, bpm
-from pydispatch import dispatcher
-from numpy import reshape, array
-from tensorflow.contrib import predictor
+from rtmaii.timing import send, send_channels
+from rtmaii.scheduler import start_node, join_node
+from rtmaii import registry
+from numpy import reshape, array, isnan
 
 LOGGER = logging.getLogger()
 class Worker(threading.Thread):
@@ -26,19 +26,33 @@ class Worker(threading.Thread):
         Attributes:
             - queue: queue of data to be processed by a worker.
             - channel_id: id of channel being analysed.
+            - priority: workers with a higher priority are sent data and scheduled first.
+            - SIGNALS (tuple): signals the worker raises, None if unknown,
+              see Hierarchy.plan.
+            - VECTORISED (bool): whether the worker analyses (channels, samples) blocks,
+              see the 'vectorise_channels' setting.
 
         Args:
             - queue_length: length of queue structure. [Default = 1]
                 Workers are greedy and will only consider the latest item.
     """
+    SIGNALS = None # Custom workers may raise any signal, so are never pruned.
+    VECTORISED = False
+
     def __init__(self, config: dict = None, channel_id: int = None, queue_length: int = 1):
         threading.Thread.__init__(self, args=(), kwargs=None)
         self.queue = WorkQueue(queue_length)
         self.config = config
         self.channel_id = channel_id
+        self.priority = 0
         self.setDaemon(True)
         self.reset_attributes()
-        self.start()
+        start_node(self)
+
+    def __init_subclass__(cls, **kwargs: dict):
+        """ Register every subclass, however deep, so the hierarchy can create it by name. """
+        super().__init_subclass__(**kwargs)
+        registry.register(cls)
 
     def run(self):
         raise NotImplementedError("Run should be implemented")
@@ -47,6 +61,26 @@ class Worker(threading.Thread):
         """ Inherited method, used for resetting any attributes on configuration changes. """
         pass
 
+    def set_hop(self, hop: float = None):
+        """ Analyse data at most once every hop frames of the source, skipping other items.
+
+            Args:
+                - hop: frames between analyses, every item is analysed if None.
+        """
+        self.queue.set_hop(hop)
+
+    def stop(self):
+        """ Stop the node, its run loop ends once it has finished its current item. """
+        self.queue.close()
+
+    def join(self, timeout: float = None):
+        """ Wait for the node to stop, see stop().
+
+            Args:
+                - timeout: maximum time in seconds to wait, waits forever if None.
+        """
+        join_node(self, timeout)
+
 class GenrePredictorWorker(Worker):
     """ Worker responsible for analysing Spectrogram intensities for a genre.
 
@@ -55,14 +89,19 @@ class GenrePredictorWorker(Worker):
             - channel_id: id of channel being analysed.
 
         Attributes:
-            - exporter: Exports spectrograms to an external file for use future training set
+            - exporter: Exports spectrograms to an external file for use future training set,
+              None if spectrograms aren't exported. Shared with other channels,
+              so it's closed by the hierarchy rather than the node.
             - predict_fn: Loads the 'predict' function of trained tensorflow model 
             - genredict: The dictionary from converting the number labels of predicted genre
     """
+    SIGNALS = ('genre',)
+
     def __init__(self, exporter: object, **kwargs: dict):
         Worker.__init__(self, kwargs['config'], kwargs['channel_id'])
         self.exporter = exporter
-        
+        # Tensorflow takes seconds to import, so is only imported once genre is analysed.
+        from tensorflow.contrib import predictor
         self.predict_fn = predictor.from_saved_model(os.path.join(os.path.dirname(__file__), 'model'))
         self.accuracyChecker = []
         self.genredict = {}
@@ -92,14 +131,15 @@ class GenrePredictorWorker(Worker):
                     print(self.accuracyChecker)
                     self.prediction = max(set(self.accuracyChecker), key=self.accuracyChecker.count)
 
-                export_data = [spectrodata,self.prediction]
-                self.exporter.queue.put(export_data)
+                if self.exporter:
+                    export_data = [spectrodata,self.prediction]
+                    self.exporter.queue.put(export_data)
             except:
                 pass
             
             spectrogram = []
 
-            dispatcher.send(signal='genre', sender=self.channel_id, data=self.prediction)
+            send('genre', self.channel_id, self.prediction, self.queue.capture)
 
 class BandsWorker(Worker):
     """ Worker responsible for analysing interesting frequency bands.
@@ -112,6 +152,9 @@ class BandsWorker(Worker):
             - bands_of_interest: dictionary of frequency bands to analyse.
             - sampling_rate: sampling_rate of source being analysed.
     """
+    SIGNALS = ('bands',)
+    VECTORISED = True
+
     def __init__(self, **kwargs: dict):
         Worker.__init__(self, kwargs['config'], kwargs['channel_id'])
 
@@ -125,20 +168,28 @@ class BandsWorker(Worker):
             frequency_bands = frequency.frequency_bands(spectrum,
                                                         self.bands_of_interest,
                                                         self.sampling_rate)
-            dispatcher.send(signal='bands', sender=self.channel_id, data=frequency_bands)
+            send_channels('bands', self.channel_id, frequency_bands, self.queue.capture,
+                          spectrum.ndim > 1)
 
 class Key(object):
     """ Abstract class that has methods to analyse the key/note given a pitch. """
     @staticmethod
-    def analyse_note(freq: float, channel_id: int):
+    def analyse_note(freq: float, channel_id: int, capture: object = None,
+                     block: bool = False):
         """ Extract the note of a given frequency..
 
             Args
                 - freq: estimated frequency to analyse.
                 - channel_id: channel the frequency was analysed from.
+                - capture: capture of the audio the frequency was analysed from.
+                - block: whether freq holds the frequency of each channel of a block.
         """
-        estimated_note = key.note_from_pitch(freq)
-        dispatcher.send(signal='note', sender=channel_id, data=estimated_note)
+        if block: # Channels without a pitch, i.e. silent channels, have no note.
+            estimated_note = [None if isnan(channel_freq) else key.note_from_pitch(channel_freq)
+                              for channel_freq in freq]
+        else:
+            estimated_note = key.note_from_pitch(freq)
+        send_channels('note', channel_id, estimated_note, capture, block)
 
     @staticmethod
     def analyse_key(freq: float, channel_id: int):
@@ -160,6 +211,9 @@ class ZeroCrossingWorker(Worker, Key):
         Attributes:
             - sampling_rate: sampling_rate of source being analysed.
     """
+    SIGNALS = ('pitch', 'note')
+    VECTORISED = True
+
     def __init__(self, **kwargs: dict):
         Worker.__init__(self, kwargs['config'], kwargs['channel_id'])
 
@@ -170,8 +224,9 @@ class ZeroCrossingWorker(Worker, Key):
         while True:
             signal = self.queue.get()
             estimated_pitch = pitch.pitch_from_zero_crossings(signal, self.sampling_rate)
-            dispatcher.send(signal='pitch', sender=self.channel_id, data=estimated_pitch)
-            self.analyse_note(estimated_pitch, self.channel_id)
+            block = signal.ndim > 1
+            send_channels('pitch', self.channel_id, estimated_pitch, self.queue.capture, block)
+            self.analyse_note(estimated_pitch, self.channel_id, self.queue.capture, block)
 
 class AutoCorrelationWorker(Worker, Key):
     """ Worker responsible for analysing the fundamental pitch using the auto-corellation method.
@@ -183,6 +238,9 @@ class AutoCorrelationWorker(Worker, Key):
         Attributes:
             - sampling_rate: sampling_rate of source being analysed.
     """
+    SIGNALS = ('pitch', 'note')
+    VECTORISED = True
+
     def __init__(self, **kwargs: dict):
         Worker.__init__(self, kwargs['config'], kwargs['channel_id'])
 
@@ -195,8 +253,9 @@ class AutoCorrelationWorker(Worker, Key):
             convolved_signal = spectral.convolve_signal(signal)
             estimated_pitch = pitch.pitch_from_auto_correlation(convolved_signal,
                                                                 self.sampling_rate)
-            dispatcher.send(signal='pitch', sender=self.channel_id, data=estimated_pitch)
-            self.analyse_note(estimated_pitch, self.channel_id)
+            block = signal.ndim > 1
+            send_channels('pitch', self.channel_id, estimated_pitch, self.queue.capture, block)
+            self.analyse_note(estimated_pitch, self.channel_id, self.queue.capture, block)
 
 class HPSWorker(Worker, Key):
     """ Worker responsible for analysing pitch using the harmonic-product-spectrum method.
@@ -208,6 +267,9 @@ class HPSWorker(Worker, Key):
         Attributes:
             - sampling_rate: sampling_rate of source being analysed.
     """
+    SIGNALS = ('pitch', 'note')
+    VECTORISED = True
+
     def __init__(self, **kwargs: dict):
         Worker.__init__(self, kwargs['config'], kwargs['channel_id'])
 
@@ -218,8 +280,9 @@ class HPSWorker(Worker, Key):
         while True:
             spectrum = self.queue.get()
             estimated_pitch = pitch.pitch_from_hps(spectrum, self.sampling_rate, 7)
-            dispatcher.send(signal='pitch', sender=self.channel_id, data=estimated_pitch)
-            self.analyse_note(estimated_pitch, self.channel_id)
+            block = spectrum.ndim > 1
+            send_channels('pitch', self.channel_id, estimated_pitch, self.queue.capture, block)
+            self.analyse_note(estimated_pitch, self.channel_id, self.queue.capture, block)
 
 class FFTWorker(Worker, Key):
     """ Worker responsible for analysing the fundamental pitch using the FFT method.
@@ -231,6 +294,9 @@ class FFTWorker(Worker, Key):
         Attributes:
             - sampling_rate: sampling_rate of source being analysed.
     """
+    SIGNALS = ('pitch', 'note')
+    VECTORISED = True
+
     def __init__(self, **kwargs: dict):
         Worker.__init__(self, kwargs['config'], kwargs['channel_id'])
 
@@ -241,8 +307,9 @@ class FFTWorker(Worker, Key):
         while True:
             spectrum = self.queue.get()
             estimated_pitch = pitch.pitch_from_fft(spectrum, self.sampling_rate)
-            dispatcher.send(signal='pitch', sender=self.channel_id, data=estimated_pitch)
-            self.analyse_note(estimated_pitch, self.channel_id)
+            block = spectrum.ndim > 1
+            send_channels('pitch', self.channel_id, estimated_pitch, self.queue.capture, block)
+            self.analyse_note(estimated_pitch, self.channel_id, self.queue.capture, block)
 
 #class BeatsWorker(Worker):
 #    """ Worker responsible for determining beats happening.
@@ -264,6 +331,8 @@ class BPMWorker(Worker):
     """ Worker responsible for determining beats happening.
 
     """
+    SIGNALS = ('bpm',)
+
     def __init__(self, **kwargs: dict):
         Worker.__init__(self, kwargs['config'], kwargs['channel_id'])
 
@@ -276,7 +345,7 @@ class BPMWorker(Worker):
             beats = bpm.cleanbeatarray(beats)
             bpmestimate = bpm.bpmsimple(beats)
 
-            dispatcher.send(signal='bpm', sender=self.channel_id, data=bpmestimate)
+            send('bpm', self.channel_id, bpmestimate, self.queue.capture)
             #self.analyse_bpm(timedif, self.channel_id)
 
 #class BPMWorker(Worker):
@@ -5,54 +5,481 @@
 
     This module makes use of the Condition threading object and Deque structure,
     to provide thread-safe inter-thread communication.
+    Every wait is made on a predicate whilst holding the lock,
+    so notifications can't be missed and a consumer never wakes to an empty queue.
+
+    When a queue is full, its overflow policy decides what happens to new items:
+    - 'drop_oldest': the oldest queued item is dropped. [Default]
+    - 'drop_newest': the new item is dropped.
+    - 'block': the producer waits for space, dropping the new item if the timeout expires.
+    - 'coalesce': the new item is merged into the newest queued item, using a callback.
+
+    A queue whose consumer is run by a Scheduler never blocks in get, see the scheduler module.
+
+    A queue with a deadline drops items captured longer before the newest audio put onto it
+    than the deadline, when its consumer asks for the next item, so a node that falls behind
+    analyses fresh audio. Deadlines are measured in frames of the source, as captures are,
+    rather than by the wall clock, so offline analysis drops the same items every run.
+
+    A queue with a hop only accepts items at that rate of the audio, see timing.RateLimiter,
+    other items are skipped before being enqueued.
+
+    A queue times its consumer, the time from taking items to asking for more is spent
+    processing them, and the time until the next items are taken is spent blocked,
+    see stats(). Timing takes a couple of clock reads per take, so it is always on.
+
+    Closing a queue stops its consumer, get raises Stopped rather than returning another item.
+
+    Arrays messaged between nodes are shared, every peer is handed the same object.
+    Coordinators publish them read-only, see read_only, so fan-out needs no copies.
+    A node that needs to write to its input must make its own copy, and a coalesce
+    callback must return a new item rather than writing to the queued one.
 """
 from collections import deque
-from threading import Condition
+from queue import Empty
+from threading import Condition, Lock
+from numpy import concatenate, ndarray
+from time import perf_counter
+from rtmaii.timing import RateLimiter, Histogram, SENDER
+
+QUEUE_POLICIES = ('drop_oldest', 'drop_newest', 'block', 'coalesce')
+
+def read_only(data: object) -> object:
+    """ Mark an array read-only before sharing it with peers, returning the data.
+
+        Only the array given is marked, the producer can still write to its buffer
+        through any other view, i.e. the RootCoordinator's ring.
+
+        Args:
+            - data: data to share, anything other than an array is returned as is.
+    """
+    if isinstance(data, ndarray):
+        data.flags.writeable = False
+    return data
+
+class Idle(BaseException):
+    """ Raised by get, to give a scheduled consumer's thread back to the scheduler's pool.
+
+        A BaseException, so it isn't caught by a consumer's own error handling.
+    """
+    pass
+
+class Stopped(BaseException):
+    """ Raised by get once the queue is closed, ending the consumer's run loop.
+
+        A BaseException, so it isn't caught by a consumer's own error handling.
+    """
+    pass
 
 class WorkQueue(object):
     """ Used by workers and coordinators to manage their internal work queue.
 
         Args:
-            - queue_length: Maximum length queue can reach, before popping old items.
+            - queue_length: Maximum length queue can reach, before the overflow policy applies.
+            - policy: overflow policy to use when the queue is full, see QUEUE_POLICIES.
+            - timeout: seconds a producer waits for space with the 'block' policy,
+              waits forever if None.
+            - coalesce: function(queued_item, new_item) returning the merged item,
+              required by the 'coalesce' policy.
 
         Attributes:
             - condition: Queue Lock, allowing threads to wait until they are notified.
+            - drained: Condition notified whenever the consumer runs out of work.
+            - space: Condition notified whenever the consumer takes items from the queue.
             - queue: Queue of data to be processed.
+            - captures: Capture of each item in the queue, see the timing module.
+            - capture: Capture of the item last taken by the consumer, None if unknown.
+            - held (list): items last taken by the consumer, held until it asks for more items.
+            - appended (int): amount of items appended to the queue, the ordinal of the next.
+            - released (int): ordinal of the oldest item still queued or held,
+              items appended before it are no longer used by the consumer.
+            - waiting: True whilst the consumer is blocked waiting for new items.
+            - enqueued (int): amount of items put onto the queue.
+            - processed (int): amount of items taken from the queue by its consumer.
+            - dropped (int): amount of items discarded by the overflow policy.
+            - coalesced (int): amount of items merged into a queued item.
+            - skipped (int): amount of items put before they were due, see set_hop().
+            - stale (int): amount of items dropped past their deadline, see set_deadline().
+            - sent (int): amount of messages sent by the consumer, see timing.count_sent().
+            - processing (Histogram): seconds the consumer spent processing each take of items.
+            - blocked (float): seconds the consumer spent waiting for items.
+            - idle_since (float): when the consumer last asked for items, None whilst processing.
+            - taken_at (float): when the consumer last took items.
+            - deadline (float): seconds of audio behind the newest item an item is dropped,
+              never if None.
+            - deadline_frames (float): the deadline in frames of the source.
+            - newest (int): index of the newest capture put onto the queue whilst it had
+              a deadline, None if none were.
+            - limiter (RateLimiter): decides which items are due.
+            - on_ready: function scheduling the consumer, None if it runs on its own thread.
+            - scheduled (bool): True whilst a scheduled consumer is queued on,
+              or running on the pool.
+            - taken (int): items a scheduled consumer has taken since it was last queued,
+              see __yield__.
+            - closed (bool): True once the queue has been closed, see close().
     """
-    def __init__(self, queue_length: int = None):
-        self.condition = Condition()
-        self.queue = deque([], queue_length) if queue_length else deque()
+    def __init__(self, queue_length: int = None, policy: str = 'drop_oldest',
+                 timeout: float = None, coalesce: object = None):
+        lock = Lock()
+        self.condition = Condition(lock)
+        self.drained = Condition(lock)
+        self.space = Condition(lock)
+        self.queue = deque()
+        self.captures = deque()
+        self.capture = None
+        self.held = []
+        self.held_from = 0 # Ordinal of the first held item.
+        self.appended = 0
+        self.released = 0
+        self.waiting = False
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.skipped = 0
+        self.stale = 0
+        self.sent = 0
+        self.processing = Histogram()
+        self.blocked = 0.0
+        self.idle_since = perf_counter()
+        self.taken_at = None
+        self.deadline = None
+        self.deadline_frames = None
+        self.newest = None
+        self.limiter = RateLimiter()
+        self.on_ready = None
+        self.scheduled = False
+        self.taken = 0
+        self.closed = False
+        self.queue_length = queue_length
+        self.set_policy(policy, timeout=timeout, coalesce=coalesce)
+
+    def set_policy(self, policy: str, queue_length: int = None,
+                   timeout: float = None, coalesce: object = None):
+        """ Change the overflow policy of the queue.
+
+            Args:
+                - policy: overflow policy to use when the queue is full, see QUEUE_POLICIES.
+                - queue_length: new maximum length of the queue, unchanged if None.
+                - timeout: seconds to wait for space with the 'block' policy.
+                - coalesce: function(queued_item, new_item) used by the 'coalesce' policy.
+        """
+        if policy not in QUEUE_POLICIES:
+            raise ValueError('Queue policy {} does not exist, use one of {}.'
+                             .format(policy, QUEUE_POLICIES))
+        if policy == 'coalesce' and not callable(coalesce):
+            raise TypeError('The coalesce policy requires a coalesce function.')
+        with self.condition:
+            self.policy = policy
+            self.timeout = timeout
+            self.coalesce = coalesce
+            if queue_length is not None:
+                self.queue_length = queue_length
+            # Trim down to the new length, a blocking queue waits for its consumer instead.
+            while policy != 'block' and self.queue_length and len(self.queue) > self.queue_length:
+                self.queue.popleft()
+                self.captures.popleft()
+                self.dropped += 1
+            self.__release__()
+            self.space.notify_all()
+
+    def set_hop(self, hop: float = None):
+        """ Only accept items once every hop frames of the source, skipping any others.
+
+            Args:
+                - hop: frames between accepted items, every item is accepted if None.
+        """
+        with self.condition:
+            if hop != self.limiter.hop: # Config updates keep the schedule of an unchanged hop.
+                self.limiter = RateLimiter(hop)
+
+    def set_deadline(self, deadline: float = None, sampling_rate: int = None):
+        """ Drop items captured more than deadline seconds of audio before the newest item,
+            rather than processing them.
+
+            Args:
+                - deadline: seconds of audio an item is stale after, items never are if None.
+                - sampling_rate: sampling rate of the source captures index frames of.
+        """
+        with self.condition:
+            self.deadline = deadline
+            self.deadline_frames = deadline * sampling_rate if deadline is not None else None
+
+    def set_scheduler(self, on_ready: object):
+        """ Have the consumer scheduled whenever there are items, rather than blocking in get.
+
+            Args:
+                - on_ready: function queuing the consumer to be run, called whilst holding the lock.
+        """
+        with self.condition:
+            self.on_ready = on_ready
+            self.waiting = True # Idle until it is first scheduled.
+            self.scheduled = False
+            if self.queue:
+                self.__schedule__()
+
+    def close(self):
+        """ Stop the consumer, dropping any queued items.
+
+            A consumer waiting for an item is woken, and any later put is dropped.
+        """
+        with self.condition:
+            self.closed = True
+            self.dropped += len(self.queue)
+            self.queue.clear()
+            self.captures.clear()
+            self.__release__()
+            self.condition.notify_all()
+            self.drained.notify_all()
+            self.space.notify_all()
+            if self.on_ready and not self.scheduled:
+                self.__schedule__() # Run once more, to be stopped.
+
+    def stats(self) -> dict:
+        """ Return the counters and timings of the queue.
+
+            The counters always add up,
+            enqueued = processed + dropped + coalesced + stale + depth.
+            Skipped items are never enqueued.
+            Enqueued items are the consumer's messages in, and sent its messages out.
+            Times are in seconds, 'busy' is the total time spent processing,
+            'processing' summarises the time taken by each take of items, see Histogram.
+        """
+        with self.condition:
+            return {'policy': self.policy, 'queue_length': self.queue_length,
+                    'depth': len(self.queue), 'enqueued': self.enqueued,
+                    'processed': self.processed, 'dropped': self.dropped,
+                    'coalesced': self.coalesced, 'stale': self.stale,
+                    'skipped': self.skipped, 'sent': self.sent,
+                    'blocked': self.blocked + (perf_counter() - self.idle_since
+                                               if self.idle_since is not None else 0),
+                    'busy': self.processing.total,
+                    'processing': self.processing.summary()}
+
+    def holds(self, predicate: object) -> bool:
+        """ Check whether an item matching a predicate is queued, or held by the consumer.
 
-    def get(self) -> object:
-        """ Get last added item from work queue. If empty block until item available.
+            Args
+                - predicate: function(item) returning True for the items looked for.
+        """
+        with self.condition:
+            return (any(predicate(item) for item in self.queue) or
+                    any(predicate(item) for item in self.held))
+
+    def get(self, timeout: float = None) -> object:
+        """ Get the oldest item from the work queue. If empty block until item available.
 
             When blocking, the process will sleep until a condition is sent.
+
+            Args
+                - timeout: maximum time in seconds to wait, waits forever if None.
+
+            Raises
+                - queue.Empty: if no item was put before the timeout expired.
+                - Stopped: once the queue is closed.
+        """
+        return self.get_batch(1, timeout)[0]
+
+    def get_batch(self, max_items: int = None, timeout: float = None) -> list:
+        """ Get up to max_items of the oldest items from the work queue, oldest first.
+
+            If empty block until at least one item is available.
+
+            Args
+                - max_items: most items to take, every item if None.
+                - timeout: maximum time in seconds to wait, waits forever if None.
+
+            Raises
+                - queue.Empty: if no item was put before the timeout expired.
+                - Stopped: once the queue is closed.
         """
-        if not self.queue: # Wait until a notification is sent.
-            with self.condition:
-                self.condition.wait()
-        data = self.queue.popleft()
-        return data
+        with self.condition:
+            self.__done_processing__()
+            self.held = []
+            self.__release__()
+            self.__wait_for_item__(timeout)
+            self.__start_processing__()
+            count = len(self.queue) if max_items is None else min(max_items, len(self.queue))
+            self.held_from = self.appended - len(self.queue)
+            items = [self.queue.popleft() for _ in range(count)]
+            for _ in range(count):
+                self.capture = self.captures.popleft() # Keep the capture of the newest item.
+            self.processed += count
+            self.held = items
+            self.__release__()
+            self.space.notify_all()
+            return items
 
-    def get_all(self) -> list:
-        """ Get all items currently present in work queue extending the original object.
+    def get_all(self, timeout: float = None) -> object:
+        """ Get all items currently present in work queue, joined into a single array.
 
+            Items are chunks of samples, joined with a single numpy concatenate along their
+            last axis, so (channels, samples) blocks are joined sample wise.
             If queue is empty this blocks until an item is available.
+
+            Args
+                - timeout: maximum time in seconds to wait, waits forever if None.
+
+            Raises
+                - queue.Empty: if no item was put before the timeout expired.
+                - Stopped: once the queue is closed.
         """
-        data = []
-        if not self.queue: # Wait until a notification is sent.
-            with self.condition:
-                self.condition.wait()
-        while self.queue: # Grab all items.
-            data.extend(self.queue.popleft())
-        return data
+        return concatenate(self.get_batch(None, timeout), axis=-1)
 
-    def put(self, data: object):
+    def put(self, data: object, capture: object = None) -> bool:
         """ Put item onto the work queue and send a notification that new item has been added.
 
+            If the queue is full, the overflow policy of the queue is applied.
+
             Args
                 - data: data to be added.
+                - capture: Capture of the audio the data was produced from.
+
+            Returns
+                - bool: False if the new item was dropped or skipped, otherwise True.
         """
         with self.condition:
+            if not self.limiter.due(capture):
+                self.skipped += 1
+                return False
+            if (self.deadline_frames is not None and capture and
+                    (self.newest is None or capture.index > self.newest)):
+                self.newest = capture.index
+            self.enqueued += 1
+            if self.closed:
+                self.dropped += 1
+                return False
+            if self.__is_full__():
+                if self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return False
+                if self.policy == 'coalesce':
+                    self.queue[-1] = self.coalesce(self.queue[-1], data)
+                    self.captures[-1] = capture
+                    self.coalesced += 1
+                    return True
+                if self.policy == 'block':
+                    if not self.space.wait_for(lambda: self.closed or not self.__is_full__(),
+                                               self.timeout) or self.closed:
+                        self.dropped += 1
+                        return False
+                else:
+                    self.queue.popleft()
+                    self.captures.popleft()
+                    self.dropped += 1
             self.queue.append(data)
+            self.captures.append(capture)
+            self.appended += 1
+            self.__release__()
             self.condition.notify()
+            if self.on_ready and not self.scheduled:
+                self.__schedule__()
+            return True
+
+    def join(self, timeout: float = None) -> bool:
+        """ Block until the queue is empty and its consumer is waiting for more work.
+
+            Used when running analysis offline, to push the next item only once,
+            the previous item has been fully processed.
+
+            Args
+                - timeout: maximum time in seconds to wait, waits forever if None.
+
+            Returns
+                - bool: True if the consumer is idle or closed, False if the timeout expired.
+        """
+        with self.condition:
+            return self.drained.wait_for(lambda: self.closed or self.waiting and not self.queue,
+                                         timeout)
+
+    def __is_full__(self) -> bool:
+        """ Check whether the queue has reached its length, must be called whilst holding the lock.
+        """
+        return bool(self.queue_length) and len(self.queue) >= self.queue_length
+
+    def __done_processing__(self):
+        """ Time the items last taken as processed, must be called whilst holding the lock.
+
+            The consumer asks for more items once it has finished with the last.
+        """
+        if self.idle_since is None:
+            self.idle_since = perf_counter()
+            self.processing.add(self.idle_since - self.taken_at)
+
+    def __start_processing__(self):
+        """ Time the wait for items as blocked, must be called whilst holding the lock. """
+        self.taken_at = perf_counter()
+        self.blocked += self.taken_at - self.idle_since
+        self.idle_since = None
+        SENDER.queue = self # Messages sent by this thread are now the consumer's.
+
+    def __wait_for_item__(self, timeout: float = None):
+        """ Sleep until an item is available, must be called whilst holding the lock.
+
+            Args
+                - timeout: maximum time in seconds to wait, waits forever if None.
+
+            Raises
+                - Stopped: if the queue is closed.
+        """
+        if self.closed:
+            raise Stopped
+        self.__drop_stale__()
+        if self.on_ready:
+            self.__yield__()
+        if self.queue:
+            self.waiting = False
+            return
+        self.waiting = True
+        self.drained.notify_all() # Let join() know the consumer has run out of work.
+        available = self.condition.wait_for(
+            lambda: self.__drop_stale__() or self.queue or self.closed, timeout)
+        self.waiting = False
+        if self.closed:
+            raise Stopped
+        if not available:
+            raise Empty
+
+    def __drop_stale__(self):
+        """ Drop the oldest items whilst they are past the deadline, must hold the lock. """
+        if self.deadline_frames is None or self.newest is None:
+            return
+        expired = self.newest - self.deadline_frames
+        stale = self.stale
+        while self.captures and self.captures[0] and self.captures[0].index < expired:
+            self.queue.popleft()
+            self.captures.popleft()
+            self.stale += 1
+        if self.stale != stale:
+            self.__release__()
+            self.space.notify_all()
+
+    def __release__(self):
+        """ Update the ordinal of the oldest item still queued or held, must hold the lock. """
+        self.released = self.held_from if self.held else self.appended - len(self.queue)
+
+    def __schedule__(self):
+        """ Queue a scheduled consumer to be run, must be called whilst holding the lock. """
+        self.scheduled = True
+        self.taken = 0
+        self.on_ready()
+
+    def __yield__(self):
+        """ Give a scheduled consumer's thread back after each item, must hold the lock.
+
+            Consumers with more items are queued behind any other scheduled consumer,
+            so every node gets its turn however small the pool is.
+
+            Raises
+                - Idle: if the consumer has already taken an item, or the queue is empty.
+        """
+        if self.queue and not self.taken:
+            self.taken += 1
+            return
+        if self.queue:
+            self.__schedule__()
+        else:
+            self.scheduled = False
+            self.waiting = True
+            self.drained.notify_all() # Let join() know the consumer has run out of work.
+        raise Idle